@@ -1,8 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 import uvicorn
+import asyncio
 import logging
+import json
+import math
+import time
 
 from app.models import ChatRequest, ChatResponse
 
@@ -12,17 +18,64 @@ RATE_LIMIT_MESSAGE = (
 "Please try again later."
 )
 
+BUSY_MESSAGE = "A.X.I.O.M is handling a lot of requests right now. Please try again in a few seconds."
+
 def _is_rate_limit_error(exc: Exception) -> bool:
     """True if the exception is a Groq rate limit (429 / tokens per day)."""
     msg = str(exc).lower()
     return "429" in str(exc) or "rate limit" in msg or "tokens per day" in msg
 
-from app.services.vector_store import VectorStoreService
-from app.services.groq_service import GroqService
-from app.services.realtime_service import RealtimeGroqService
-from app.services.chat_service import ChatService
-from config import VECTOR_STORE_DIR
-from langchain_community.vectorstores import FAISS
+def _is_busy_error(exc: BaseException) -> bool:
+    """True if every Groq key was only at its in-flight limit (KeyPoolBusy), not out of quota."""
+    while exc is not None:
+        if getattr(exc, "busy", False):
+            return True
+        exc = exc.__cause__
+    return False
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    # Services wrap errors (raise ... from e); KeyPoolExhausted / AdmissionRejected carry retry_after.
+    while exc is not None:
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after is not None:
+            return retry_after
+        exc = exc.__cause__
+    return None
+
+def _too_many_requests(detail: str, retry_after: Optional[float]) -> HTTPException:
+    headers = {"Retry-After": str(max(1, math.ceil(retry_after)))} if retry_after is not None else None
+    return HTTPException(status_code=429, detail=detail, headers=headers)
+
+def _service_busy(retry_after: Optional[float]) -> HTTPException:
+    return HTTPException(
+        status_code=503, detail=BUSY_MESSAGE, headers={"Retry-After": str(max(1, math.ceil(retry_after or 1)))},
+    )
+
+def _chat_error(exc: Exception, what: str) -> HTTPException:
+    """Log a failed chat request and map it to 503 (keys busy), 429 + Retry-After (rate limit) or 500."""
+    if _is_busy_error(exc):
+        logger.warning(f"All Groq keys busy: {exc}")
+        return _service_busy(_retry_after(exc))
+    if _is_rate_limit_error(exc):
+        logger.warning(f"Rate limit hit: {exc}")
+        return _too_many_requests(RATE_LIMIT_MESSAGE, _retry_after(exc))
+    logger.error(f"Error processing {what}: {exc}", exc_info=True)
+    return HTTPException(status_code=500, detail=f"Error processing chat: {str(exc)}")
+
+from app.services.admission import AdmissionQueue, AdmissionRejected
+from app.utils import metrics
+from app.utils.metrics import MetricsMiddleware
+from app.utils.startup import StartupTracker
+from config import ADMISSION_TIMEOUT_SECONDS, STARTUP_MODE, STARTUP_WARMUP
+
+# The services pull in langchain, FAISS and the embedding stack; they are imported during startup
+# (timed, see STARTUP_IMPORTS) rather than when this module is loaded.
+if TYPE_CHECKING:
+    from app.services.vector_store import VectorStoreService
+    from app.services.groq_service import GroqService
+    from app.services.realtime_service import RealtimeGroqService
+    from app.services.chat_service import ChatService
+    from app.services.indexer import BackgroundIndexer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,10 +84,38 @@ logging.basicConfig(
 
 logger = logging.getLogger("A.X.I.O.M")
 
-vector_store_service: VectorStoreService = None
-groq_service: GroqService = None
-realtime_service: RealtimeGroqService = None
-chat_service: ChatService = None
+vector_store_service: "VectorStoreService" = None
+groq_service: "GroqService" = None
+realtime_service: "RealtimeGroqService" = None
+chat_service: "ChatService" = None
+indexer: "BackgroundIndexer" = None
+admission_queue: AdmissionQueue = None
+startup = StartupTracker()
+startup_task: Optional[asyncio.Task] = None
+
+STARTING_MESSAGE = "A.X.I.O.M is still starting up. Please try again in a few seconds."
+
+# Heavy third-party packages first, so each one's own cost is visible in /health/ready.
+STARTUP_IMPORTS = (
+    "numpy",
+    "faiss",
+    "langchain_core",
+    "langchain_community.vectorstores",
+    "langchain_huggingface",
+    "langchain_groq",
+    "tavily",
+    "app.services.chat_store",
+    "app.services.vector_store",
+    "app.services.groq_service",
+    "app.services.realtime_service",
+    "app.services.indexer",
+    "app.services.chat_service",
+)
+
+# Admission priority per endpoint (lower goes first): realtime requests hold a slot for the web
+# search as well, so plain chat is let in ahead of them when the queue backs up.
+CHAT_PRIORITY = 0
+REALTIME_PRIORITY = 1
 
 
 
@@ -53,28 +134,96 @@ def print_title():
 """
     print(title)
 
+def _init_services():
+    """
+    Build every service, in dependency order, and publish them once all are up:
+    1. VectorStoreService: Loads the embedding model and FAISS index, syncs it with learning data and chat history
+    2. GroqService: Sets up general chat AI service
+    3. RealtimeGroqService: Sets up realtime chat with Tavily search
+    4. BackgroundIndexer: Applies chat-session index updates off the request path
+    5. ChatService: Manages chat sessions and conversations
+    VectorStoreService comes first (GroqService uses it), GroqService before RealtimeGroqService
+    (it shares the key pool and router), and ChatService needs both.
+    Each phase is timed on the startup tracker (reported by /health/ready).
+    """
+    global vector_store_service, groq_service, realtime_service, chat_service, indexer
+
+    with startup.phase_timer("imports"):
+        startup.import_modules(STARTUP_IMPORTS)
+    from app.services.vector_store import VectorStoreService
+    from app.services.groq_service import GroqService
+    from app.services.realtime_service import RealtimeGroqService
+    from app.services.chat_service import ChatService
+    from app.services.indexer import BackgroundIndexer
+    from app.services.chat_store import create_chat_store
+
+    # One storage backend (file or SQLite) shared by the vector store and chat service.
+    chat_store = create_chat_store()
+    with startup.phase_timer("vector_store_load"):
+        logger.info("Initializing vector store service ... ")
+        vector_store = VectorStoreService(chat_store)
+    with startup.phase_timer("vector_store_sync"):
+        # Incremental sync: only sessions changed since the index was saved are re-embedded.
+        vector_store.sync_vector_store()
+        logger.info("Vector store initialized successfully")
+    with startup.phase_timer("services"):
+        logger.info("Initializing Groq service (general queries) ... ")
+        groq = GroqService(vector_store)
+        logger.info("Groq service initialized successfully")
+        logger.info("Initializing Realtime Groq service (with Tavily search) ... ")
+        realtime = RealtimeGroqService(vector_store, groq.key_pool, groq.router)
+        logger.info("Realtime Groq service initialized successfully")
+        logger.info("Starting background indexer ... ")
+        background_indexer = BackgroundIndexer(vector_store)
+        background_indexer.start()
+        logger.info("Initializing chat service ... ")
+        chat = ChatService(groq, vector_store, realtime, background_indexer, chat_store)
+        logger.info("Chat service initialized successfully")
+    if STARTUP_WARMUP:
+        with startup.phase_timer("warmup"):
+            # First query embedding, FAISS search and tokenizer load happen here, not in a user's request.
+            from app.utils.tokens import count_tokens
+            vector_store.search("warm-up query", k=1)
+            count_tokens("warm-up query")
+
+    vector_store_service, groq_service, realtime_service, indexer = vector_store, groq, realtime, background_indexer
+    # Published last: the endpoints treat a non-None chat_service as "ready".
+    chat_service = chat
+    startup.mark_ready()
+    logger.info("=" * 60)
+    logger.info("Service Status:")
+    logger.info(" - Vector Store: Ready")
+    logger.info(" - Groq AI (General): Ready")
+    logger.info(" - Groq AI (Realtime): Ready")
+    logger.info(" - Background Indexer: Running")
+    logger.info(" - Chat Service: Ready")
+    logger.info("=" * 60)
+    logger.info(f"A.X.I.O.M is online and ready! (startup took {startup.ready_after:.1f}s)")
+    logger.info("API: http://localhost:8000")
+    logger.info("Docs: http://localhost:8000/docs")
+    logger.info("=" * 60)
+
+async def _background_startup():
+    try:
+        await asyncio.to_thread(_init_services)
+    except Exception as e:
+        startup.mark_failed(e)
+        logger.error(f"fatal error during startup: {e}", exc_info=True)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Application lifespan manager - handles startup and shutdown.
 
-    This function manages the application's lifecycle:
-    - STARTUP: Initializes all services in the correct order
-    1. VectorStoreService: Creates FAISS index from learning data and chat history
-    2. GroqService: Sets up general chat AI service
-    3. RealtimeGroqService: Sets up realtime chat with Tavily search
-    4. ChatService: Manages chat sessions and conversations
+    - STARTUP: _init_services builds the services. With STARTUP_MODE=background it runs in a
+      thread and the server accepts connections right away: /health/live answers at once,
+      /health/ready and the chat endpoints return 503 until loading finishes.
     - RUNTIME: Application runs normally
-    - SHUTDOWN: Saves all active chat sessions to disk
-
-    The services are initialized in this specific order because:
-    - VectorStoreService must be created first (used by GroqService)
-    - GroqService must be created before RealtimeGroqService (it inherits from it)
-    - ChatService needs both GroqService and RealtimeGroqService
+    - SHUTDOWN: Saves unsaved chat sessions to disk and flushes pending index updates
 
     All services are stored as global variables so they can be accessed by API endpoints.
     """
-    global vector_store_service, groq_service, realtime_service, chat_service
+    global admission_queue, startup_task
 
     print_title()
     logger.info("=" * 60)
@@ -82,38 +231,36 @@ async def lifespan(app: FastAPI):
     logger.info("=" * 60)
 
     try:
-        logger.info("Initializing vector store service ... ")
-        vector_store_service = VectorStoreService()
-        vector_store_service.create_vector_store()
-        logger.info("Vector store initialized successfully")
-        logger.info("Initializing Groq service (general queries) ... ")
-        groq_service = GroqService(vector_store_service)
-        logger.info("Groq service initialized successfully")
-        logger.info("Initializing Realtime Groq service (with Tavily search) ... ")
-        realtime_service = RealtimeGroqService(vector_store_service)
-        logger.info("Realtime Groq service initialized successfully")
-        logger.info("Initializing chat service ... ")
-        chat_service = ChatService(groq_service, vector_store_service, realtime_service)
-        logger.info("Chat service initialized successfully")
-        logger.info("=" * 60)
-        logger.info("Service Status:")
-        logger.info(" - Vector Store: Ready")
-        logger.info(" - Groq AI (General): Ready")
-        logger.info(" - Groq AI (Realtime): Ready")
-        logger.info(" - Chat Service: Ready")
-        logger.info("=" * 60)
-        logger.info("A.X.I.O.M is online and ready!")
-        logger.info("API: http://localhost:8000")
-        logger.info("Docs: http://localhost:8000/docs")
-        logger.info("=" * 60)
+        admission_queue = AdmissionQueue()
+        if STARTUP_MODE == "background":
+            logger.info("Background startup: accepting connections while the model and index load")
+            startup_task = asyncio.create_task(_background_startup())
+        else:
+            try:
+                _init_services()
+            except Exception as e:
+                startup.mark_failed(e)
+                raise
 
         yield
 
         logger.info("\nShutting down A.X.I.O.M...")
+        if startup_task and not startup_task.done():
+            logger.info("Waiting for startup to finish before shutting down ...")
+            await startup_task
         if chat_service:
-            for session_id in list(chat_service.sessions.keys()):
-                chat_service.save_chat_session(session_id)
-        logger.info("All sessions saved. Goodbye!")
+            chat_service.flush_sessions()
+            chat_service.history_window.close()
+        if realtime_service:
+            realtime_service.search_cache.save()
+        logger.info("All sessions saved.")
+        if indexer:
+            indexer.stop()
+            logger.info("Pending index updates flushed.")
+        if vector_store_service:
+            vector_store_service.flush()
+            vector_store_service.embedding_pipeline.close()
+        logger.info("Goodbye!")
 
     except Exception as e:
         logger.error(f"fatal error during startup: {e}", exc_info=True)
@@ -133,6 +280,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route plus the per-stage breakdown (see /metrics and SLOW_REQUEST_SECONDS).
+app.add_middleware(MetricsMiddleware)
+
 @app.get("/")
 async def root():
     return {
@@ -140,69 +290,234 @@ async def root():
         "endpoints": {
             "/chat": "General chat (pure LLM, no web search)",
             "/chat/realtime": "Realtime chat (with Tavily search)",
+            "/chat/stream": "General chat, streamed token by token (server-sent events)",
+            "/chat/realtime/stream": "Realtime chat, streamed token by token (server-sent events)",
             "/chat/history/{session_id}": "Get chat history",
-            "/health": "System health check"
+            "/health": "System health check",
+            "/health/live": "Liveness probe (answers as soon as the server is up)",
+            "/health/ready": "Readiness probe with startup phase and import timings",
+            "/metrics": "Prometheus metrics (request and stage latencies, caches, keys, index)"
         }
     }
 
+def _not_ready(service: str) -> HTTPException:
+    if startup.error is None:
+        # Background startup still loading the model and index.
+        return HTTPException(status_code=503, detail=STARTING_MESSAGE, headers={"Retry-After": "5"})
+    return HTTPException(status_code=503, detail=f"{service} not initialized")
+
 @app.get("/health")
 async def health():
     return {
-        "status": "healthy",
+        "status": "healthy" if startup.ready else ("unhealthy" if startup.error else "starting"),
         "vector_store": vector_store_service is not None,
         "groq_service": groq_service is not None,
         "realtime_service": realtime_service is not None,
-        "chat_service": chat_service is not None
+        "chat_service": chat_service is not None,
+        "startup_phase": startup.phase,
+        "session_cache": chat_service.sessions.stats() if chat_service else None,
+        "groq_keys": groq_service.key_pool.stats() if groq_service else None,
+        "admission": admission_queue.stats() if admission_queue else None,
+        "search_cache": realtime_service.search_cache.stats() if realtime_service else None,
+        "query_cache": vector_store_service.query_cache_stats() if vector_store_service else None,
+        "query_router": groq_service.router.stats() if groq_service else None,
     }
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process is up and serving, whether or not the services have finished loading."""
+    return {"status": "alive", "uptime_seconds": round(startup.uptime(), 3)}
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: 200 once the model, index and services are loaded (and warmed up), else 503; with phase timings."""
+    if startup.ready:
+        return {"status": "ready", **startup.snapshot()}
+    status = "failed" if startup.error else "starting"
+    return JSONResponse(status_code=503, content={"status": status, **startup.snapshot()})
+
+def _cache_metrics(cache: str, stats: dict):
+    metrics.set_value("axiom_cache_hits_total", stats["hits"], kind="counter", cache=cache)
+    metrics.set_value("axiom_cache_misses_total", stats["misses"], kind="counter", cache=cache)
+
+def _collect_service_metrics():
+    """Copy the services' own counters and sizes into the metrics registry before a scrape."""
+    if vector_store_service:
+        store = vector_store_service.vector_store
+        metrics.set_value("axiom_index_vectors", store.index.ntotal if store else 0)
+        query_cache = vector_store_service.query_cache_stats()
+        metrics.set_value("axiom_index_version", query_cache["index_version"])
+        _cache_metrics("query_embedding", query_cache["embeddings"])
+        _cache_metrics("search_results", query_cache["results"])
+    if chat_service:
+        sessions = chat_service.sessions.stats()
+        metrics.set_value("axiom_sessions_cached", sessions["sessions"])
+        metrics.set_value("axiom_session_cache_bytes", sessions["bytes"])
+        _cache_metrics("session", sessions)
+    if realtime_service:
+        search = realtime_service.search_cache.stats()
+        _cache_metrics("tavily", search)
+        metrics.set_value("axiom_tavily_requests_total", search["requests"], kind="counter")
+        metrics.set_value("axiom_tavily_coalesced_total", search["coalesced"], kind="counter")
+    if groq_service:
+        for key in groq_service.key_pool.stats():
+            metrics.set_value("axiom_groq_key_in_flight", key["in_flight"], key=key["key"])
+            metrics.set_value("axiom_groq_key_cooldown_seconds", key["cooldown_seconds"], key=key["key"])
+            metrics.set_value("axiom_groq_key_successes_total", key["successes"], kind="counter", key=key["key"])
+        router = groq_service.router.stats()
+        metrics.set_value("axiom_router_skipped_total", router["searches_skipped"], kind="counter", call="search")
+        metrics.set_value("axiom_router_skipped_total", router["retrievals_skipped"], kind="counter", call="retrieval")
+        metrics.set_value("axiom_router_tokens_saved_total", router["estimated_tokens_saved"], kind="counter")
+    if admission_queue:
+        admission = admission_queue.stats()
+        metrics.set_value("axiom_admission_active", admission["active"])
+        metrics.set_value("axiom_admission_waiting", admission["waiting"])
+        metrics.set_value("axiom_admission_admitted_total", admission["admitted"], kind="counter")
+        metrics.set_value("axiom_admission_rejected_total", admission["rejected"], kind="counter")
+        metrics.set_value("axiom_admission_timed_out_total", admission["timed_out"], kind="counter")
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    _collect_service_metrics()
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+async def _admit(request: ChatRequest, priority: int):
+    """
+    Admission control, before any retrieval or search work: 429 + Retry-After right away if no
+    Groq key can take even a minimal request within the admission timeout, otherwise a slot in
+    the admission queue (which may itself reject with 429 when full or after waiting too long).
+    """
+    wait = groq_service.key_pool.wait_estimate(groq_service.estimate_min_tokens(request.message))
+    if wait > ADMISSION_TIMEOUT_SECONDS:
+        logger.warning(f"Rejecting request: no Groq key available for {wait:.0f}s")
+        raise _too_many_requests(RATE_LIMIT_MESSAGE, wait)
+    try:
+        await admission_queue.acquire(priority)
+    except AdmissionRejected as e:
+        logger.warning(f"Rejecting request: {e}")
+        raise _too_many_requests(BUSY_MESSAGE, e.retry_after)
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     if not chat_service:
-        raise HTTPException(status_code=503, detail="Chat service not initialized")
+        raise _not_ready("Chat service")
     
+    await _admit(request, CHAT_PRIORITY)
+    started = time.monotonic()
     try:
-        session_id = chat_service.get_or_create_session(request.session_id)
-        respomse_text = chat_service.process_message(session_id, request.message)
-        chat_service.save_chat_session(session_id)
+        session_id = await chat_service.aget_or_create_session(request.session_id)
+        # aprocess_message saves the session; indexing happens in the background.
+        respomse_text = await chat_service.aprocess_message(session_id, request.message)
         return ChatResponse(response=respomse_text, session_id=session_id)
     except ValueError as e:
         logger.warning(f"invalid session_id: {e}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        if _is_rate_limit_error(e):
-            logger.warning(f"Rate limit hit: {e}")
-            raise HTTPException(status_code=429, detail=RATE_LIMIT_MESSAGE)
-        logger.error(f"Error processing chat: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
+        raise _chat_error(e, "chat")
+    finally:
+        admission_queue.release(time.monotonic() - started)
     
 @app.post("/chat/realtime", response_model=ChatResponse)
 async def chat_realtime(request: ChatRequest):
     if not chat_service:
-        raise HTTPException(status_code=503, detail="Chat service not initialized")
+        raise _not_ready("Chat service")
 
     if not realtime_service:
-        raise HTTPException(status_code=503, detail="Realtime service not initialized")
+        raise _not_ready("Realtime service")
 
+    await _admit(request, REALTIME_PRIORITY)
+    started = time.monotonic()
     try:
-        session_id = chat_service.get_or_create_session(request.session_id)
+        session_id = await chat_service.aget_or_create_session(request.session_id)
         # Realtime: Tavily search first, then Groq with search results + context
-        response_text = chat_service.process_realtime_message(session_id, request.message)
-        chat_service. save_chat_session(session_id)
+        response_text = await chat_service.aprocess_realtime_message(session_id, request.message)
         return ChatResponse(response=response_text, session_id=session_id)
     except ValueError as e:
         logger.warning(f"Invalid session_id: {e}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        if _is_rate_limit_error(e):
-            logger.warning(f"Rate limit hit: {e}")
-            raise HTTPException(status_code=429, detail=RATE_LIMIT_MESSAGE)
-        logger.error(f"Error processing realtime chat: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
+        raise _chat_error(e, "realtime chat")
+    finally:
+        admission_queue.release(time.monotonic() - started)
     
+def _sse_event(data: dict) -> str:
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _sse_stream(
+    session_id: str, first_chunk: Optional[str], chunks: AsyncIterator[str], started: float,
+) -> AsyncIterator[str]:
+    try:
+        if first_chunk:
+            yield _sse_event({"chunk": first_chunk})
+        async for chunk in chunks:
+            yield _sse_event({"chunk": chunk})
+        yield _sse_event({"done": True, "session_id": session_id})
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band.
+        logger.error(f"Error while streaming chat: {e}", exc_info=True)
+        if _is_busy_error(e):
+            detail = BUSY_MESSAGE
+        elif _is_rate_limit_error(e):
+            detail = RATE_LIMIT_MESSAGE
+        else:
+            detail = f"Error processing chat: {str(e)}"
+        yield _sse_event({"error": detail, "session_id": session_id})
+    finally:
+        # The admission slot is held until the stream ends (or the client goes away).
+        admission_queue.release(time.monotonic() - started)
+
+async def _start_stream(request: ChatRequest, realtime: bool) -> StreamingResponse:
+    """Expects an admission slot; _sse_stream releases it, or this does if the stream never starts."""
+    started = time.monotonic()
+    try:
+        session_id = await chat_service.aget_or_create_session(request.session_id)
+        chunks = chat_service.astream_message(session_id, request.message, realtime=realtime)
+        # Pull the first chunk before answering so key/rate-limit failures still map to HTTP errors.
+        first_chunk = await anext(chunks, None)
+    except BaseException:
+        admission_queue.release(time.monotonic() - started)
+        raise
+    return StreamingResponse(
+        _sse_stream(session_id, first_chunk, chunks, started),
+        media_type="text/event-stream",
+        headers={"X-Session-ID": session_id, "Cache-Control": "no-cache"},
+    )
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    if not chat_service:
+        raise _not_ready("Chat service")
+
+    await _admit(request, CHAT_PRIORITY)
+    try:
+        return await _start_stream(request, realtime=False)
+    except ValueError as e:
+        logger.warning(f"invalid session_id: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise _chat_error(e, "chat stream")
+
+@app.post("/chat/realtime/stream")
+async def chat_realtime_stream(request: ChatRequest):
+    if not chat_service:
+        raise _not_ready("Chat service")
+
+    if not realtime_service:
+        raise _not_ready("Realtime service")
+
+    await _admit(request, REALTIME_PRIORITY)
+    try:
+        return await _start_stream(request, realtime=True)
+    except ValueError as e:
+        logger.warning(f"Invalid session_id: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise _chat_error(e, "realtime chat stream")
+
 @app.get("/chat/history/{session_id}")
 async def get_chat_history(session_id: str):
     if not chat_service:
-        raise HTTPException(status_code=503, detail="Chat service not initialized")
+        raise _not_ready("Chat service")
 
     try:
         messages = chat_service.get_chat_history(session_id)
@@ -4,6 +4,7 @@ from typing import List, Optional
 class ChatMessage(BaseModel):
     role: str
     content: str
+    timestamp: Optional[float] = None
 
 class ChatRequest(BaseModel):
     message: str
@@ -7,9 +7,27 @@ they do not handle HTTP, only chat flow, LLM calls, and data.
 
 MODULES:
     chat_service - Sessions (get/create, load from disk), message list, format history for LLM, save to disk.
+    chat_store - Storage backend interface; default append-only JSON Lines log per session (reads legacy chat_*.json too).
+    sqlite_chat_store - SQLite (WAL) backend: sessions/messages tables, changed-since queries, file migration.
+    session_cache - Bounded LRU of in-memory sessions; evicted sessions are flushed and reloaded lazily.
     groq_service - General chat: retrieve context from vector store, build prompt, call Groq LLM.
-    realtime_service - Realtime chat: Tavily search first, then same as groq (inherits GroqService).
+    realtime_service - Realtime chat: Tavily search and retrieval in parallel, then same as groq (inherits GroqService).
+    query_router - Per-query choice of web search / retrieval / both / neither, with counters for what was skipped.
+    prompts - Prompt templates compiled once (static system prefix + per-request variables) and per-key chains.
+    search_cache - Tavily result cache: TTL (shorter for news-like queries), single-flight coalescing, optional disk persistence.
+    key_pool - Groq API key scheduler: picks the key with most headroom, tracks 429s, cooldowns and in-flight load.
+    rate_limiter - Client-side token buckets per key (requests/min/day, tokens/min/day) consulted by key_pool.
+    admission - Bounded priority admission queue in front of the chat endpoints (429 + Retry-After when full).
     vector store - Load learning_data + chats_data, chunk, embed, FAISS index; provide retriever for context.
+    chunking - Turn-aware chat chunker: one chunk per user/assistant exchange with stable IDs.
+    ann_index - FAISS index factory: flat, HNSW, IVF and IVF-PQ keyed by chunk label, auto-selected by corpus size.
+    index_store - Versioned on-disk index: FAISS snapshot (mmap-loaded), JSONL docstore, manifest, update log.
+    embedding_pipeline - Length-sorted, batched (optionally multi-process) embedding for index builds.
+    embedding_backend - Embedding model factory: torch or ONNX Runtime (int8) with an accuracy check.
+    embedding_cache - On-disk cache of chunk embeddings so rebuilds only embed text they have not seen.
+    history_window - Token-budgeted chat history per session, with an optional background rolling summary.
+    context_packer - Merges, de-duplicates and token-budgets retrieved chunks before they reach the prompt.
+    indexer - Background worker that batches chat-session index updates off the request path.
 """
 
 
@@ -0,0 +1,92 @@
+import asyncio
+import heapq
+import itertools
+from typing import List
+
+from config import ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_TIMEOUT_SECONDS
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Request not admitted ({reason}); retry in {retry_after:.0f}s")
+
+
+class AdmissionQueue:
+    """
+    Bounded priority queue in front of the chat pipeline (event-loop only, not thread-safe).
+
+    At most max_concurrent requests run at once; up to max_queue more wait, lowest priority
+    value first, for at most timeout seconds. Anything beyond that is rejected at once with
+    a Retry-After estimate instead of piling up behind a rate-limited backend.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        timeout: float = ADMISSION_TIMEOUT_SECONDS,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._active = 0
+        self._waiting = 0
+        self._heap: List[list] = []
+        self._seq = itertools.count()
+        self._avg_service_seconds = 5.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def retry_after(self) -> float:
+        # Time for the queue ahead to drain at the observed service rate.
+        return max(1.0, self._avg_service_seconds * (self._waiting + 1) / self.max_concurrent)
+
+    async def acquire(self, priority: int = 0):
+        if self._active < self.max_concurrent and self._waiting == 0:
+            self._active += 1
+            self.admitted += 1
+            return
+        if self._waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected("queue full", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, [priority, next(self._seq), future])
+        self._waiting += 1
+        try:
+            # release() hands its slot straight to us by resolving the future.
+            await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise AdmissionRejected("timed out waiting", self.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            self._waiting -= 1
+        self.admitted += 1
+
+    def release(self, service_seconds: float = None):
+        if service_seconds is not None:
+            self._avg_service_seconds = 0.8 * self._avg_service_seconds + 0.2 * service_seconds
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active = max(0, self._active - 1)
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "waiting": self._waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_service_seconds": round(self._avg_service_seconds, 2),
+        }
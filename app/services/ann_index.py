@@ -0,0 +1,142 @@
+import logging
+import math
+
+import faiss
+import numpy as np
+
+from config import (
+    VECTOR_INDEX_TYPE,
+    VECTOR_INDEX_AUTO_THRESHOLD,
+    VECTOR_INDEX_USE_PQ,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    IVF_NLIST,
+    IVF_NPROBE,
+    PQ_M,
+)
+
+logger = logging.getLogger("A.X.I.O.M")
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq")
+
+# FAISS recommends roughly this many training points per IVF list / PQ centroid.
+_MIN_POINTS_PER_LIST = 39
+_PQ_CENTROIDS = 256
+
+
+def choose_index_type(n_vectors: int) -> str:
+    """Resolve VECTOR_INDEX_TYPE ("auto" picks an ANN index once the corpus is large enough)."""
+    index_type = VECTOR_INDEX_TYPE
+    if index_type == "auto":
+        if n_vectors < VECTOR_INDEX_AUTO_THRESHOLD:
+            return "flat"
+        index_type = "ivfpq" if VECTOR_INDEX_USE_PQ else "hnsw"
+    if index_type not in INDEX_TYPES:
+        logger.warning("Unknown VECTOR_INDEX_TYPE %r, using flat", index_type)
+        return "flat"
+    return index_type
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """The index under an IndexIDMap2 wrapper (or index itself)."""
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def index_kind(index: faiss.Index) -> str:
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def with_ids(index: faiss.Index) -> faiss.Index:
+    """
+    Make an empty index addressable by chunk label, so chunks are added and removed in place
+    (add_with_ids / remove_ids). IVF stores labels itself; IndexIDMap2 would assume remove_ids
+    renumbers the sub-index like a flat one, so IVF gets a hashtable direct map instead.
+    """
+    if isinstance(index, faiss.IndexIVF):
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    # HNSW graphs cannot drop vectors; such indexes are rebuilt from their own stored vectors.
+    return not isinstance(base_index(index), faiss.IndexHNSW)
+
+
+def exact_vectors(index: faiss.Index) -> bool:
+    """True if reconstruct() returns the vectors as added (not PQ approximations)."""
+    return index_kind(index) != "ivfpq"
+
+
+def _nlist_for(n_vectors: int) -> int:
+    nlist = IVF_NLIST or int(4 * math.sqrt(n_vectors))
+    return max(1, min(nlist, n_vectors // _MIN_POINTS_PER_LIST))
+
+
+def buildable_index_type(index_type: str, n_vectors: int, dim: int) -> str:
+    """Downgrade IVF / IVF-PQ when there are too few vectors to train them."""
+    if index_type in ("ivf", "ivfpq") and n_vectors < _MIN_POINTS_PER_LIST:
+        return "flat"
+    if index_type == "ivfpq" and (dim % PQ_M != 0 or n_vectors < _PQ_CENTROIDS * _MIN_POINTS_PER_LIST // 4):
+        return "ivf"
+    return index_type
+
+
+def needs_type_change(index: faiss.Index, n_vectors: int) -> bool:
+    """
+    True if the index should be rebuilt as a different type for a corpus of n_vectors,
+    e.g. a flat index that grew past the auto threshold. Shrinking below the threshold
+    never switches back to flat, so the index does not flip-flop around it.
+    """
+    wanted = buildable_index_type(choose_index_type(n_vectors), n_vectors, index.d)
+    current = index_kind(index)
+    if wanted == current:
+        return False
+    return wanted != "flat" or VECTOR_INDEX_TYPE == "flat"
+
+
+def build_index(vectors: np.ndarray, index_type: str) -> faiss.Index:
+    """Create an empty (trained, where needed) label-addressable L2 index of the requested type for these vectors."""
+    n_vectors, dim = vectors.shape
+    buildable = buildable_index_type(index_type, n_vectors, dim)
+    if buildable != index_type:
+        logger.info("Too few vectors (%s) to build a %s index, using %s", n_vectors, index_type, buildable)
+        index_type = buildable
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type in ("ivf", "ivfpq"):
+        nlist = _nlist_for(n_vectors)
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivfpq":
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_M, 8)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+    else:
+        index = faiss.IndexFlatL2(dim)
+
+    index = with_ids(index)
+    apply_search_params(index)
+    logger.info("Built %s index for %s vectors", index_kind(index), n_vectors)
+    return index
+
+
+def apply_search_params(index: faiss.Index, nprobe: int = None, ef_search: int = None):
+    """Set search-time accuracy/speed knobs (IVF nprobe, HNSW efSearch); no-op for flat indexes."""
+    index = base_index(index)
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(nprobe or IVF_NPROBE, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search or HNSW_EF_SEARCH
@@ -1,12 +1,17 @@
-import json
+import asyncio
 import logging
-from pathlib import Path
-from typing import List, Optional, Dict
+import threading
+import time
+from typing import AsyncIterator, List, Optional, Dict, Tuple
 import uuid
-from config import CHATS_DATA_DIR, MAX_CHAT_HISTORY_TURNS
+from config import HISTORY_SUMMARY_ENABLED, SESSION_CACHE_MAX_SESSIONS, SESSION_CACHE_MAX_BYTES
 from app.models import ChatMessage, ChatHistory
+from app.services.chat_store import ChatStore, create_chat_store
+from app.services.session_cache import SessionCache
+from app.services.history_window import HistoryWindow
 from app.services.groq_service import GroqService
 from app.services.realtime_service import RealtimeGroqService
+from app.utils.metrics import span
 
 
 logger = logging.getLogger("A.X.I.O.M")
@@ -16,30 +21,54 @@ class ChatService:
         self,
         groq_service: GroqService,
         vector_store_service,
-        realtime_service: RealtimeGroqService = None
+        realtime_service: RealtimeGroqService = None,
+        indexer=None,
+        store: Optional[ChatStore] = None,
     ):
         self.groq_service = groq_service
         self.vector_store_service = vector_store_service
         self.realtime_service = realtime_service
-        self.sessions: Dict[str, List[ChatMessage]] = {}
-    def load_session_from_disk(self, session_id: str) -> bool:
-        safe_session_id = session_id.replace("-", "").replace(" ", "_")
-        filename = f"chat_{safe_session_id}.json"
-        filepath = CHATS_DATA_DIR / filename
-        if not filepath.exists():
-            return False
+        self.indexer = indexer
+        self.store = store or create_chat_store()
+        # Bounded LRU of live sessions; evicted sessions are flushed and reloaded on next access.
+        self.sessions = SessionCache(
+            max_sessions=SESSION_CACHE_MAX_SESSIONS,
+            max_bytes=SESSION_CACHE_MAX_BYTES,
+            on_evict=self._on_session_evicted,
+            on_drop=self._on_session_dropped,
+        )
+        # Number of messages per session already written to the session log.
+        self._saved_counts: Dict[str, int] = {}
+        self._save_lock = threading.Lock()
+        # Token-budgeted history selection (plus optional background summary of older turns).
+        self.history_window = HistoryWindow(
+            summarizer=groq_service.summarize_history if HISTORY_SUMMARY_ENABLED else None,
+        )
+    def _read_session(self, session_id: str) -> Optional[List[ChatMessage]]:
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                chat_dict = json.load(f)
+            stored = self.store.load(session_id)
+            if stored is None:
+                return None
             messages = [
-            ChatMessage(role=msg.get("role"), content=msg.get("content"))
-            for msg in chat_dict.get("messages", [])
+            ChatMessage(role=msg.get("role"), content=msg.get("content"), timestamp=msg.get("ts"))
+            for msg in stored
             ]
-            self.sessions[session_id] = messages
-            return True
+            self._saved_counts[session_id] = len(messages)
+            return messages
         except Exception as e:
             logger.warning("Failed to load session %s from disk: %s", session_id, e)
+            return None
+    def load_session_from_disk(self, session_id: str) -> bool:
+        messages = self._read_session(session_id)
+        if messages is None:
             return False
+        self.sessions[session_id] = messages
+        return True
+    def _on_session_evicted(self, session_id: str, messages: List[ChatMessage]) -> bool:
+        return self._persist(session_id, messages)
+    def _on_session_dropped(self, session_id: str):
+        self._saved_counts.pop(session_id, None)
+        self.history_window.forget(session_id)
     def validate_session_id(self, session_id: str) -> bool:
         if not session_id or not session_id.strip():
             return False
@@ -49,6 +78,9 @@ class ChatService:
             return False
         return True
     def get_or_create_session(self, session_id: Optional[str] = None) -> str:
+        with span("session_load"):
+            return self._get_or_create_session(session_id)
+    def _get_or_create_session(self, session_id: Optional[str] = None) -> str:
         if not session_id:
             new_session_id = str(uuid.uuid4())
             self.sessions[new_session_id] = []
@@ -58,42 +90,39 @@ class ChatService:
                 f"Invalid session_id format: {session_id}. Session ID must be non-empty, "
                 "not contain path traversal characters, and be under 255 characters."
             )
-        if session_id in self.sessions:
+        if self.sessions.get(session_id) is not None:
             return session_id
         if self.load_session_from_disk(session_id):
             return session_id
         self.sessions[session_id] = []
         return session_id
     def add_message(self, session_id: str, role: str, content: str):
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
-        self.sessions[session_id].append(ChatMessage(role=role, content=content))
+        self.sessions.append(
+            session_id,
+            ChatMessage(role=role, content=content, timestamp=time.time()),
+            loader=lambda: self._read_session(session_id),
+        )
     def get_chat_history(self, session_id: str) -> List[ChatMessage]:
-        return self.sessions.get(session_id, [])
+        messages = self.sessions.get(session_id)
+        if messages is None and self.load_session_from_disk(session_id):
+            messages = self.sessions.peek(session_id)
+        return messages or []
+    def history_for_llm(self, session_id: str, exclude_last: bool = False) -> Tuple[List[tuple], Optional[str]]:
+        """(user/assistant pairs within the history token budget, rolling summary of older turns or None)."""
+        with span("history"):
+            messages = self.get_chat_history(session_id)
+            return self.history_window.select(session_id, messages, exclude_last=exclude_last)
     def format_history_for_llm(self, session_id: str, exclude_last: bool = False) -> List[tuple]:
-        messages = self.get_chat_history(session_id)
-        history = []
-        messages_to_process = messages[ :- 1] if exclude_last and messages else messages
-        i = 0
-        while i < len(messages_to_process) - 1:
-            user_msg = messages_to_process[i]
-            ai_msg = messages_to_process[i + 1]
-            if user_msg.role == "user" and ai_msg.role == "assistant":
-                history.append((user_msg.content, ai_msg.content))
-                i += 2
-            else:
-                i += 1
-        if len(history) > MAX_CHAT_HISTORY_TURNS:
-            history = history[-MAX_CHAT_HISTORY_TURNS:]
-        return history
+        return self.history_for_llm(session_id, exclude_last)[0]
     def process_message(self, session_id: str, user_message: str) -> str:
         self.add_message(session_id, "user", user_message)
 
-        chat_history = self.format_history_for_llm(session_id, exclude_last=True)
+        chat_history, history_summary = self.history_for_llm(session_id, exclude_last=True)
 
         response = self.groq_service.get_response(
             question=user_message,
-            chat_history=chat_history
+            chat_history=chat_history,
+            history_summary=history_summary,
         )
 
         self.add_message(session_id, "assistant", response or "No response generated.")
@@ -101,8 +130,8 @@ class ChatService:
         # Save chat session to disk
         self.save_chat_session(session_id)
 
-        # Update vector memory so AXIOM learns the conversation
-        self.vector_store_service.create_vector_store()
+        # Update vector memory so AXIOM learns the conversation (only this session is re-indexed)
+        self._schedule_index_update(session_id)
 
         return response
     def process_realtime_message(self, session_id: str, user_message: str) -> str:
@@ -111,11 +140,12 @@ class ChatService:
 
         self.add_message(session_id, "user", user_message)
 
-        chat_history = self.format_history_for_llm(session_id, exclude_last=True)
+        chat_history, history_summary = self.history_for_llm(session_id, exclude_last=True)
 
         response = self.realtime_service.get_response(
             question=user_message,
-            chat_history=chat_history
+            chat_history=chat_history,
+            history_summary=history_summary,
         )
 
         self.add_message(session_id, "assistant", response or "No response generated.")
@@ -123,23 +153,115 @@ class ChatService:
         # Save chat session
         self.save_chat_session(session_id)
 
-        # Update vector memory
-        self.vector_store_service.create_vector_store()
+        # Update vector memory (only this session is re-indexed)
+        self._schedule_index_update(session_id)
+
+        return response
+    async def aget_or_create_session(self, session_id: Optional[str] = None) -> str:
+        # May read the session file from disk, so keep it off the event loop.
+        return await asyncio.to_thread(self.get_or_create_session, session_id)
+    async def aadd_message(self, session_id: str, role: str, content: str):
+        # Appending can evict (and persist) another session or reload this one from disk.
+        await asyncio.to_thread(self.add_message, session_id, role, content)
+    async def _afinish_turn(self, session_id: str, response: str):
+        await self.aadd_message(session_id, "assistant", response or "No response generated.")
+
+        # Save chat session to disk without blocking the event loop
+        await asyncio.to_thread(self.save_chat_session, session_id)
+
+        # Update vector memory (only this session is re-indexed)
+        if self.indexer:
+            self._schedule_index_update(session_id)
+        else:
+            await asyncio.to_thread(self._schedule_index_update, session_id)
+    async def aprocess_message(self, session_id: str, user_message: str) -> str:
+        await self.aadd_message(session_id, "user", user_message)
+
+        chat_history, history_summary = await asyncio.to_thread(self.history_for_llm, session_id, True)
+
+        response = await self.groq_service.aget_response(
+            question=user_message,
+            chat_history=chat_history,
+            history_summary=history_summary,
+        )
+
+        await self._afinish_turn(session_id, response)
 
         return response
+    async def aprocess_realtime_message(self, session_id: str, user_message: str) -> str:
+        if not self.realtime_service:
+            raise ValueError("Realtime service is not initialized. Cannot process realtime queries.")
+
+        await self.aadd_message(session_id, "user", user_message)
+
+        chat_history, history_summary = await asyncio.to_thread(self.history_for_llm, session_id, True)
+
+        response = await self.realtime_service.aget_response(
+            question=user_message,
+            chat_history=chat_history,
+            history_summary=history_summary,
+        )
+
+        await self._afinish_turn(session_id, response)
+
+        return response
+    async def astream_message(self, session_id: str, user_message: str, realtime: bool = False) -> AsyncIterator[str]:
+        """Yield the reply chunk by chunk; the assistant message is saved once the stream completes."""
+        if realtime and not self.realtime_service:
+            raise ValueError("Realtime service is not initialized. Cannot process realtime queries.")
+        service = self.realtime_service if realtime else self.groq_service
+
+        await self.aadd_message(session_id, "user", user_message)
+
+        chat_history, history_summary = await asyncio.to_thread(self.history_for_llm, session_id, True)
+
+        parts = []
+        async for chunk in service.astream_response(
+            question=user_message, chat_history=chat_history, history_summary=history_summary,
+        ):
+            parts.append(chunk)
+            yield chunk
+
+        await self._afinish_turn(session_id, "".join(parts))
+    def _schedule_index_update(self, session_id: str):
+        if self.indexer:
+            self.indexer.notify(session_id)
+        else:
+            self.vector_store_service.update_chat_sessions([session_id])
     def save_chat_session(self, session_id: str):
-        if session_id not in self.sessions or not self.sessions[session_id]:
-            return
-        messages = self. sessions[session_id]
-        safe_session_id = session_id.replace("-", "").replace(" ", "_")
-        filename = f"chat_{safe_session_id}.json"
-        filepath = CHATS_DATA_DIR / filename
-        chat_dict = {
-            "session_id": session_id,
-            "messages": [{"role": msg.role, "content": msg.content} for msg in messages]
-        }
-        try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(chat_dict, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error("Failed to save chat session %s to disk: %s", session_id, e)
\ No newline at end of file
+        """Append the messages not yet on disk to the session log (O(new messages), not O(session))."""
+        messages = self.sessions.peek(session_id)
+        if messages:
+            with span("session_save"):
+                self._persist(session_id, messages)
+    def flush_sessions(self):
+        """Save every cached session that has unsaved messages (used on shutdown)."""
+        for session_id in self.sessions.keys():
+            self.save_chat_session(session_id)
+    def _persist(self, session_id: str, messages: List[ChatMessage]) -> bool:
+        """Append the unsaved tail of `messages`; False if the store could not be written."""
+        with self._save_lock:
+            # A list that is no longer the cached one was flushed when it was evicted.
+            if self.sessions.peek(session_id) is not messages:
+                return True
+            saved = self._saved_counts.get(session_id, 0)
+            if saved >= len(messages):
+                return True
+            total = len(messages)
+            new_records = [self._message_record(msg) for msg in messages[saved:total]]
+            try:
+                self.store.append(
+                    session_id, new_records, saved,
+                    lambda: [self._message_record(msg) for msg in messages[:total]],
+                )
+                self._saved_counts[session_id] = total
+            except Exception as e:
+                logger.error("Failed to save chat session %s to disk: %s", session_id, e)
+                return False
+            return True
+    @staticmethod
+    def _message_record(msg: ChatMessage) -> dict:
+        record = {"role": msg.role, "content": msg.content}
+        if msg.timestamp is not None:
+            record["ts"] = msg.timestamp
+        return record
@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from config import CHATS_DATA_DIR, CHAT_STORE_BACKEND, CHAT_STORE_SQLITE_PATH
+
+logger = logging.getLogger("A.X.I.O.M")
+
+SESSION_LOG_VERSION = 1
+
+
+def session_file_stem(session_id: str) -> str:
+    safe_session_id = session_id.replace("-", "").replace(" ", "_")
+    return f"chat_{safe_session_id}"
+
+
+def session_source(session_id: str) -> str:
+    """Vector-store source name for a session (same for every storage backend)."""
+    return f"chat_{session_file_stem(session_id)}"
+
+
+def _fsync_dir(directory: Path):
+    # Make the rename itself durable; not supported on every platform.
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def read_session_file(file_path: Path) -> Tuple[Optional[str], List[dict]]:
+    """
+    Read a session from either format:
+    - chat_<id>.jsonl: a header record followed by one message record per line
+    - chat_<id>.json: the legacy single JSON document {"session_id", "messages"}
+    Returns (session_id, messages) where each message is a dict with role/content (and ts when known).
+    """
+    if file_path.suffix == ".json":
+        with open(file_path, "r", encoding="utf-8") as f:
+            chat_dict = json.load(f)
+        return chat_dict.get("session_id"), list(chat_dict.get("messages", []))
+
+    session_id = None
+    messages = []
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line from an interrupted append; everything before it is intact.
+                logger.warning("Skipping unreadable record %s in %s", line_no, file_path)
+                continue
+            if record.get("type") == "header":
+                session_id = record.get("session_id")
+            elif record.get("type") == "message":
+                messages.append({k: v for k, v in record.items() if k != "type"})
+    return session_id, messages
+
+
+class ChatStore(ABC):
+    """
+    Storage backend for chat sessions, shared by ChatService and VectorStoreService.
+    Messages are dicts with role, content and (when known) ts.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[List[dict]]:
+        """The stored messages of the session, or None if it was never saved."""
+
+    @abstractmethod
+    def append(self, session_id: str, messages: List[dict], start: int, all_messages: Callable[[], List[dict]]):
+        """
+        Persist `messages`, the tail of the session from index `start` on that is not stored yet.
+        `all_messages()` builds the full session, for backends that sometimes need to rewrite it.
+        """
+
+    @abstractmethod
+    def compact(self, session_id: str, messages: List[dict]):
+        """Replace everything stored for the session with `messages`."""
+
+    @abstractmethod
+    def session_ids(self) -> List[str]:
+        """IDs of every stored session."""
+
+    @abstractmethod
+    def changed_since(self, timestamp: float) -> List[str]:
+        """IDs of sessions written to after `timestamp` (seconds since the epoch)."""
+
+
+class FileChatStore(ChatStore):
+    """
+    Append-only, one-log-per-session storage under CHATS_DATA_DIR.
+
+    Each turn appends only the new message records (flushed and fsynced). Full
+    rewrites go through a temp file + fsync + atomic rename, which is also how
+    legacy chat_<id>.json files are migrated the first time they are written to.
+    """
+
+    def __init__(self, directory: Path = CHATS_DATA_DIR):
+        self.directory = directory
+
+    def log_path(self, session_id: str) -> Path:
+        return self.directory / f"{session_file_stem(session_id)}.jsonl"
+
+    def legacy_path(self, session_id: str) -> Path:
+        return self.directory / f"{session_file_stem(session_id)}.json"
+
+    def load(self, session_id: str) -> Optional[List[dict]]:
+        for path in (self.log_path(session_id), self.legacy_path(session_id)):
+            if path.exists():
+                return read_session_file(path)[1]
+        return None
+
+    def append(self, session_id: str, messages: List[dict], start: int, all_messages: Callable[[], List[dict]]):
+        # The full session is only built when the log has to be written from scratch,
+        # e.g. to migrate a legacy .json file.
+        if not messages:
+            return
+        log_path = self.log_path(session_id)
+        if not log_path.exists():
+            self.compact(session_id, all_messages())
+            return
+        with open(log_path, "rb+") as f:
+            # Start on a fresh line if a previous append was cut off mid-record.
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            f.write("".join(self._message_line(msg) for msg in messages).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self, session_id: str, messages: List[dict]):
+        """Atomically rewrite the whole session log and drop any legacy .json copy."""
+        log_path = self.log_path(session_id)
+        tmp_path = log_path.with_name(log_path.name + ".tmp")
+        header = {"type": "header", "version": SESSION_LOG_VERSION, "session_id": session_id}
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header, ensure_ascii=False) + "\n")
+            f.write("".join(self._message_line(msg) for msg in messages))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, log_path)
+        _fsync_dir(self.directory)
+        legacy_path = self.legacy_path(session_id)
+        if legacy_path.exists():
+            legacy_path.unlink()
+
+    def iter_session_files(self) -> Iterator[Path]:
+        """Every session file, preferring the .jsonl log when both formats exist."""
+        logs = sorted(self.directory.glob("chat_*.jsonl"))
+        log_stems = {path.stem for path in logs}
+        yield from logs
+        for path in sorted(self.directory.glob("*.json")):
+            if path.stem not in log_stems:
+                yield path
+
+    def _read_session_id(self, file_path: Path) -> Optional[str]:
+        try:
+            if file_path.suffix == ".jsonl":
+                # The header is the first line, so there is no need to read the whole log.
+                with open(file_path, "r", encoding="utf-8") as f:
+                    return json.loads(f.readline()).get("session_id")
+            return read_session_file(file_path)[0]
+        except Exception as e:
+            logger.warning("Could not read session id from %s: %s", file_path, e)
+            return None
+
+    def session_ids(self) -> List[str]:
+        ids = (self._read_session_id(path) for path in self.iter_session_files())
+        return [session_id for session_id in ids if session_id]
+
+    def changed_since(self, timestamp: float) -> List[str]:
+        ids = (
+            self._read_session_id(path)
+            for path in self.iter_session_files()
+            if path.stat().st_mtime > timestamp
+        )
+        return [session_id for session_id in ids if session_id]
+
+    @staticmethod
+    def _message_line(msg: dict) -> str:
+        return json.dumps({"type": "message", **msg}, ensure_ascii=False) + "\n"
+
+
+def create_chat_store() -> ChatStore:
+    """Build the backend selected by CHAT_STORE_BACKEND ("file" or "sqlite")."""
+    if CHAT_STORE_BACKEND == "sqlite":
+        from app.services.sqlite_chat_store import SqliteChatStore
+        return SqliteChatStore(CHAT_STORE_SQLITE_PATH)
+    if CHAT_STORE_BACKEND != "file":
+        logger.warning("Unknown CHAT_STORE_BACKEND %r, using file storage", CHAT_STORE_BACKEND)
+    return FileChatStore(CHATS_DATA_DIR)
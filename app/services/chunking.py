@@ -0,0 +1,72 @@
+import hashlib
+from typing import List, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+def group_turns(messages: List[dict]) -> List[Tuple[int, List[dict]]]:
+    """
+    Group a session into exchanges: each user message starts a new turn and the
+    assistant replies that follow belong to it. Returns (turn_index, messages) pairs.
+    """
+    turns: List[Tuple[int, List[dict]]] = []
+    for msg in messages:
+        if msg.get("role") == "user" or not turns:
+            turns.append((len(turns), []))
+        turns[-1][1].append(msg)
+    return turns
+
+
+def _format_turn(messages: List[dict]) -> str:
+    return "\n".join(
+        f"User: {msg.get('content', '')}" if msg.get("role") == "user"
+        else f"Assistant: {msg.get('content', '')}"
+        for msg in messages
+    )
+
+
+class TurnChunker:
+    """
+    Turns a chat session into one chunk per user/assistant exchange. Only turns longer
+    than max_chars are split further. Chunk IDs are built from the session source, turn
+    and part index plus a short content hash, so appending a turn leaves every earlier
+    chunk ID unchanged and only the new turn needs embedding.
+    """
+
+    def __init__(self, text_splitter: RecursiveCharacterTextSplitter, max_chars: int):
+        self.text_splitter = text_splitter
+        self.max_chars = max_chars
+
+    def _split_turn(self, turn_messages: List[dict], text: str) -> List[str]:
+        # Keep a short question attached to every part of a long answer so each part stays retrievable.
+        question = _format_turn([m for m in turn_messages if m.get("role") == "user"])
+        answer = _format_turn([m for m in turn_messages if m.get("role") != "user"])
+        if question and answer and len(question) <= self.max_chars // 4:
+            return [f"{question}\n{part}" for part in self.text_splitter.split_text(answer)]
+        return self.text_splitter.split_text(text)
+
+    def chunk_session(self, session_id: str, source: str, messages: List[dict]) -> List[Document]:
+        chunks = []
+        for turn_index, turn_messages in group_turns(messages):
+            text = _format_turn(turn_messages)
+            if not text.strip():
+                continue
+            parts = [text] if len(text) <= self.max_chars else self._split_turn(turn_messages, text)
+            timestamp = next((m["ts"] for m in turn_messages if m.get("ts") is not None), None)
+            for part_index, part in enumerate(parts):
+                digest = hashlib.sha1(part.encode("utf-8")).hexdigest()[:12]
+                metadata = {
+                    "source": source,
+                    "session_id": session_id,
+                    "turn": turn_index,
+                    "part": part_index,
+                }
+                if timestamp is not None:
+                    metadata["timestamp"] = timestamp
+                chunks.append(Document(
+                    id=f"{source}:{turn_index}:{part_index}:{digest}",
+                    page_content=part,
+                    metadata=metadata,
+                ))
+        return chunks
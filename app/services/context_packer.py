@@ -0,0 +1,157 @@
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config import (
+    CHUNK_OVERLAP,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_DEDUPE_THRESHOLD,
+    CONTEXT_USE_MMR,
+    CONTEXT_MMR_LAMBDA,
+)
+from app.utils.tokens import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger("A.X.I.O.M")
+
+# Shortest shared text treated as splitter overlap (rather than coincidence) when merging.
+MIN_MERGE_OVERLAP = 40
+# A cut-off final chunk is only worth including if at least this many tokens fit.
+MIN_PARTIAL_TOKENS = 50
+
+
+def _merge_overlap(first: str, second: str, max_overlap: int) -> Optional[str]:
+    """first + second with the shared splitter overlap removed, or None if they don't overlap."""
+    head = second[:MIN_MERGE_OVERLAP]
+    if len(head) < MIN_MERGE_OVERLAP:
+        return None
+    start = max(0, len(first) - max_overlap - len(head))
+    pos = first.find(head, start)
+    while pos != -1:
+        tail = first[pos:]
+        if second.startswith(tail):
+            return first + second[len(tail):]
+        pos = first.find(head, pos + 1)
+    return None
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = text.lower().split()
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _mmr_order(query_vector: Sequence[float], doc_vectors: Sequence[Sequence[float]], lambda_mult: float) -> List[int]:
+    q = np.asarray(query_vector, dtype=np.float32)
+    d = np.asarray(doc_vectors, dtype=np.float32)
+    q = q / max(np.linalg.norm(q), 1e-12)
+    d = d / np.clip(np.linalg.norm(d, axis=1, keepdims=True), 1e-12, None)
+    relevance = d @ q
+    similarity = d @ d.T
+    selected: List[int] = []
+    remaining = list(range(len(d)))
+    while remaining:
+        if selected:
+            redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+        scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy
+        best = remaining[int(np.argmax(scores))]
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+
+class ContextPacker:
+    """
+    Turns retrieved chunks into the context block for the prompt:
+    optional MMR reordering -> merge splitter-overlapping chunks from the same source ->
+    drop near-duplicates -> pack in rank order up to token_budget tokens.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        dedupe_threshold: float = CONTEXT_DEDUPE_THRESHOLD,
+        use_mmr: bool = CONTEXT_USE_MMR,
+        mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+        separator: str = "\n",
+    ):
+        self.token_budget = token_budget
+        self.dedupe_threshold = dedupe_threshold
+        self.use_mmr = use_mmr
+        self.mmr_lambda = mmr_lambda
+        self.separator = separator
+
+    def _merge(self, docs: List[Document]) -> List[Document]:
+        merged: List[Document] = []
+        for doc in docs:
+            source = doc.metadata.get("source")
+            for i, kept in enumerate(merged):
+                if kept.metadata.get("source") != source:
+                    continue
+                # Either order: the lower-ranked chunk may be the earlier one in the file.
+                text = (_merge_overlap(kept.page_content, doc.page_content, CHUNK_OVERLAP)
+                        or _merge_overlap(doc.page_content, kept.page_content, CHUNK_OVERLAP))
+                if text is not None:
+                    merged[i] = Document(page_content=text, metadata=kept.metadata)
+                    break
+            else:
+                merged.append(doc)
+        return merged
+
+    def _dedupe(self, docs: List[Document]) -> List[Document]:
+        kept: List[Document] = []
+        kept_shingles: List[set] = []
+        for doc in docs:
+            text = doc.page_content
+            shingles = _shingles(text)
+            duplicate = False
+            for other, other_shingles in zip(kept, kept_shingles):
+                if text in other.page_content:
+                    duplicate = True
+                    break
+                union = shingles | other_shingles
+                if union and len(shingles & other_shingles) / len(union) >= self.dedupe_threshold:
+                    duplicate = True
+                    break
+            if not duplicate:
+                kept.append(doc)
+                kept_shingles.append(shingles)
+        return kept
+
+    def _pack(self, docs: List[Document]) -> List[str]:
+        parts: List[str] = []
+        used = 0
+        separator_tokens = count_tokens(self.separator)
+        for doc in docs:
+            cost = count_tokens(doc.page_content) + (separator_tokens if parts else 0)
+            if used + cost <= self.token_budget:
+                parts.append(doc.page_content)
+                used += cost
+                continue
+            remaining = self.token_budget - used - (separator_tokens if parts else 0)
+            if remaining >= MIN_PARTIAL_TOKENS:
+                parts.append(truncate_to_tokens(doc.page_content, remaining))
+            break
+        return parts
+
+    def pack(
+        self,
+        docs: List[Document],
+        query_vector: Optional[Sequence[float]] = None,
+        doc_vectors: Optional[Sequence[Sequence[float]]] = None,
+    ) -> str:
+        if not docs:
+            return ""
+        if self.use_mmr and query_vector is not None and doc_vectors is not None and len(docs) > 1:
+            docs = [docs[i] for i in _mmr_order(query_vector, doc_vectors, self.mmr_lambda)]
+        unique = self._dedupe(self._merge(list(docs)))
+        parts = self._pack(unique)
+        logger.debug(
+            "Packed context: %s retrieved -> %s unique -> %s packed (budget %s tokens)",
+            len(docs), len(unique), len(parts), self.token_budget,
+        )
+        return self.separator.join(parts)
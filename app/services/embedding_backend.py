@@ -0,0 +1,223 @@
+import json
+import logging
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_DIR,
+    EMBEDDING_ONNX_QUANTIZE,
+    EMBEDDING_ONNX_MIN_COSINE,
+)
+
+logger = logging.getLogger("A.X.I.O.M")
+
+ONNX_META_FILE = "export.json"
+# all-MiniLM-L6-v2's sentence-transformers max_seq_length; longer inputs are truncated the same way.
+MAX_SEQ_LENGTH = 256
+
+# Fixed sentences used to compare the exported model with the torch one.
+_ACCURACY_SAMPLES = [
+    "What is the capital of France?",
+    "hi",
+    "Explain how a transformer model uses attention to weigh tokens in a sequence.",
+    "User: remind me what we talked about yesterday\nAssistant: We discussed your trip to Tokyo.",
+    "The quick brown fox jumps over the lazy dog.",
+    "Stock markets fell sharply today after the central bank raised interest rates by half a point.",
+    "def add(a, b):\n    return a + b",
+    "Mujhe kal subah 7 baje yaad dilana.",
+]
+
+
+def set_torch_threads(threads: int):
+    if threads <= 0:
+        return
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def cosine_agreement(candidate: Embeddings, reference: Embeddings, texts: List[str]) -> Tuple[float, float]:
+    """(min, mean) cosine similarity between two models' embeddings of the same texts."""
+    a = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    b = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    a /= np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b /= np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    sims = (a * b).sum(axis=1)
+    return float(sims.min()), float(sims.mean())
+
+
+def _torch_embeddings(batch_size: int) -> Embeddings:
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"batch_size": batch_size},
+    )
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence-transformer embeddings run through ONNX Runtime (optionally int8-quantized).
+
+    Reproduces the sentence-transformers pipeline (tokenize, mean-pool over the attention
+    mask, L2-normalize) with only onnxruntime + tokenizers loaded, so torch never has to be
+    imported at serve time.
+    """
+
+    def __init__(self, model_dir: Path, quantized: bool, batch_size: int = 64, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir
+        self.quantized = quantized
+        self.batch_size = max(1, batch_size)
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(model_dir / ("model_int8.onnx" if quantized else "model.onnx")),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+    @property
+    def model_id(self) -> str:
+        return f"{EMBEDDING_MODEL}+onnx{'-int8' if self.quantized else ''}"
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        results: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self.tokenizer.encode_batch(texts[start:start + self.batch_size])
+            mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+            feeds = {
+                "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+                "attention_mask": mask,
+            }
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encoded], dtype=np.int64)
+            hidden = self.session.run(None, feeds)[0]
+            weights = mask[..., None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            results.extend(pooled.tolist())
+        return results
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+
+def read_export_meta(model_dir: Path) -> Optional[dict]:
+    try:
+        with open(model_dir / ONNX_META_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def export_onnx_model(model_dir: Path, quantize: bool) -> dict:
+    """
+    One-off export of EMBEDDING_MODEL to ONNX (plus dynamic int8 quantization), then an
+    accuracy check against the torch model. The meta file is written last and marks a
+    complete export. Run through export_onnx.py, never at server startup.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    started = time.perf_counter()
+    model_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL)
+    tokenizer.save_pretrained(str(model_dir))
+    model = AutoModel.from_pretrained(EMBEDDING_MODEL).eval()
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    fp32_path = model_dir / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(fp32_path), str(model_dir / "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+    min_cos, mean_cos = cosine_agreement(
+        OnnxEmbeddings(model_dir, quantized=quantize),
+        _torch_embeddings(batch_size=len(_ACCURACY_SAMPLES)),
+        _ACCURACY_SAMPLES,
+    )
+    meta = {
+        "model": EMBEDDING_MODEL,
+        "quantized": quantize,
+        "min_cosine": round(min_cos, 5),
+        "mean_cosine": round(mean_cos, 5),
+        "exported_at": time.time(),
+    }
+    with open(model_dir / ONNX_META_FILE, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    logger.info(
+        "Exported %s to ONNX%s in %.1fs (cosine vs torch: min %.4f, mean %.4f)",
+        EMBEDDING_MODEL, " int8" if quantize else "", time.perf_counter() - started, min_cos, mean_cos,
+    )
+    return meta
+
+
+def _load_onnx(batch_size: int, threads: int) -> Optional[OnnxEmbeddings]:
+    meta = read_export_meta(EMBEDDING_ONNX_DIR)
+    if not meta or meta.get("model") != EMBEDDING_MODEL or meta.get("quantized") != EMBEDDING_ONNX_QUANTIZE:
+        logger.warning(
+            "No ONNX export of %s in %s, using torch (run python export_onnx.py first)",
+            EMBEDDING_MODEL, EMBEDDING_ONNX_DIR,
+        )
+        return None
+    if meta["min_cosine"] < EMBEDDING_ONNX_MIN_COSINE:
+        logger.warning(
+            "ONNX embeddings disagree with torch (min cosine %.4f < %.4f), using torch",
+            meta["min_cosine"], EMBEDDING_ONNX_MIN_COSINE,
+        )
+        return None
+    return OnnxEmbeddings(EMBEDDING_ONNX_DIR, EMBEDDING_ONNX_QUANTIZE, batch_size=batch_size, threads=threads)
+
+
+def create_embedding_backend(batch_size: int, threads: int = 0) -> Tuple[Embeddings, str]:
+    """
+    Build the embedding model selected by EMBEDDING_BACKEND. Returns (embeddings, model_id);
+    model_id keys the embedding cache and the index manifest, so switching backends never
+    mixes vectors from different models.
+    """
+    if EMBEDDING_BACKEND == "onnx":
+        try:
+            onnx = _load_onnx(batch_size, threads)
+            if onnx is not None:
+                logger.info("Using ONNX Runtime embedding backend (%s)", onnx.model_id)
+                return onnx, onnx.model_id
+        except ImportError as e:
+            logger.warning("ONNX embedding backend unavailable (%s), using torch", e)
+        except Exception as e:
+            logger.warning("ONNX embedding backend failed to load (%s), using torch", e)
+    elif EMBEDDING_BACKEND != "torch":
+        logger.warning("Unknown EMBEDDING_BACKEND %r, using torch", EMBEDDING_BACKEND)
+    set_torch_threads(threads)
+    return _torch_embeddings(batch_size), EMBEDDING_MODEL
@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger("A.X.I.O.M")
+
+# Segment record: hex sha256 key, vector length, then the float32 vector.
+_RECORD_HEADER = struct.Struct("<64sI")
+
+
+class EmbeddingCache:
+    """
+    Persistent chunk-embedding cache keyed by sha256(model name + chunk text).
+
+    Entries are kept in LRU order and evicted once there are more than max_entries.
+    On disk there is a snapshot (.npz) plus an append-only segment: save() only appends the
+    entries added since the last save, and the two are compacted into a new snapshot on full
+    rebuilds, at shutdown, or once the segment holds more than a quarter of the entries.
+    """
+
+    def __init__(self, path: Path, model_name: str, max_entries: int):
+        self.path = path
+        self.segment_path = path.with_name(path.stem + ".segment")
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._segment_records = 0
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def load(self):
+        entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        if self.path.exists():
+            try:
+                with np.load(self.path, allow_pickle=False) as data:
+                    keys = data["keys"]
+                    vectors = data["vectors"]
+                entries = OrderedDict((str(k), v) for k, v in zip(keys, vectors))
+            except Exception as e:
+                logger.warning("Could not load embedding cache %s, starting empty: %s", self.path, e)
+                entries = OrderedDict()
+        records = self._read_segment(entries)
+        trimmed = len(entries) > self.max_entries
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        with self._lock:
+            self._entries = entries
+            self._segment_records = records
+            self._dirty = trimmed
+        if entries:
+            logger.info("Loaded embedding cache with %s entries (%s from the segment)", len(entries), records)
+
+    def _read_segment(self, entries: "OrderedDict[str, np.ndarray]") -> int:
+        """Replay the segment into entries; a torn record at the end (crash mid-append) is cut off."""
+        if not self.segment_path.exists():
+            return 0
+        try:
+            data = self.segment_path.read_bytes()
+        except OSError as e:
+            logger.warning("Could not read embedding cache segment %s: %s", self.segment_path, e)
+            return 0
+        records = 0
+        offset = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            key, dim = _RECORD_HEADER.unpack_from(data, offset)
+            end = offset + _RECORD_HEADER.size + dim * 4
+            if end > len(data):
+                break
+            key = key.decode("ascii")
+            entries[key] = np.frombuffer(data, dtype=np.float32, count=dim, offset=offset + _RECORD_HEADER.size).copy()
+            entries.move_to_end(key)
+            records += 1
+            offset = end
+        if offset < len(data):
+            logger.warning("Embedding cache segment %s ends in a partial record, truncating it", self.segment_path)
+            try:
+                with open(self.segment_path, "r+b") as f:
+                    f.truncate(offset)
+            except OSError as e:
+                logger.warning("Could not truncate embedding cache segment: %s", e)
+        return records
+
+    def save(self, compact: bool = False):
+        """Append the entries added since the last save; compact into a new snapshot when asked or due."""
+        with self._lock:
+            if compact or self._segment_records + len(self._pending) > max(1024, len(self._entries) // 4):
+                self._compact_locked()
+                return
+            pending = [(key, self._entries[key]) for key in self._pending if key in self._entries]
+            self._pending.clear()
+            if not pending:
+                return
+            try:
+                with open(self.segment_path, "ab") as f:
+                    for key, vector in pending:
+                        f.write(_RECORD_HEADER.pack(key.encode("ascii"), len(vector)))
+                        f.write(vector.astype(np.float32, copy=False).tobytes())
+                self._segment_records += len(pending)
+            except Exception as e:
+                logger.error("Failed to append to embedding cache segment: %s", e)
+
+    def _compact_locked(self):
+        if not self._dirty and not self._pending and not self._segment_records:
+            return
+        keys = np.array(list(self._entries.keys()))
+        vectors = np.stack(list(self._entries.values())) if self._entries else np.zeros((0, 0), dtype=np.float32)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, keys=keys, vectors=vectors)
+            os.replace(tmp_path, self.path)
+            # The snapshot now holds everything the segment did.
+            self.segment_path.unlink(missing_ok=True)
+        except Exception as e:
+            logger.error("Failed to save embedding cache to disk: %s", e)
+            return
+        self._dirty = False
+        self._pending.clear()
+        self._segment_records = 0
+
+    def get(self, text: str):
+        key = self._key(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, text: str, vector: List[float]):
+        key = self._key(text)
+        with self._lock:
+            self._entries[key] = np.asarray(vector, dtype=np.float32)
+            self._entries.move_to_end(key)
+            self._pending[key] = None
+            while len(self._entries) > self.max_entries:
+                # Evictions are only dropped from disk at the next compaction.
+                self._entries.popitem(last=False)
+                self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings model so document embeddings are served from an EmbeddingCache."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        results: List = [self.cache.get(text) for text in texts]
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing:
+            computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                self.cache.put(texts[i], vector)
+                results[i] = vector
+        if texts:
+            logger.debug(
+                "Embedded %s chunk(s): %s from cache, %s computed",
+                len(texts), len(texts) - len(missing), len(missing),
+            )
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in results]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
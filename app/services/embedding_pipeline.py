@@ -0,0 +1,138 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_THREADS,
+    EMBEDDING_PROCESSES,
+    EMBEDDING_PROCESS_MIN_CHUNKS,
+)
+
+from app.services.embedding_backend import create_embedding_backend
+
+logger = logging.getLogger("A.X.I.O.M")
+
+# Per-process model used by pool workers (loaded once by _init_worker).
+_worker_embeddings = None
+
+
+def _init_worker(threads: int, batch_size: int):
+    global _worker_embeddings
+    _worker_embeddings, _ = create_embedding_backend(batch_size, threads)
+
+
+def _embed_in_worker(texts: List[str]) -> List[List[float]]:
+    return _worker_embeddings.embed_documents(texts)
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Index-build embedding pipeline around an Embeddings model.
+
+    embed_documents() sorts texts by length (so each batch pads to similar lengths),
+    feeds them in EMBEDDING_BATCH_SIZE batches, optionally fans the batches out to a
+    process pool for large jobs, and logs throughput in chunks/sec. Results come back
+    in the caller's order. Queries go straight to the wrapped model.
+
+    The process pool is started on first use and kept (each worker loads the model
+    once); close() shuts it down.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        threads: int = EMBEDDING_THREADS,
+        processes: int = EMBEDDING_PROCESSES,
+        process_min_chunks: int = EMBEDDING_PROCESS_MIN_CHUNKS,
+    ):
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.threads = threads
+        self.processes = processes
+        self.process_min_chunks = process_min_chunks
+        self.last_report: Optional[dict] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _batches(self, texts: List[str], order: List[int]) -> List[List[str]]:
+        return [
+            [texts[i] for i in order[start:start + self.batch_size]]
+            for start in range(0, len(order), self.batch_size)
+        ]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                worker_threads = max(1, self.threads // self.processes) if self.threads > 0 else 1
+                # spawn: forking a process that already initialised torch threads can deadlock.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(worker_threads, self.batch_size),
+                )
+            return self._pool
+
+    def _embed_in_pool(self, batches: List[List[str]]) -> List[List[List[float]]]:
+        pool = self._get_pool()
+        try:
+            return list(pool.map(_embed_in_worker, batches))
+        except BrokenProcessPool:
+            # A worker died; the next call starts a fresh pool.
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False)
+            raise
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        started = time.perf_counter()
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = self._batches(texts, order)
+
+        use_pool = self.processes > 1 and len(texts) >= self.process_min_chunks
+        if use_pool:
+            batch_results = self._embed_in_pool(batches)
+        else:
+            batch_results = [self.embeddings.embed_documents(batch) for batch in batches]
+
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        flat = (vector for batch in batch_results for vector in batch)
+        for i, vector in zip(order, flat):
+            results[i] = vector
+
+        elapsed = time.perf_counter() - started
+        self.last_report = {
+            "chunks": len(texts),
+            "seconds": round(elapsed, 3),
+            "chunks_per_second": round(len(texts) / elapsed, 1) if elapsed > 0 else None,
+            "batch_size": self.batch_size,
+            "batches": len(batches),
+            "threads": self.threads,
+            "processes": self.processes if use_pool else 1,
+        }
+        logger.debug(
+            "Embedding throughput: %s chunks in %.2fs (%s chunks/s, batch %s, %s process(es))",
+            len(texts), elapsed, self.last_report["chunks_per_second"], self.batch_size,
+            self.last_report["processes"],
+        )
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
@@ -1,25 +1,40 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
 
+import asyncio
 import logging
 
-from config import GROQ_API_KEYS, GROQ_MODEL, AXIOM_SYSTEM_PROMPT
+from config import GROQ_API_KEYS, GROQ_MODEL, AXIOM_SYSTEM_PROMPT, GROQ_COMPLETION_TOKEN_ESTIMATE
 from app.services.vector_store import VectorStoreService
+from app.services.context_packer import ContextPacker
+from app.services.key_pool import KeyPool, KeyPoolExhausted
+from app.services.query_router import QueryRouter
+from app.services.prompts import (
+    GENERAL_SYSTEM_TEMPLATE,
+    HISTORY_SUMMARY_SYSTEM_PROMPT,
+    CompiledPrompt,
+    chat_prompt,
+    section,
+)
+from app.utils import metrics
+from app.utils.metrics import span
 from app.utils.time_info import get_time_information
+from app.utils.tokens import count_tokens
 
 logger = logging.getLogger("A.X.I.O.M")
 
-def escape_curly_braces(text: str) -> str:
-    if not text:
-        return text
-    return text.replace("{", "{{").replace("}", "}}")
-
 def _is_rate_limit_error(exc: BaseException) -> bool:
     msg = str(exc).lower()
     return "429" in str(exc) or "rate limit" in msg or "tokens per day" in msg
 
+async def _aclose(stream) -> None:
+    """Close an LLM token stream (and its HTTP response); errors from an already broken stream are ignored."""
+    try:
+        await stream.aclose()
+    except Exception as e:
+        logger.debug("Error while closing LLM stream: %s", e)
+
 def _mask_api_key(key: str) -> str:
     if not key or len(key) <=12:
         return "***masked***"
@@ -28,93 +43,308 @@ def _mask_api_key(key: str) -> str:
 
 
 class GroqService:
-    _shared_key_index = 0
-    _lock = None
-
-    def __init__(self, vector_store_service: VectorStoreService):
+    def __init__(
+            self,
+            vector_store_service: VectorStoreService,
+            key_pool: Optional[KeyPool] = None,
+            router: Optional[QueryRouter] = None,
+    ):
         if not GROQ_API_KEYS:
             raise ValueError(
                 "No Groq API Keys connfigured. Set GROQ_API_KEY (and optionally GROQ_API_KEY_2, GROQ_API_KEY_3, ...) in .env"
             )
-        self.llms = [
-            ChatGroq(
-                groq_api_key = key,
-                model_name=GROQ_MODEL,
-                temperature=0.8,
+        # Shared with RealtimeGroqService so both see the same per-key load and cooldowns.
+        self.key_pool = key_pool or KeyPool(len(GROQ_API_KEYS))
+        self.llms = []
+        for i, key in enumerate(GROQ_API_KEYS):
+            http_client, http_async_client = self.key_pool.http_clients(i)
+            self.llms.append(
+                ChatGroq(
+                    groq_api_key = key,
+                    model_name=GROQ_MODEL,
+                    temperature=0.8,
+                    # Failover to another key is the pool's job; SDK retries would hit the same limited key.
+                    max_retries=0,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                )
             )
-            for key in GROQ_API_KEYS
-        ]
+        # Templates and per-key chains are built once; requests only fill in variables.
+        self.general_prompt = CompiledPrompt(chat_prompt(GENERAL_SYSTEM_TEMPLATE), self.llms)
+        self.summary_prompt = CompiledPrompt(chat_prompt(HISTORY_SUMMARY_SYSTEM_PROMPT, with_history=False), self.llms)
         self.vector_store_service = vector_store_service
+        self.context_packer = ContextPacker()
+        # Also shared with RealtimeGroqService, so its counters cover both endpoints.
+        self.router = router or QueryRouter(
+            vector_store_service.embed_query, vector_store_service.embeddings.embed_documents,
+        )
         logger.info(f"Initialized GroqService with {len(GROQ_API_KEYS)} API key(s)")
 
+    def _log_key_choice(self, i: int):
+        logger.info(f"Using API key #{i + 1}/{len(self.llms)}: {_mask_api_key(GROQ_API_KEYS[i])}")
+
+    def _log_key_failure(self, i: int, e: Exception):
+        n = len(self.llms)
+        masked_failed_key = _mask_api_key(GROQ_API_KEYS[i])
+        if _is_rate_limit_error(e):
+            logger.warning(f"API key #{i+1}/{n} failed: {masked_failed_key}")
+        else:
+            logger.warning(f"API key #{i+1}/{n} failed: {masked_failed_key} - {str(e)[:100]}")
+
+    def _log_fallback_success(self, i: int):
+        masked_success_key = _mask_api_key(GROQ_API_KEYS[i])
+        logger.info(f"Fallback successfull: API key #{i + 1}/{len(self.llms)} succeeded: {masked_success_key}")
+        metrics.inc("axiom_groq_fallbacks_total")
+
+    def _key_failed(self, i: int, e: Exception, tokens: int = 0):
+        self._log_key_failure(i, e)
+        rate_limited = _is_rate_limit_error(e)
+        metrics.inc("axiom_groq_key_failures_total", key=i + 1, reason="rate_limit" if rate_limited else "error")
+        self.key_pool.release(i, failed=True, rate_limited=rate_limited, reserved_tokens=tokens)
+
+    @staticmethod
+    def _estimate_tokens(compiled: CompiledPrompt, variables: dict) -> int:
+        """Tokens the request will charge against the key's quota: the full prompt plus an expected reply."""
+        prompt_messages = compiled.prompt.format_messages(**variables)
+        return sum(count_tokens(str(m.content)) for m in prompt_messages) + GROQ_COMPLETION_TOKEN_ESTIMATE
+
+    def estimate_min_tokens(self, question: str) -> int:
+        """Lower bound for a request about question (system prompt + question + reply), known before retrieval."""
+        return count_tokens(AXIOM_SYSTEM_PROMPT) + count_tokens(question) + GROQ_COMPLETION_TOKEN_ESTIMATE
+
+    @staticmethod
+    def _used_tokens(response) -> Optional[int]:
+        usage = getattr(response, "usage_metadata", None)
+        return usage.get("total_tokens") if usage else None
+
+    def _all_keys_failed(self, keys_tried: List[int], last_exc: Exception) -> Exception:
+        if keys_tried:
+            masked_all_keys = ", ".join([_mask_api_key(GROQ_API_KEYS[i]) for i in keys_tried])
+            logger.error(f"All API keys failed. Tried keys: {masked_all_keys}")
+        else:
+            logger.error(f"No API key available: {last_exc}")
+        return Exception(f"Error getting response from Groq: {str(last_exc)}")
+
     def _invoke_llm(
             self,
-            prompt: ChatPromptTemplate,
-            messages: list,
-            question: str,
+            compiled: CompiledPrompt,
+            variables: dict,
     ) -> str:
-        n=len(self.llms)
-        start_i = GroqService._shared_key_index % n
-        current_key_index = GroqService._shared_key_index
-        GroqService._shared_key_index += 1
-        masked_key = _mask_api_key(GROQ_API_KEYS[start_i])
-        logger.info(f"Using API key #{start_i +1} (round-robin index: {current_key_index}): {masked_key}")
+        tokens = self._estimate_tokens(compiled, variables)
         last_exc = None
         keys_tried = []
-        for j in range(n):
-            i = (start_i + j) % n
+        while True:
+            try:
+                i = self.key_pool.acquire(exclude=keys_tried, tokens=tokens)
+            except KeyPoolExhausted as e:
+                # Keys in cooldown are skipped without a round trip.
+                last_exc = last_exc or e
+                break
             keys_tried.append(i)
+            self._log_key_choice(i)
             try:
-                chain = prompt | self.llms[i]
-                response = chain.invoke({"history": messages, "question": question})
-                if j > 0:
-                    masked_success_key = _mask_api_key(GROQ_API_KEYS[i])
-                    logger.info(f"Fallback successfull: API key #{i + 1}/{n} succeeded: {masked_success_key}")
-                return response.content
+                with span("groq_call", key=i + 1):
+                    response = compiled.chains[i].invoke(variables)
             except Exception as e:
                 last_exc = e
-                masked_failed_key = _mask_api_key(GROQ_API_KEYS[i])
-                if _is_rate_limit_error(e):
-                    logger.warning(f"API key #{i+1}/{n} failed: {masked_failed_key}")
-                else:
-                    logger.warning(f"API key #{i+1}/{n} failed: {masked_failed_key} - {str(e)[:100]}")
-                if n > 1:
-                    continue
-                raise Exception(f"Error getting response from groq: {str(e)}") from e
-        masked_all_keys = ", ".join([_mask_api_key(GROQ_API_KEYS[i]) for i in keys_tried])
-        logger.error(f"All API keys failed. Tried keys: {masked_all_keys}")
-        raise Exception(f"Error getting response from Groq: {str(last_exc)}") from last_exc
-
-    def get_response(self, question: str, chat_history: Optional[List[tuple]] = None) -> str:
+                self._key_failed(i, e, tokens)
+                continue
+            self.key_pool.release(i, reserved_tokens=tokens, used_tokens=self._used_tokens(response))
+            if len(keys_tried) > 1:
+                self._log_fallback_success(i)
+            return response.content
+        raise self._all_keys_failed(keys_tried, last_exc) from last_exc
+
+    async def _ainvoke_llm(
+            self,
+            compiled: CompiledPrompt,
+            variables: dict,
+    ) -> str:
+        tokens = await asyncio.to_thread(self._estimate_tokens, compiled, variables)
+        last_exc = None
+        keys_tried = []
+        while True:
+            try:
+                i = await self.key_pool.aacquire(exclude=keys_tried, tokens=tokens)
+            except KeyPoolExhausted as e:
+                last_exc = last_exc or e
+                break
+            keys_tried.append(i)
+            self._log_key_choice(i)
+            try:
+                with span("groq_call", key=i + 1):
+                    response = await compiled.chains[i].ainvoke(variables)
+            except Exception as e:
+                last_exc = e
+                self._key_failed(i, e, tokens)
+                continue
+            self.key_pool.release(i, reserved_tokens=tokens, used_tokens=self._used_tokens(response))
+            if len(keys_tried) > 1:
+                self._log_fallback_success(i)
+            return response.content
+        raise self._all_keys_failed(keys_tried, last_exc) from last_exc
+
+    async def _astream_llm(
+            self,
+            compiled: CompiledPrompt,
+            variables: dict,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the reply token by token. A key that fails before its first chunk
+        arrives falls back to the next key, exactly like _ainvoke_llm; once tokens
+        have been sent, errors propagate to the caller. The key stays in flight
+        until the stream ends.
+        """
+        tokens = await asyncio.to_thread(self._estimate_tokens, compiled, variables)
+        last_exc = None
+        keys_tried = []
+        stream = None
+        first_chunk = None
+        while True:
+            try:
+                i = await self.key_pool.aacquire(exclude=keys_tried, tokens=tokens)
+            except KeyPoolExhausted as e:
+                last_exc = last_exc or e
+                break
+            keys_tried.append(i)
+            self._log_key_choice(i)
+            stream = compiled.chains[i].astream(variables)
+            try:
+                with span("groq_first_chunk", key=i + 1):
+                    first_chunk = await anext(stream, None)
+            except Exception as e:
+                last_exc = e
+                await _aclose(stream)
+                stream = None
+                self._key_failed(i, e, tokens)
+                continue
+            except BaseException:
+                # Cancelled (client gone) while waiting for the first chunk.
+                await _aclose(stream)
+                self.key_pool.release(i, reserved_tokens=tokens)
+                raise
+            if len(keys_tried) > 1:
+                self._log_fallback_success(i)
+            break
+        if stream is None:
+            raise self._all_keys_failed(keys_tried, last_exc) from last_exc
+
+        failed = False
         try:
-            retriever = self.vector_store_service.get_retriever(k=10)
-            context_docs = retriever.invoke(question)
-            context = "\n".join([doc.page_content for doc in context_docs]) if context_docs else ""
+            # Includes the time the client takes to consume the chunks.
+            with span("groq_stream", key=i + 1):
+                if first_chunk is not None and first_chunk.content:
+                    yield first_chunk.content
+                async for chunk in stream:
+                    if chunk.content:
+                        yield chunk.content
+        except Exception as e:
+            failed = True
+            self._key_failed(i, e, tokens)
+            raise
+        finally:
+            # Also runs when the client disconnects mid-stream (generator closed): close the
+            # upstream request too. Streamed chunks carry no usage totals, so the estimate stands.
+            await _aclose(stream)
+            if not failed:
+                self.key_pool.release(i, reserved_tokens=tokens)
+
+    def _pack_context(self, question: str, context_docs: list) -> str:
+        query_vector = doc_vectors = None
+        if self.context_packer.use_mmr and len(context_docs) > 1:
+            # Chunk vectors are read back from the index; the query vector comes from the query cache.
+            query_vector = self.vector_store_service.embed_query(question)
+            doc_vectors = self.vector_store_service.chunk_vectors(context_docs)
+        with span("context_pack"):
+            return self.context_packer.pack(context_docs, query_vector, doc_vectors)
+
+    def _retrieve_context(self, question: str) -> str:
+        try:
+            context_docs = self.vector_store_service.search(question, k=10)
+            return self._pack_context(question, context_docs)
         except Exception as retrieval_err:
             logger.warning("Vector store retrieval failed, using empty context: %s", retrieval_err)
-            context = ""
+            return ""
 
+    async def _aretrieve_context(self, question: str) -> str:
         try:
-            time_info = get_time_information()
-            system_message = AXIOM_SYSTEM_PROMPT + f"\n\nCurrent time and date: {time_info}"
+            context_docs = await self.vector_store_service.asearch(question, k=10)
+            if self.context_packer.use_mmr:
+                return await asyncio.to_thread(self._pack_context, question, context_docs)
+            return self._pack_context(question, context_docs)
+        except Exception as retrieval_err:
+            logger.warning("Vector store retrieval failed, using empty context: %s", retrieval_err)
+            return ""
 
-            if context:
-                system_message += f"\n\nRelevant context:\n{escape_curly_braces(context)}"
+    def _history_messages(self, chat_history: Optional[List[tuple]]) -> list:
+        messages = []
 
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_message),
-                MessagesPlaceholder(variable_name="history"),
-                ("human", "{question}"),
-            ])
+        if chat_history:
+            for human_msg, ai_msg in chat_history:
+                messages.append(HumanMessage(content=human_msg))
+                messages.append(AIMessage(content=ai_msg))
 
-            messages = []
+        return messages
 
-            if chat_history:
-                for human_msg, ai_msg in chat_history:
-                    messages.append(HumanMessage(content=human_msg))
-                    messages.append(AIMessage(content=ai_msg))
+    def _compose_prompt(
+            self,
+            question: str,
+            chat_history: Optional[List[tuple]],
+            context: str,
+            history_summary: Optional[str] = None,
+    ) -> Tuple[CompiledPrompt, dict]:
+        return self.general_prompt, {
+            "time_info": get_time_information(),
+            "history_summary": section("Summary of the earlier conversation", history_summary),
+            "context": section("Relevant context", context),
+            "history": self._history_messages(chat_history),
+            "question": question,
+        }
+
+    def _build_prompt(
+            self, question: str, chat_history: Optional[List[tuple]] = None, history_summary: Optional[str] = None,
+    ) -> Tuple[CompiledPrompt, dict]:
+        route = self.router.route(question)
+        context = self._retrieve_context(question) if route.retrieve else ""
+        self.router.record(route, realtime=False, context=context)
+        return self._compose_prompt(question, chat_history, context, history_summary)
+
+    async def _abuild_prompt(
+            self, question: str, chat_history: Optional[List[tuple]] = None, history_summary: Optional[str] = None,
+    ) -> Tuple[CompiledPrompt, dict]:
+        route = await self.router.aroute(question)
+        context = await self._aretrieve_context(question) if route.retrieve else ""
+        self.router.record(route, realtime=False, context=context)
+        return self._compose_prompt(question, chat_history, context, history_summary)
 
-            return self._invoke_llm(prompt, messages, question)
+    def summarize_history(self, previous_summary: Optional[str], pairs: List[tuple]) -> str:
+        transcript = "\n".join(f"User: {human_msg}\nAssistant: {ai_msg}" for human_msg, ai_msg in pairs)
+        request = f"Previous summary:\n{previous_summary or '(none)'}\n\nNew exchanges:\n{transcript}"
+        return self._invoke_llm(self.summary_prompt, {"question": request}).strip()
+
+    def get_response(
+            self, question: str, chat_history: Optional[List[tuple]] = None, history_summary: Optional[str] = None,
+    ) -> str:
+        try:
+            compiled, variables = self._build_prompt(question, chat_history, history_summary)
+            return self._invoke_llm(compiled, variables)
 
         except Exception as e:
-            raise Exception(f"Error getting response from Groq: {str(e)}") from e
\ No newline at end of file
+            raise Exception(f"Error getting response from Groq: {str(e)}") from e
+
+    async def aget_response(
+            self, question: str, chat_history: Optional[List[tuple]] = None, history_summary: Optional[str] = None,
+    ) -> str:
+        try:
+            compiled, variables = await self._abuild_prompt(question, chat_history, history_summary)
+            return await self._ainvoke_llm(compiled, variables)
+
+        except Exception as e:
+            raise Exception(f"Error getting response from Groq: {str(e)}") from e
+
+    async def astream_response(
+            self, question: str, chat_history: Optional[List[tuple]] = None, history_summary: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        compiled, variables = await self._abuild_prompt(question, chat_history, history_summary)
+        async for chunk in self._astream_llm(compiled, variables):
+            yield chunk
@@ -0,0 +1,163 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import (
+    MAX_CHAT_HISTORY_TURNS,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_SUMMARY_MIN_PAIRS,
+    HISTORY_SUMMARY_INPUT_TOKENS,
+)
+from app.models import ChatMessage
+from app.utils.tokens import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger("A.X.I.O.M")
+
+# (previous summary or None, pairs to fold in) -> new summary
+Summarizer = Callable[[Optional[str], List[tuple]], str]
+
+
+class _PairIndex:
+    """user/assistant pairs of one session, extended as messages are appended."""
+
+    __slots__ = ("messages", "scanned", "pairs", "tokens", "ends", "summary", "summary_upto", "summarizing")
+
+    def __init__(self, messages: List[ChatMessage]):
+        self.messages = messages
+        self.scanned = 0  # next message index to look at
+        self.pairs: List[tuple] = []
+        self.tokens: List[int] = []
+        self.ends: List[int] = []  # message index of each pair's assistant reply
+        self.summary: Optional[str] = None
+        self.summary_upto = 0  # pairs[:summary_upto] are folded into summary
+        self.summarizing = False
+
+    def scan(self):
+        msgs = self.messages
+        i = self.scanned
+        while i < len(msgs) - 1:
+            user_msg, ai_msg = msgs[i], msgs[i + 1]
+            if user_msg.role == "user" and ai_msg.role == "assistant":
+                self.pairs.append((user_msg.content, ai_msg.content))
+                self.tokens.append(count_tokens(user_msg.content) + count_tokens(ai_msg.content))
+                self.ends.append(i + 1)
+                i += 2
+            else:
+                i += 1
+        self.scanned = i
+
+
+class HistoryWindow:
+    """
+    Picks the chat history sent to the LLM: the newest pairs that fit in token_budget
+    (and at most max_turns). Pairs and their token counts are indexed once per session and
+    only new messages are scanned per request.
+
+    With a summarizer, pairs that have fallen out of the window are folded into a rolling
+    summary in the background; select() returns the latest one. While it lags, the pairs it
+    does not cover yet stay in the window (up to one extra token_budget), so no turn drops
+    out of both.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        max_turns: int = MAX_CHAT_HISTORY_TURNS,
+        summarizer: Optional[Summarizer] = None,
+        summary_min_pairs: int = HISTORY_SUMMARY_MIN_PAIRS,
+        summary_input_tokens: int = HISTORY_SUMMARY_INPUT_TOKENS,
+    ):
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.summarizer = summarizer
+        self.summary_min_pairs = max(1, summary_min_pairs)
+        self.summary_input_tokens = summary_input_tokens
+        self._index: Dict[str, _PairIndex] = {}
+        self._lock = threading.Lock()
+        self._executor = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary") if summarizer else None
+        )
+
+    def _index_for(self, session_id: str, messages: List[ChatMessage]) -> _PairIndex:
+        state = self._index.get(session_id)
+        if state is None or state.messages is not messages or state.scanned > len(messages):
+            # New session, or the session was reloaded from disk: re-index, keep the summary.
+            previous = state
+            state = _PairIndex(messages)
+            if previous is not None and not previous.summarizing:
+                state.summary, state.summary_upto = previous.summary, previous.summary_upto
+            self._index[session_id] = state
+        state.scan()
+        if state.summary_upto > len(state.pairs):
+            state.summary, state.summary_upto = None, 0
+        return state
+
+    def select(
+        self, session_id: str, messages: List[ChatMessage], exclude_last: bool = False
+    ) -> Tuple[List[tuple], Optional[str]]:
+        """(pairs for the prompt, oldest first; rolling summary of earlier turns or None)."""
+        with self._lock:
+            state = self._index_for(session_id, messages)
+            limit = len(messages) - 1 if exclude_last else len(messages)
+            end = len(state.ends)
+            while end > 0 and state.ends[end - 1] >= limit:
+                end -= 1
+
+            start, used = end, 0
+            while start > 0 and end - start < self.max_turns:
+                cost = state.tokens[start - 1]
+                if used + cost > self.token_budget:
+                    break
+                used += cost
+                start -= 1
+            window = state.pairs[start:end]
+
+            if not window and end > 0:
+                # The last exchange alone is over budget: keep it with the reply cut short.
+                user_msg, ai_msg = state.pairs[end - 1]
+                ai_cut = truncate_to_tokens(ai_msg, self.token_budget - count_tokens(user_msg))
+                if ai_cut:
+                    window = [(user_msg, ai_cut)]
+                    start = end - 1
+
+            if self._executor is None or start == 0:
+                return window, None
+            if not state.summarizing and start - state.summary_upto >= self.summary_min_pairs:
+                state.summarizing = True
+                self._executor.submit(self._summarize, session_id, state, start)
+
+            # Pairs between the summary and the window are not folded in yet: keep them.
+            keep, extra = start, 0
+            while keep > state.summary_upto and extra + state.tokens[keep - 1] <= self.token_budget:
+                extra += state.tokens[keep - 1]
+                keep -= 1
+            return state.pairs[keep:start] + window, state.summary
+
+    def _summarize(self, session_id: str, state: _PairIndex, upto: int):
+        try:
+            first = state.summary_upto
+            # Bound the summarizer prompt: oldest unsummarized pairs beyond the input budget are skipped.
+            used = 0
+            for i in range(upto - 1, state.summary_upto - 1, -1):
+                used += state.tokens[i]
+                if used > self.summary_input_tokens:
+                    break
+                first = i
+            summary = self.summarizer(state.summary, state.pairs[first:upto])
+            with self._lock:
+                state.summary, state.summary_upto = summary, upto
+                state.summarizing = False
+            logger.info("Updated history summary for session %s (%s turns folded in)", session_id, upto)
+        except Exception as e:
+            logger.warning("Could not summarize history for session %s: %s", session_id, e)
+            with self._lock:
+                state.summarizing = False
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self._index.pop(session_id, None)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,252 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.services.ann_index import index_kind
+
+logger = logging.getLogger("A.X.I.O.M")
+
+INDEX_FORMAT_VERSION = 2
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.jsonl"
+MANIFEST_FILE = "manifest.json"
+# Incremental updates since the snapshot above, one JSON batch per line; folded in by save_index.
+UPDATES_FILE = "updates.jsonl"
+# Written by FAISS.save_local in older versions; never unpickled, only removed after migration.
+LEGACY_DOCSTORE_FILE = "index.pkl"
+
+
+class IndexFormatError(Exception):
+    """The on-disk index is missing pieces, corrupt, or was built for another embedding model."""
+
+
+def chunk_label(doc_id: str) -> int:
+    """Stable 63-bit FAISS label for a chunk ID; the index is keyed by these, not by position."""
+    return int.from_bytes(hashlib.sha1(doc_id.encode("utf-8")).digest()[:8], "little") >> 1
+
+
+def add_chunks(store: FAISS, docs: List[Document], vectors: np.ndarray):
+    """Add docs (each with its id set) and their vectors to a label-addressed store in place."""
+    if not docs:
+        return
+    labels = np.array([chunk_label(doc.id) for doc in docs], dtype=np.int64)
+    store.index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), labels)
+    store.docstore.add({doc.id: doc for doc in docs})
+    for doc, label in zip(docs, labels):
+        store.index_to_docstore_id[int(label)] = doc.id
+
+
+def remove_chunks(store: FAISS, doc_ids: Iterable[str]):
+    """Remove chunks by ID in place; IDs that are not in the store are ignored."""
+    doc_ids = [doc_id for doc_id in doc_ids if doc_id in store.docstore._dict]
+    if not doc_ids:
+        return
+    labels = np.array([chunk_label(doc_id) for doc_id in doc_ids], dtype=np.int64)
+    store.index.remove_ids(labels)
+    for label in labels:
+        store.index_to_docstore_id.pop(int(label), None)
+    store.docstore.delete(doc_ids)
+
+
+def _atomic_write(path: Path, write):
+    tmp_path = path.with_name(path.name + ".tmp")
+    write(tmp_path)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def save_index(directory: Path, store: FAISS, manifest: dict):
+    """
+    Write a full snapshot as three files: the raw FAISS index, a JSONL docstore with each
+    chunk's label, and a manifest. The manifest is written last, so a manifest whose counts
+    match the other two files describes a complete index. The update log is then dropped,
+    since the snapshot contains everything in it.
+    """
+    items = list(store.index_to_docstore_id.items())
+
+    def write_docstore(path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            for label, doc_id in items:
+                doc = store.docstore.search(doc_id)
+                f.write(json.dumps(
+                    {"id": doc_id, "label": label, "page_content": doc.page_content, "metadata": doc.metadata},
+                    ensure_ascii=False,
+                ) + "\n")
+
+    def write_manifest(path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(full_manifest, f, indent=2)
+
+    full_manifest = {
+        "format_version": INDEX_FORMAT_VERSION,
+        **manifest,
+        "dimension": store.index.d,
+        "count": store.index.ntotal,
+        "faiss_index": type(store.index).__name__,
+        "index_type": index_kind(store.index),
+        "distance_strategy": str(store.distance_strategy.value),
+        "saved_at": time.time(),
+    }
+    _atomic_write(directory / INDEX_FILE, lambda path: faiss.write_index(store.index, str(path)))
+    _atomic_write(directory / DOCSTORE_FILE, write_docstore)
+    _atomic_write(directory / MANIFEST_FILE, write_manifest)
+    (directory / UPDATES_FILE).unlink(missing_ok=True)
+
+    legacy_path = directory / LEGACY_DOCSTORE_FILE
+    if legacy_path.exists():
+        legacy_path.unlink()
+
+
+def append_updates(directory: Path, added: List[Document], vectors: np.ndarray, removed: List[str]):
+    """Record one incremental update (chunks added with their vectors, chunk IDs removed) in the update log."""
+    batch = {
+        "remove": list(removed),
+        "add": [
+            {
+                "id": doc.id,
+                "page_content": doc.page_content,
+                "metadata": doc.metadata,
+                "vector": base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii"),
+            }
+            for doc, vector in zip(added, vectors)
+        ],
+    }
+    with open(directory / UPDATES_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(batch, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _replay_updates(directory: Path, store: FAISS) -> int:
+    """Apply the update log to a freshly loaded snapshot; returns the number of chunk updates replayed."""
+    path = directory / UPDATES_FILE
+    if not path.exists():
+        return 0
+    with open(path, "rb") as f:
+        data = f.read()
+    replayed = 0
+    valid = 0
+    for line in data.splitlines(keepends=True):
+        try:
+            if not line.endswith(b"\n"):
+                raise ValueError("incomplete line")
+            batch = json.loads(line)
+        except ValueError:
+            # A crash mid-append leaves a torn last batch; it was never acknowledged, so drop it.
+            logger.warning("Index update log %s ends in a partial batch, truncating it", path)
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+            break
+        remove_chunks(store, batch["remove"])
+        docs = [
+            Document(id=record["id"], page_content=record["page_content"], metadata=record["metadata"])
+            for record in batch["add"]
+        ]
+        vectors = np.array(
+            [np.frombuffer(base64.b64decode(record["vector"]), dtype=np.float32) for record in batch["add"]],
+            dtype=np.float32,
+        ).reshape(len(docs), store.index.d)
+        add_chunks(store, docs, vectors)
+        replayed += len(batch["remove"]) + len(docs)
+        valid += len(line)
+    return replayed
+
+
+def update_manifest(directory: Path, **fields):
+    """Change manifest fields without rewriting the index or docstore."""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return
+    manifest.update(fields)
+
+    def write_manifest(path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    _atomic_write(directory / MANIFEST_FILE, write_manifest)
+
+
+def read_manifest(directory: Path) -> Optional[dict]:
+    manifest_path = directory / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_index(directory: Path, embeddings: Embeddings, embedding_model: str) -> Optional[Tuple[FAISS, dict, int]]:
+    """
+    Load the snapshot written by save_index and replay the update log on top of it.
+    Flat indexes are memory-mapped (FAISS copies the data on the first update). Returns
+    (store, manifest, chunk updates replayed), None when there is no index at all, and
+    raises IndexFormatError when one exists but cannot be used as-is.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        if (directory / LEGACY_DOCSTORE_FILE).exists():
+            raise IndexFormatError("legacy pickle-based index found; it is not loaded for safety")
+        return None
+
+    if manifest.get("format_version") != INDEX_FORMAT_VERSION:
+        raise IndexFormatError(f"unsupported index format version {manifest.get('format_version')}")
+    if manifest.get("embedding_model") != embedding_model:
+        raise IndexFormatError(
+            f"index was built with {manifest.get('embedding_model')}, current model is {embedding_model}"
+        )
+
+    index_path = directory / INDEX_FILE
+    index = None
+    if manifest.get("index_type") == "flat":
+        try:
+            index = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP)
+        except Exception:
+            index = None
+    if index is None:
+        index = faiss.read_index(str(index_path))
+
+    docs = {}
+    index_to_docstore_id = {}
+    with open(directory / DOCSTORE_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            doc_id = record["id"]
+            docs[doc_id] = Document(id=doc_id, page_content=record["page_content"], metadata=record["metadata"])
+            index_to_docstore_id[record["label"]] = doc_id
+
+    if index.ntotal != manifest.get("count") or len(index_to_docstore_id) != index.ntotal:
+        raise IndexFormatError(
+            f"index has {index.ntotal} vectors, docstore {len(index_to_docstore_id)}, "
+            f"manifest {manifest.get('count')}"
+        )
+    if index.d != manifest.get("dimension"):
+        raise IndexFormatError(f"index dimension {index.d} does not match manifest {manifest.get('dimension')}")
+
+    store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(docs),
+        index_to_docstore_id=index_to_docstore_id,
+    )
+    try:
+        replayed = _replay_updates(directory, store)
+    except Exception as e:
+        raise IndexFormatError(f"could not replay the index update log: {e}") from e
+    if store.index.ntotal != len(store.index_to_docstore_id):
+        raise IndexFormatError(
+            f"index has {store.index.ntotal} vectors after replaying updates, docstore {len(store.index_to_docstore_id)}"
+        )
+    return store, manifest, replayed
@@ -0,0 +1,72 @@
+import logging
+import threading
+import time
+from typing import Set
+
+from config import INDEXER_DEBOUNCE_SECONDS
+
+logger = logging.getLogger("A.X.I.O.M")
+
+
+class BackgroundIndexer:
+    """
+    Keeps vector-store updates off the request path.
+
+    ChatService reports "this session changed" via notify(); a worker thread
+    collects events for INDEXER_DEBOUNCE_SECONDS after the first one, then applies
+    the whole batch as one incremental update. VectorStoreService publishes the
+    result with an atomic swap, so retrieval keeps using the old index until then.
+    """
+
+    def __init__(self, vector_store_service, debounce_seconds: float = INDEXER_DEBOUNCE_SECONDS):
+        self.vector_store_service = vector_store_service
+        self.debounce_seconds = debounce_seconds
+        self._pending: Set[str] = set()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="axiom-indexer", daemon=True)
+        self._thread.start()
+        logger.info("Background indexer started (debounce %.1fs)", self.debounce_seconds)
+
+    def notify(self, session_id: str):
+        with self._cond:
+            self._pending.add(session_id)
+            self._cond.notify()
+
+    def stop(self, timeout: float = 30.0):
+        """Flush pending events and stop the worker."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("Background indexer did not finish within %.0fs", timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Merge the burst: keep collecting events until the window closes.
+                deadline = time.monotonic() + self.debounce_seconds
+                while not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending
+                self._pending = set()
+            try:
+                self.vector_store_service.update_chat_sessions(batch)
+            except Exception as e:
+                logger.error("Background index update failed for %s session(s): %s", len(batch), e, exc_info=True)
@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Collection, List, Optional, Tuple
+
+import httpx
+
+from config import (
+    GROQ_RATE_LIMIT_ENABLED,
+    GROQ_KEY_MAX_IN_FLIGHT,
+    GROQ_KEY_COOLDOWN_SECONDS,
+    GROQ_KEY_MAX_COOLDOWN_SECONDS,
+    GROQ_KEY_ACQUIRE_TIMEOUT,
+)
+
+from app.services.rate_limiter import KeyRateLimiter
+
+logger = logging.getLogger("A.X.I.O.M")
+
+# 429s older than this no longer count against a key's score.
+RATE_LIMIT_WINDOW_SECONDS = 60.0
+
+# Suggested client wait when every key is merely at its in-flight limit: slots free up as soon as
+# the running requests finish, so this is short.
+BUSY_RETRY_AFTER_SECONDS = 2.0
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Groq reset header ("7.66s", "2m59.56s", "250ms") or Retry-After ("12")."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+def _header_int(headers: httpx.Headers, name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+class KeyPoolExhausted(Exception):
+    """No key can take a request right now; retry_after is the wait until one might (None = unknown)."""
+
+    busy = False
+
+    def __init__(self, retry_after: Optional[float] = None):
+        self.retry_after = retry_after
+        if retry_after is not None:
+            message = f"All Groq API keys are rate limited; retry in {retry_after:.0f}s"
+        else:
+            message = "All Groq API keys are rate limited or busy"
+        super().__init__(message)
+
+
+class KeyPoolBusy(KeyPoolExhausted):
+    """Every usable key is at GROQ_KEY_MAX_IN_FLIGHT: the pool is overloaded, not out of quota."""
+
+    busy = True
+
+    def __init__(self, retry_after: float = BUSY_RETRY_AFTER_SECONDS):
+        self.retry_after = retry_after
+        Exception.__init__(self, f"All Groq API keys are busy; retry in {retry_after:.0f}s")
+
+
+class _KeyState:
+    def __init__(self, index: int):
+        self.index = index
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_rate_limits = 0
+        self.rate_limited_at: deque = deque()
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+        # From x-ratelimit-* response headers (None until the first response).
+        self.limit_requests: Optional[int] = None
+        self.remaining_requests: Optional[int] = None
+        self.reset_requests_at = 0.0
+        self.limit_tokens: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.reset_tokens_at = 0.0
+
+    def headroom(self, now: float) -> float:
+        """Fraction of the key's request/token quota still available (1.0 when unknown)."""
+        fractions = []
+        if self.limit_requests and self.remaining_requests is not None and now < self.reset_requests_at:
+            fractions.append(self.remaining_requests / self.limit_requests)
+        if self.limit_tokens and self.remaining_tokens is not None and now < self.reset_tokens_at:
+            fractions.append(self.remaining_tokens / self.limit_tokens)
+        while self.rate_limited_at and now - self.rate_limited_at[0] > RATE_LIMIT_WINDOW_SECONDS:
+            self.rate_limited_at.popleft()
+        return (min(fractions) if fractions else 1.0) / (1 + len(self.rate_limited_at))
+
+
+class KeyPool:
+    """
+    Thread- and asyncio-safe scheduler for the GROQ_API_KEY_n keys.
+
+    acquire()/aacquire() hand out the available key with the most headroom (quota left per
+    the rate-limit headers, fewest recent 429s, fewest requests in flight) whose local token
+    buckets can take the request, and release() records the outcome. Keys that hit their limit sit out a cooldown taken from the reset /
+    Retry-After headers, or an exponential backoff when there are none, so they are not
+    retried until they can succeed.
+    """
+
+    def __init__(
+        self,
+        num_keys: int,
+        max_in_flight: int = GROQ_KEY_MAX_IN_FLIGHT,
+        cooldown_seconds: float = GROQ_KEY_COOLDOWN_SECONDS,
+        max_cooldown_seconds: float = GROQ_KEY_MAX_COOLDOWN_SECONDS,
+        acquire_timeout: float = GROQ_KEY_ACQUIRE_TIMEOUT,
+        rate_limited: bool = GROQ_RATE_LIMIT_ENABLED,
+    ):
+        self._keys = [_KeyState(i) for i in range(num_keys)]
+        self.max_in_flight = max_in_flight
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.acquire_timeout = acquire_timeout
+        self._cond = threading.Condition()
+        # Local RPM/TPM/TPD budget per key, so bursts wait here instead of failing at Groq.
+        self._limiters = [KeyRateLimiter() for _ in self._keys] if rate_limited else None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _ready_in(self, key: _KeyState, tokens: int, now: float) -> float:
+        wait = key.cooldown_until - now
+        if self._limiters is not None:
+            wait = max(wait, self._limiters[key.index].wait_time(tokens, now))
+        return max(0.0, wait)
+
+    def _try_acquire(self, exclude: Collection[int], tokens: int) -> Tuple[Optional[int], Optional[float], bool]:
+        """
+        (chosen key, already counted as in flight and charged tokens) or
+        (None, seconds until a cooling/throttled key is ready, whether any key is only busy).
+        Raises KeyPoolExhausted when every key is excluded. Caller holds the lock.
+        """
+        now = time.monotonic()
+        best = None
+        best_score = None
+        busy = False
+        wait = None
+        candidates = False
+        for key in self._keys:
+            if key.index in exclude:
+                continue
+            candidates = True
+            ready_in = self._ready_in(key, tokens, now)
+            if ready_in > 0:
+                wait = ready_in if wait is None else min(wait, ready_in)
+                continue
+            if self.max_in_flight > 0 and key.in_flight >= self.max_in_flight:
+                busy = True
+                continue
+            # Ties (e.g. no headers seen yet) go to the least recently used key: round-robin.
+            score = (key.headroom(now) / (1 + key.in_flight), -key.last_used)
+            if best_score is None or score > best_score:
+                best, best_score = key, score
+        if best is not None:
+            best.in_flight += 1
+            best.last_used = now
+            if self._limiters is not None:
+                self._limiters[best.index].reserve(tokens, now)
+            return best.index, None, False
+        if not candidates:
+            raise KeyPoolExhausted()
+        return None, wait, busy
+
+    @staticmethod
+    def _exhausted(wait: Optional[float], busy: bool) -> KeyPoolExhausted:
+        # A key that only needs a slot to free up beats one still cooling down past the deadline.
+        if busy:
+            return KeyPoolBusy()
+        return KeyPoolExhausted(wait)
+
+    def acquire(self, exclude: Collection[int] = (), tokens: int = 0) -> int:
+        """
+        Key index for a request of about tokens tokens. Waits up to acquire_timeout for a busy
+        or throttled key; fails fast (KeyPoolExhausted) if no key can be ready in that time, or
+        with KeyPoolBusy when the keys are only at their in-flight limit.
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                index, wait, busy = self._try_acquire(exclude, tokens)
+                if index is not None:
+                    return index
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (not busy and wait > remaining):
+                    raise self._exhausted(wait, busy)
+                self._cond.wait(remaining if wait is None else min(wait, remaining))
+
+    async def aacquire(self, exclude: Collection[int] = (), tokens: int = 0) -> int:
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                index, wait, busy = self._try_acquire(exclude, tokens)
+            if index is not None:
+                return index
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (not busy and wait > remaining):
+                raise self._exhausted(wait, busy)
+            # Slots are freed by release(); poll rather than block the event loop on the condition.
+            delay = min(wait, remaining) if wait is not None else remaining
+            await asyncio.sleep(min(delay, 0.05) if busy else delay)
+
+    def wait_estimate(self, tokens: int = 0) -> float:
+        """Seconds until some key could take a request of tokens tokens (0 = now), ignoring in-flight limits."""
+        now = time.monotonic()
+        with self._cond:
+            return min(self._ready_in(key, tokens, now) for key in self._keys)
+
+    def release(
+        self,
+        index: int,
+        failed: bool = False,
+        rate_limited: bool = False,
+        reserved_tokens: int = 0,
+        used_tokens: Optional[int] = None,
+    ):
+        """Finish a request on key index. The token reservation is corrected to used_tokens
+        when known; failed requests give their tokens back."""
+        now = time.monotonic()
+        with self._cond:
+            key = self._keys[index]
+            key.in_flight = max(0, key.in_flight - 1)
+            if self._limiters is not None and (failed or used_tokens is not None):
+                self._limiters[index].settle(reserved_tokens, None if failed else used_tokens, now)
+            if not failed:
+                key.successes += 1
+                key.consecutive_rate_limits = 0
+            else:
+                key.failures += 1
+                if rate_limited:
+                    key.rate_limited_at.append(now)
+                    key.consecutive_rate_limits += 1
+                    if key.cooldown_until <= now:
+                        # No reset/Retry-After header arrived: back off exponentially.
+                        backoff = self.cooldown_seconds * 2 ** (key.consecutive_rate_limits - 1)
+                        key.cooldown_until = now + min(backoff, self.max_cooldown_seconds)
+                    logger.warning(
+                        "API key #%s rate limited; cooling down for %.0fs",
+                        index + 1, key.cooldown_until - now,
+                    )
+            self._cond.notify_all()
+
+    def observe(self, index: int, status_code: int, headers: httpx.Headers):
+        """Record rate-limit headers from a Groq response made with key index."""
+        now = time.monotonic()
+        with self._cond:
+            key = self._keys[index]
+            limit = _header_int(headers, "x-ratelimit-limit-requests")
+            remaining = _header_int(headers, "x-ratelimit-remaining-requests")
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if remaining is not None:
+                key.limit_requests = limit or key.limit_requests
+                key.remaining_requests = remaining
+                key.reset_requests_at = now + (reset or 0.0)
+                if remaining <= 0 and reset:
+                    key.cooldown_until = max(key.cooldown_until, now + reset)
+            limit = _header_int(headers, "x-ratelimit-limit-tokens")
+            remaining = _header_int(headers, "x-ratelimit-remaining-tokens")
+            reset = parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            if remaining is not None:
+                key.limit_tokens = limit or key.limit_tokens
+                key.remaining_tokens = remaining
+                key.reset_tokens_at = now + (reset or 0.0)
+                if remaining <= 0 and reset:
+                    key.cooldown_until = max(key.cooldown_until, now + reset)
+            if self._limiters is not None:
+                self._limiters[index].adopt_limits(key.limit_requests, key.limit_tokens, now)
+            if status_code == 429:
+                retry_after = parse_duration(headers.get("retry-after"))
+                if retry_after:
+                    key.cooldown_until = max(key.cooldown_until, now + min(retry_after, self.max_cooldown_seconds))
+
+    def http_clients(self, index: int):
+        """(httpx.Client, httpx.AsyncClient) for key index whose responses feed observe()."""
+
+        def on_response(response: httpx.Response):
+            self.observe(index, response.status_code, response.headers)
+
+        async def on_response_async(response: httpx.Response):
+            self.observe(index, response.status_code, response.headers)
+
+        return (
+            httpx.Client(event_hooks={"response": [on_response]}),
+            httpx.AsyncClient(event_hooks={"response": [on_response_async]}),
+        )
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        with self._cond:
+            return [
+                {
+                    "key": key.index + 1,
+                    "in_flight": key.in_flight,
+                    "successes": key.successes,
+                    "failures": key.failures,
+                    "recent_rate_limits": len(key.rate_limited_at),
+                    "cooldown_seconds": round(max(0.0, key.cooldown_until - now), 1),
+                    "remaining_requests": key.remaining_requests,
+                    "remaining_tokens": key.remaining_tokens,
+                    "headroom": round(key.headroom(now), 3),
+                    **(self._limiters[key.index].stats(now) if self._limiters is not None else {}),
+                }
+                for key in self._keys
+            ]
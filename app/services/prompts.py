@@ -0,0 +1,50 @@
+from typing import List
+
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import Runnable
+
+from config import AXIOM_SYSTEM_PROMPT
+
+
+def escape_curly_braces(text: str) -> str:
+    if not text:
+        return text
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def section(heading: str, text: str) -> str:
+    """A titled block for the system message, or "" when there is nothing to show."""
+    return f"\n\n{heading}:\n{text}" if text else ""
+
+
+# The system prompt is escaped once here and is the byte-identical prefix of every request,
+# so provider-side prompt caching can reuse it. Per-request parts are template variables;
+# their values are substituted as-is and never need escaping.
+_STATIC_SYSTEM_PREFIX = escape_curly_braces(AXIOM_SYSTEM_PROMPT)
+
+GENERAL_SYSTEM_TEMPLATE = _STATIC_SYSTEM_PREFIX + "\n\nCurrent time and date: {time_info}{history_summary}{context}"
+REALTIME_SYSTEM_TEMPLATE = (
+    _STATIC_SYSTEM_PREFIX + "\n\nCurrent time and date: {time_info}{history_summary}{search_results}{context}"
+)
+
+HISTORY_SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the previous summary (if any) with the new exchanges into one summary of at most 150 words. "
+    "Keep facts about the user, decisions, and open questions; drop small talk. Reply with the summary only."
+)
+
+
+def chat_prompt(system_template: str, with_history: bool = True) -> ChatPromptTemplate:
+    messages = [("system", system_template)]
+    if with_history:
+        messages.append(MessagesPlaceholder(variable_name="history"))
+    messages.append(("human", "{question}"))
+    return ChatPromptTemplate.from_messages(messages)
+
+
+class CompiledPrompt:
+    """A prompt template plus its prompt | llm runnable for every API key, built once at startup."""
+
+    def __init__(self, prompt: ChatPromptTemplate, llms: list):
+        self.prompt = prompt
+        self.chains: List[Runnable] = [prompt | llm for llm in llms]
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import re
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from config import (
+    QUERY_ROUTER_ENABLED,
+    QUERY_ROUTER_CLASSIFIER,
+    QUERY_ROUTER_MIN_SIMILARITY,
+    CONTEXT_TOKEN_BUDGET,
+)
+from app.services.search_cache import is_news_like
+from app.utils.tokens import count_tokens
+
+logger = logging.getLogger("A.X.I.O.M")
+
+# Used for the "tokens saved" estimate until a real search section has been measured.
+SEARCH_TOKEN_ESTIMATE = 600
+
+_SMALL_TALK_PHRASE = (
+    r"(hi|hello|hey|hiya|yo|sup|howdy|hola|greetings|good (morning|afternoon|evening|night)|"
+    r"thanks|thank you|thx|ty|bye|goodbye|see (you|ya)|how are you( doing)?|what'?s up|who are you|what are you)"
+)
+# The whole message is greetings / thanks / farewells, optionally followed by filler words. Short
+# replies like "yes", "sure" or "ok" are not in here: they usually answer the previous turn and need
+# the same search and context it had.
+_SMALL_TALK = re.compile(
+    rf"{_SMALL_TALK_PHRASE}( ({_SMALL_TALK_PHRASE}|there|axiom|buddy|so much|a lot|again|today))*"
+)
+# Questions about earlier conversations are answered from the index, not the web. A bare "my" is not
+# enough ("how do I reset my router", "weather in my city"): those go on to the other checks.
+_PERSONAL = re.compile(
+    r"\b(remember|recall|remind me|told you|you said|i said|i told|i mentioned|last time|"
+    r"we (talked|discussed|spoke|chatted))\b"
+)
+
+# Example queries per class for the optional embedding classifier.
+_PROTOTYPES: Dict[str, List[str]] = {
+    "chitchat": [
+        "hello there, how are you doing?",
+        "thanks, that was really helpful",
+        "good night, talk to you later",
+        "see you tomorrow, bye",
+        "who are you?",
+    ],
+    "personal": [
+        "what's my name?",
+        "do you remember what I told you earlier?",
+        "what did we talk about last time?",
+        "what are my hobbies?",
+        "remind me what my plans were",
+    ],
+    "web": [
+        "what's the latest news about the election?",
+        "what is the weather forecast for tomorrow?",
+        "who won the match last night?",
+        "current price of bitcoin",
+        "what happened in the world today?",
+    ],
+}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+class Route(NamedTuple):
+    search: bool
+    retrieve: bool
+    reason: str
+
+    @property
+    def name(self) -> str:
+        if self.search and self.retrieve:
+            return "both"
+        return "search" if self.search else "retrieve" if self.retrieve else "none"
+
+
+class QueryRouter:
+    """
+    Cheap per-query decision on whether a request needs web search and/or index retrieval.
+
+    Heuristics catch small talk (neither) and questions about the user's own data (retrieval
+    only); with use_classifier, remaining queries are matched against example prototypes by
+    embedding similarity. record() tracks skipped calls and an estimate of the prompt tokens saved.
+    """
+
+    def __init__(
+        self,
+        embed_query: Optional[Callable[[str], List[float]]] = None,
+        embed_documents: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        enabled: bool = QUERY_ROUTER_ENABLED,
+        use_classifier: bool = QUERY_ROUTER_CLASSIFIER,
+        min_similarity: float = QUERY_ROUTER_MIN_SIMILARITY,
+    ):
+        self.enabled = enabled
+        self.use_classifier = use_classifier and embed_query is not None and embed_documents is not None
+        self.min_similarity = min_similarity
+        self._embed_query = embed_query
+        self._embed_documents = embed_documents
+        self._prototypes: Optional[Dict[str, np.ndarray]] = None
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, int]] = {"chat": {}, "realtime": {}}
+        self._searches_skipped = 0
+        self._retrievals_skipped = 0
+        self._tokens_saved = 0
+        self._search_tokens = [0, 0]  # [total, samples] of search sections actually sent
+        self._context_tokens = [0, 0]
+
+    def _default(self, realtime: bool, reason: str = "default") -> Route:
+        return Route(search=realtime, retrieve=True, reason=reason)
+
+    def _load_prototypes(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            if self._prototypes is None:
+                prototypes = {}
+                for label, texts in _PROTOTYPES.items():
+                    vectors = np.asarray(self._embed_documents(texts), dtype=np.float32)
+                    prototypes[label] = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+                self._prototypes = prototypes
+            return self._prototypes
+
+    def _classify(self, question: str) -> Optional[str]:
+        prototypes = self._load_prototypes()
+        q = np.asarray(self._embed_query(question), dtype=np.float32)
+        q = q / max(np.linalg.norm(q), 1e-12)
+        scores = {label: float((vectors @ q).max()) for label, vectors in prototypes.items()}
+        label = max(scores, key=scores.get)
+        return label if scores[label] >= self.min_similarity else None
+
+    def route(self, question: str, realtime: bool = False) -> Route:
+        if not self.enabled:
+            return self._default(realtime, "disabled")
+        text = _normalize(question)
+        if not text or _SMALL_TALK.fullmatch(text):
+            return Route(search=False, retrieve=False, reason="small talk")
+        if _PERSONAL.search(text) and not is_news_like(text):
+            return Route(search=False, retrieve=True, reason="personal")
+        if realtime and is_news_like(text):
+            return Route(search=True, retrieve=True, reason="news")
+        if self.use_classifier:
+            try:
+                label = self._classify(question)
+            except Exception as e:
+                logger.warning(f"Query classifier failed, using default route: {e}")
+                label = None
+            if label == "chitchat":
+                return Route(search=False, retrieve=False, reason="classifier: chitchat")
+            if label == "personal":
+                return Route(search=False, retrieve=True, reason="classifier: personal")
+            if label == "web":
+                return self._default(realtime, "classifier: web")
+        return self._default(realtime)
+
+    async def aroute(self, question: str, realtime: bool = False) -> Route:
+        # The classifier may embed the question; keep that off the event loop.
+        if self.enabled and self.use_classifier:
+            return await asyncio.to_thread(self.route, question, realtime)
+        return self.route(question, realtime)
+
+    def record(self, route: Route, realtime: bool, search_results: str = "", context: str = "") -> None:
+        """Count the route taken and what it skipped; search_results/context are what was actually retrieved."""
+        search_tokens = count_tokens(search_results) if search_results else 0
+        context_tokens = count_tokens(context) if context else 0
+        with self._lock:
+            routes = self._routes["realtime" if realtime else "chat"]
+            routes[route.name] = routes.get(route.name, 0) + 1
+            if realtime:
+                if route.search:
+                    if search_tokens:
+                        self._search_tokens[0] += search_tokens
+                        self._search_tokens[1] += 1
+                else:
+                    self._searches_skipped += 1
+                    total, samples = self._search_tokens
+                    self._tokens_saved += total // samples if samples else SEARCH_TOKEN_ESTIMATE
+            if route.retrieve:
+                if context_tokens:
+                    self._context_tokens[0] += context_tokens
+                    self._context_tokens[1] += 1
+            else:
+                self._retrievals_skipped += 1
+                total, samples = self._context_tokens
+                self._tokens_saved += total // samples if samples else CONTEXT_TOKEN_BUDGET
+        if route.reason != "default":
+            logger.info(f"Query routed to '{route.name}' ({route.reason})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "classifier": self.use_classifier,
+                "routes": {mode: dict(routes) for mode, routes in self._routes.items()},
+                "searches_skipped": self._searches_skipped,
+                "retrievals_skipped": self._retrievals_skipped,
+                "estimated_tokens_saved": self._tokens_saved,
+            }
@@ -0,0 +1,108 @@
+import time
+from typing import List, Optional
+
+from config import GROQ_RPM, GROQ_RPD, GROQ_TPM, GROQ_TPD
+
+
+class TokenBucket:
+    """capacity units, refilled continuously over period_seconds. The level may go negative
+    (debt) when a reservation is settled for more than was estimated."""
+
+    def __init__(self, capacity: float, period_seconds: float):
+        self.period_seconds = period_seconds
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period_seconds
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # Anything larger than the bucket is admitted once the bucket is full.
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def give(self, amount: float, now: float):
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def resize(self, capacity: float, now: float):
+        """Change the limit; what has been used so far still counts against the new one."""
+        self._refill(now)
+        self.level = min(float(capacity), self.level + capacity - self.capacity)
+        self.capacity = float(capacity)
+        self.rate = self.capacity / self.period_seconds
+
+
+class KeyRateLimiter:
+    """
+    Client-side model of one Groq key's quota: requests/min, requests/day, tokens/min and
+    tokens/day buckets (a limit of 0 disables that bucket). Not locked itself; KeyPool
+    calls it under its own lock.
+    """
+
+    def __init__(self, rpm: int = GROQ_RPM, rpd: int = GROQ_RPD, tpm: int = GROQ_TPM, tpd: int = GROQ_TPD):
+        self.request_buckets: List[TokenBucket] = [
+            TokenBucket(limit, period) for limit, period in ((rpm, 60.0), (rpd, 86400.0)) if limit > 0
+        ]
+        self.token_buckets: List[TokenBucket] = [
+            TokenBucket(limit, period) for limit, period in ((tpm, 60.0), (tpd, 86400.0)) if limit > 0
+        ]
+
+    def adopt_limits(self, requests_per_day: Optional[int], tokens_per_minute: Optional[int], now: float):
+        """
+        Size the buckets from Groq's headers (x-ratelimit-limit-requests is per day, -tokens per
+        minute). The limits Groq does not report (requests/minute, tokens/day) are scaled by the
+        same factor, so a higher tier is not held to the free-tier numbers.
+        """
+        self._adopt(self.request_buckets, 86400.0, requests_per_day, now)
+        self._adopt(self.token_buckets, 60.0, tokens_per_minute, now)
+
+    @staticmethod
+    def _adopt(buckets: List[TokenBucket], reported_period: float, limit: Optional[int], now: float):
+        if not limit or limit <= 0:
+            return
+        reported = next((b for b in buckets if b.period_seconds == reported_period), None)
+        if reported is None:
+            buckets.append(TokenBucket(limit, reported_period))
+            return
+        if reported.capacity == limit:
+            return
+        ratio = limit / reported.capacity
+        for bucket in buckets:
+            bucket.resize(limit if bucket is reported else bucket.capacity * ratio, now)
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        waits = [bucket.wait_time(1, now) for bucket in self.request_buckets]
+        waits += [bucket.wait_time(tokens, now) for bucket in self.token_buckets]
+        return max(waits, default=0.0)
+
+    def reserve(self, tokens: int, now: float):
+        for bucket in self.request_buckets:
+            bucket.take(1, now)
+        for bucket in self.token_buckets:
+            bucket.take(tokens, now)
+
+    def settle(self, reserved: int, used: Optional[int], now: float):
+        """Correct a reservation once the real usage is known (used=None: the request consumed no tokens)."""
+        difference = reserved - (used or 0)
+        for bucket in self.token_buckets:
+            if difference > 0:
+                bucket.give(difference, now)
+            elif difference < 0:
+                bucket.take(-difference, now)
+
+    def stats(self, now: float) -> dict:
+        for bucket in self.request_buckets + self.token_buckets:
+            bucket._refill(now)
+        return {
+            "requests_available": [int(b.level) for b in self.request_buckets],
+            "tokens_available": [int(b.level) for b in self.token_buckets],
+        }
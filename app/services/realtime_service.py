@@ -1,113 +1,198 @@
-from typing import List, Optional
-from tavily import TavilyClient
+from typing import List, Optional, Tuple
+from tavily import TavilyClient, AsyncTavilyClient
+import asyncio
 import logging
 import os
-
-from app.services.groq_service import GroqService, escape_curly_braces
+import time
+
+from config import (
+    REALTIME_SEARCH_TIMEOUT_SECONDS,
+    REALTIME_RETRIEVAL_TIMEOUT_SECONDS,
+    REALTIME_CONTEXT_DEADLINE_SECONDS,
+)
+
+from app.services.groq_service import GroqService
+from app.services.prompts import REALTIME_SYSTEM_TEMPLATE, CompiledPrompt, chat_prompt, section
+from app.services.key_pool import KeyPool
+from app.services.query_router import QueryRouter
 from app.services.vector_store import VectorStoreService
 from app.utils.time_info import get_time_information
-from app.utils.retry import with_retry
-from config import AXIOM_SYSTEM_PROMPT
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import HumanMessage, AIMessage
+from app.services.search_cache import SearchCache
 
 logger = logging.getLogger("A.X.I.O.M")
 
+
+def _consume_result(task: asyncio.Task) -> None:
+    # Retrieve the outcome of an abandoned branch so asyncio doesn't log "exception was never retrieved".
+    if not task.cancelled():
+        task.exception()
+
+
 class RealtimeGroqService(GroqService):
-    def __init__(self, vector_store_service: VectorStoreService):
-        super().__init__(vector_store_service)
+    def __init__(
+            self,
+            vector_store_service: VectorStoreService,
+            key_pool: Optional[KeyPool] = None,
+            router: Optional[QueryRouter] = None,
+    ):
+        super().__init__(vector_store_service, key_pool, router)
+        self.realtime_prompt = CompiledPrompt(chat_prompt(REALTIME_SYSTEM_TEMPLATE), self.llms)
         tavily_api_key = os.getenv("TAVILY_API_KEY", "")
         if tavily_api_key:
             self.tavily_client = TavilyClient(api_key=tavily_api_key)
+            self.async_tavily_client = AsyncTavilyClient(api_key=tavily_api_key)
             logger.info("Tavily search client initialized successfully")
         else:
             self.tavily_client = None
+            self.async_tavily_client = None
             logger.warning("TAVILY_API_KEY not set. Realtime search will be unavailable.")
+        self.search_cache = SearchCache(self.tavily_client, self.async_tavily_client)
+
+    def _search_params(self, num_results: int) -> dict:
+        return dict(
+            search_depth="basic", # "basic" is faster, "advanced" is more thorough
+            max_results=num_results,
+            include_answer=False, # We will format our own results
+            include_raw_content=False, # Dont need full page content
+        )
+
+    def _format_search_results(self, query: str, response: dict, num_results: int) -> str:
+        results = response.get('results', [])
+
+        if not results:
+            logger.warning(f"No Tavily search results found for query: {query}")
+            return ""
+
+        formatted_results = f"Search results for '{query}': \n[start]\n"
+
+        for i, result in enumerate(results[:num_results], 1):
+            title = result.get('title', 'No title')
+            content = result.get('content', 'No description')
+            url = result.get('url', '')
+
+            formatted_results += f"Title: {title}\n"
+            formatted_results += f"Description: {content}\n"
+            if url:
+                formatted_results += f"URL: {url}\n"
+            formatted_results += "\n"
+
+        formatted_results += "[end]"
+
+        logger.info(f"Tavily search completed for query: {query} ({len(results)} results)")
+        return formatted_results
     
     def search_tavily(self, query: str, num_results: int = 5) -> str:
         if not self.tavily_client:
             logger.warning("Tavily client not initialized. TAVILY_API_KEY not set.")
-            return
+            return ""
         
         try:
-            response = with_retry(
-                lambda: self.tavily_client. search(
-                    query=query,
-                    search_depth="basic", # "basic" is faster, "advanced" is more thorough
-                    max_results=num_results,
-                    include_answer=False, # We will format our own results
-                    include_raw_content=False, # Dont need full page content
-                ),
-                max_retries=3,
-                initial_delay=1.0,
-            )
-            results = response.get('results', [])
-
-            if not results:
-                logger.warning(f"No Tavily search results found for query: {query}")
-                return ""
-
-            formatted_results = f"Search results for '{query}': \n[start]\n"
-
-            for i, result in enumerate(results[:num_results], 1):
-                title = result.get('title', 'No title')
-                content = result.get('content', 'No description')
-                url = result.get('url', '')
-
-                formatted_results += f"Title: {title}\n"
-                formatted_results += f"Description: {content}\n"
-                if url:
-                    formatted_results += f"URL: {url}\n"
-                formatted_results += "\n"
-
-            formatted_results += "[end]"
-
-            logger.info(f"Tavily search completed for query: {query} ({len(results)} results)")
-            return formatted_results
+            # Cached per query; retries happen inside the cache, once per coalesced group.
+            response = self.search_cache.search(query, **self._search_params(num_results))
+            return self._format_search_results(query, response, num_results)
         
         except Exception as e:
             logger.error(f"Error performing Tavily search: {e}")
             return ""
 
-    def get_response(self, question: str, chat_history: Optional[List[tuple]] = None) -> str:
+    async def asearch_tavily(self, query: str, num_results: int = 5) -> str:
+        if not self.async_tavily_client:
+            logger.warning("Tavily client not initialized. TAVILY_API_KEY not set.")
+            return ""
+
         try:
+            response = await self.search_cache.asearch(query, **self._search_params(num_results))
+            return self._format_search_results(query, response, num_results)
+
+        except Exception as e:
+            logger.error(f"Error performing Tavily search: {e}")
+            return ""
+
+    def _compose_realtime_prompt(
+            self,
+            question: str,
+            chat_history: Optional[List[tuple]],
+            context: str,
+            search_results: str,
+            history_summary: Optional[str] = None,
+    ) -> Tuple[CompiledPrompt, dict]:
+        return self.realtime_prompt, {
+            "time_info": get_time_information(),
+            "history_summary": section("Summary of the earlier conversation", history_summary),
+            "search_results": section("Recent search results", search_results),
+            "context": section("Relevant context from your learning data and past conversations", context),
+            "history": self._history_messages(chat_history),
+            "question": question,
+        }
+
+    async def _abranch_result(self, task: asyncio.Task, name: str, timeout: float, deadline: float) -> str:
+        budget = max(0.0, min(timeout, deadline - time.monotonic()))
+        try:
+            # Shielded so a late branch is not cancelled: its result still lands in the search/query caches.
+            return await asyncio.wait_for(asyncio.shield(task), budget)
+        except asyncio.TimeoutError:
+            logger.warning("Realtime %s did not finish within %.1fs; continuing without it", name, budget)
+            task.add_done_callback(_consume_result)
+            return ""
+        except Exception as e:
+            logger.error(f"Realtime {name} failed: {e}")
+            return ""
+
+    def _build_prompt(
+            self, question: str, chat_history: Optional[List[tuple]] = None, history_summary: Optional[str] = None,
+    ) -> Tuple[CompiledPrompt, dict]:
+        # Sequential and without deadlines: the endpoints use _abuild_prompt, which fans out.
+        route = self.router.route(question, realtime=True)
+        search_results = context = ""
+        if route.search:
             logger.info(f"Searching Tavily for: {question}")
             search_results = self.search_tavily(question, num_results=5)
+        if route.retrieve:
+            context = self._retrieve_context(question)
+        self.router.record(route, realtime=True, search_results=search_results, context=context)
+        return self._compose_realtime_prompt(question, chat_history, context, search_results, history_summary)
+
+    async def _abuild_prompt(
+            self, question: str, chat_history: Optional[List[tuple]] = None, history_summary: Optional[str] = None,
+    ) -> Tuple[CompiledPrompt, dict]:
+        route = await self.router.aroute(question, realtime=True)
+        deadline = time.monotonic() + REALTIME_CONTEXT_DEADLINE_SECONDS
+        branches = []
+        if route.search:
+            logger.info(f"Searching Tavily for: {question}")
+            search_task = asyncio.ensure_future(self.asearch_tavily(question, num_results=5))
+            branches.append(self._abranch_result(search_task, "web search", REALTIME_SEARCH_TIMEOUT_SECONDS, deadline))
+        if route.retrieve:
+            context_task = asyncio.ensure_future(self._aretrieve_context(question))
+            branches.append(self._abranch_result(context_task, "retrieval", REALTIME_RETRIEVAL_TIMEOUT_SECONDS, deadline))
+        results = iter(await asyncio.gather(*branches))
+        search_results = next(results) if route.search else ""
+        context = next(results) if route.retrieve else ""
+        self.router.record(route, realtime=True, search_results=search_results, context=context)
+        return self._compose_realtime_prompt(question, chat_history, context, search_results, history_summary)
+
+    def get_response(
+            self, question: str, chat_history: Optional[List[tuple]] = None, history_summary: Optional[str] = None,
+    ) -> str:
+        try:
+            compiled, variables = self._build_prompt(question, chat_history, history_summary)
+            response_content = self._invoke_llm(compiled, variables)
+            logger.info(f"Realtime response generated for: {question}")
+            return response_content
 
-            context =""
-            try:
-                retriever = self.vector_store_service.get_retriever(k=10)
-                context_docs = retriever.invoke(question)
-                context = "\n".join([doc.page_content for doc in context_docs]) if context_docs else ""
-            except Exception as retrieval_err:
-                logger.warning("Vector store retrieval failed, using empty context: %s", retrieval_err)
-
-            time_info = get_time_information()
-            system_message = AXIOM_SYSTEM_PROMPT+ f"\n\nCurrent time and date: {time_info}"
-
-            if search_results:
-                escaped_search_results = escape_curly_braces(search_results)
-                system_message += f"\n\nRecent search results:\n{escaped_search_results}"
-
-            if context:
-                escaped_context = escape_curly_braces(context)
-                system_message += f"\n\nRelevant context from your learning data and past conversations:\n{escaped_context}"
-
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_message),
-                MessagesPlaceholder(variable_name="history"),
-                ("human", "{question}"),
-            ])
-            messages = []
-            if chat_history:
-                for human_msg, ai_msg in chat_history:
-                    messages.append (HumanMessage(content=human_msg) )
-                    messages.append(AIMessage(content=ai_msg))
-
-            response_content = self ._invoke_llm(prompt, messages, question)
+        except Exception as e:
+            logger.error(f"Error in realtime get_response: {e}", exc_info=True)
+            raise
+
+    async def aget_response(
+            self, question: str, chat_history: Optional[List[tuple]] = None, history_summary: Optional[str] = None,
+    ) -> str:
+        try:
+            compiled, variables = await self._abuild_prompt(question, chat_history, history_summary)
+            response_content = await self._ainvoke_llm(compiled, variables)
             logger.info(f"Realtime response generated for: {question}")
             return response_content
 
         except Exception as e:
             logger.error(f"Error in realtime get_response: {e}", exc_info=True)
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import (
+    SEARCH_CACHE_TTL_SECONDS,
+    SEARCH_CACHE_NEWS_TTL_SECONDS,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_FILE,
+    SEARCH_CACHE_PERSIST,
+)
+from app.utils.retry import with_retry, with_retry_async
+from app.utils.ttl_cache import TTLCache
+from app.utils.metrics import span
+
+logger = logging.getLogger("A.X.I.O.M")
+
+# Queries about things that change within minutes get the short TTL.
+_NEWS_LIKE = re.compile(
+    r"\b(news|latest|breaking|today|tonight|now|current(ly)?|live|score|scores|price|prices|stock|stocks|"
+    r"weather|forecast|trending|update|updates|this (week|morning|evening)|yesterday|right now)\b",
+    re.IGNORECASE,
+)
+
+
+def is_news_like(query: str) -> bool:
+    return bool(_NEWS_LIKE.search(query))
+
+
+def cache_key(query: str, params: Dict[str, Any]) -> str:
+    normalized = " ".join(query.lower().split())
+    return json.dumps([normalized, params], sort_keys=True, separators=(",", ":"))
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SearchCache:
+    """
+    Tavily results cached by normalized query + search parameters.
+
+    Entries live SEARCH_CACHE_TTL_SECONDS (SEARCH_CACHE_NEWS_TTL_SECONDS for news-like
+    queries). Concurrent identical searches are coalesced: one caller performs the request
+    (with retries) and the rest wait for its result. Clients are injected, so a stub client
+    makes this testable offline. With persist_path, live entries survive restarts.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        async_client=None,
+        ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS,
+        news_ttl_seconds: float = SEARCH_CACHE_NEWS_TTL_SECONDS,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+        persist_path: Optional[Path] = SEARCH_CACHE_FILE if SEARCH_CACHE_PERSIST else None,
+    ):
+        self.client = client
+        self.async_client = async_client
+        self.ttl_seconds = ttl_seconds
+        self.news_ttl_seconds = news_ttl_seconds
+        self.persist_path = persist_path
+        self._cache = TTLCache(max_entries, ttl_seconds)
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[str, asyncio.Future] = {}
+        self.requests = 0
+        self.coalesced = 0
+        if persist_path is not None:
+            self.load()
+
+    def _ttl_for(self, query: str) -> float:
+        return self.news_ttl_seconds if is_news_like(query) else self.ttl_seconds
+
+    def search(self, query: str, **params) -> dict:
+        key = cache_key(query, params)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                # A leader that finished after our lookup stores its result before dropping its flight.
+                cached = self._cache.peek(key)
+                if cached is not None:
+                    self.coalesced += 1
+                    return cached
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.requests += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            with span("tavily_search"):
+                flight.result = with_retry(
+                    lambda: self.client.search(query=query, **params),
+                    max_retries=3,
+                    initial_delay=1.0,
+                )
+            self._cache.put(key, flight.result, ttl_seconds=self._ttl_for(query))
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    async def asearch(self, query: str, **params) -> dict:
+        key = cache_key(query, params)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        future = self._async_flights.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: a follower giving up must not cancel the leader's request.
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_flights[key] = future
+        try:
+            self.requests += 1
+            with span("tavily_search"):
+                result = await with_retry_async(
+                    lambda: self.async_client.search(query=query, **params),
+                    max_retries=3,
+                    initial_delay=1.0,
+                )
+            self._cache.put(key, result, ttl_seconds=self._ttl_for(query))
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            if not future.done():
+                # Followers of a cancelled leader get an ordinary error, not a cancellation of their own.
+                future.set_exception(RuntimeError("Search was cancelled") if isinstance(e, asyncio.CancelledError) else e)
+                # Mark retrieved so an unobserved failure does not log "exception never retrieved".
+                future.exception()
+            raise
+        finally:
+            self._async_flights.pop(key, None)
+
+    def load(self):
+        if not self.persist_path or not self.persist_path.exists():
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            now = time.time()
+            for key, response, expires_at in entries:
+                if expires_at is None:
+                    self._cache.put(key, response, ttl_seconds=0)
+                elif expires_at > now:
+                    self._cache.put(key, response, ttl_seconds=expires_at - now)
+            logger.info("Loaded %s cached search result(s)", len(entries))
+        except Exception as e:
+            logger.warning("Could not load search cache %s: %s", self.persist_path, e)
+
+    def save(self):
+        """Write live entries (with their remaining TTL) to persist_path, if persistence is on."""
+        if not self.persist_path:
+            return
+        now = time.time()
+        # Wall-clock expiry, so time spent shut down counts against the TTL.
+        entries = [
+            [key, response, None if ttl is None else now + ttl]
+            for key, response, ttl in self._cache.snapshot()
+        ]
+        tmp_path = self.persist_path.with_name(self.persist_path.name + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            logger.warning("Could not save search cache %s: %s", self.persist_path, e)
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "requests": self.requests, "coalesced": self.coalesced}
@@ -0,0 +1,172 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.models import ChatMessage
+
+logger = logging.getLogger("A.X.I.O.M")
+
+# Rough per-message overhead (Pydantic object, role, list slot) on top of the content itself.
+_MESSAGE_OVERHEAD_BYTES = 200
+
+
+def _message_size(message: ChatMessage) -> int:
+    return len(message.content.encode("utf-8")) + _MESSAGE_OVERHEAD_BYTES
+
+
+class SessionCache:
+    """
+    LRU cache of in-memory chat sessions, bounded by session count and approximate bytes.
+
+    Evicted sessions are taken out under the lock and flushed after it is released:
+    on_evict(session_id, messages) saves them and returns False (or raises) on failure,
+    in which case the session goes back into the cache and is retried on the next
+    eviction. Until its flush finishes, an evicted session is served from memory, so a
+    concurrent access never reloads a stale copy from disk. Once it is saved and gone,
+    on_drop(session_id) is called under the lock to release per-session state.
+    Lookups through get() update the hit/miss counters.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int,
+        max_bytes: int,
+        on_evict: Optional[Callable[[str, List[ChatMessage]], bool]] = None,
+        on_drop: Optional[Callable[[str], None]] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.on_drop = on_drop
+        self._sessions: "OrderedDict[str, List[ChatMessage]]" = OrderedDict()
+        # Evicted sessions whose flush is still running: session_id -> [messages, flushes in flight].
+        self._flushing: Dict[str, list] = {}
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions.keys())
+
+    def get(self, session_id: str) -> Optional[List[ChatMessage]]:
+        with self._lock:
+            messages = self._lookup(session_id)
+            if messages is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return messages
+
+    def peek(self, session_id: str) -> Optional[List[ChatMessage]]:
+        """Like get() but without touching LRU order or counters."""
+        with self._lock:
+            messages = self._sessions.get(session_id)
+            if messages is None and session_id in self._flushing:
+                messages = self._flushing[session_id][0]
+            return messages
+
+    def __setitem__(self, session_id: str, messages: List[ChatMessage]):
+        with self._lock:
+            self._store(session_id, messages)
+            victims = self._evict()
+        self._flush(victims)
+
+    def append(
+        self,
+        session_id: str,
+        message: ChatMessage,
+        loader: Optional[Callable[[], Optional[List[ChatMessage]]]] = None,
+    ):
+        """Append to a session, first reloading it through loader() if it was evicted."""
+        with self._lock:
+            if self._lookup(session_id) is None:
+                self.misses += 1
+                self._store(session_id, (loader() if loader else None) or [])
+            self._sessions[session_id].append(message)
+            size = _message_size(message)
+            self._sizes[session_id] += size
+            self._total_bytes += size
+            victims = self._evict()
+        self._flush(victims)
+
+    def _lookup(self, session_id: str) -> Optional[List[ChatMessage]]:
+        # Caller holds the lock. A session that is still being flushed is put back as is.
+        messages = self._sessions.get(session_id)
+        if messages is None and session_id in self._flushing:
+            messages = self._flushing[session_id][0]
+            self._store(session_id, messages)
+        if messages is not None:
+            self._sessions.move_to_end(session_id)
+        return messages
+
+    def _store(self, session_id: str, messages: List[ChatMessage], last: bool = True):
+        self._total_bytes -= self._sizes.pop(session_id, 0)
+        size = sum(_message_size(m) for m in messages)
+        self._sessions[session_id] = messages
+        self._sessions.move_to_end(session_id, last=last)
+        self._sizes[session_id] = size
+        self._total_bytes += size
+
+    def _evict(self) -> List[Tuple[str, List[ChatMessage]]]:
+        # Caller holds the lock; the victims are flushed by _flush() once it is released.
+        # The most recently used session is never evicted, even if it alone is over budget.
+        victims = []
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes
+        ):
+            session_id, messages = self._sessions.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(session_id, 0)
+            pending = self._flushing.setdefault(session_id, [messages, 0])
+            pending[0] = messages
+            pending[1] += 1
+            victims.append((session_id, messages))
+            self.evictions += 1
+        return victims
+
+    def _flush(self, victims: List[Tuple[str, List[ChatMessage]]]):
+        for session_id, messages in victims:
+            saved = True
+            if self.on_evict:
+                try:
+                    saved = self.on_evict(session_id, messages) is not False
+                except Exception as e:
+                    logger.error("Failed to flush evicted session %s: %s", session_id, e)
+                    saved = False
+            with self._lock:
+                pending = self._flushing.get(session_id)
+                if pending is not None:
+                    pending[1] -= 1
+                    if pending[1] <= 0:
+                        del self._flushing[session_id]
+                if session_id in self._sessions:
+                    continue  # accessed again while flushing; it stays cached
+                if not saved:
+                    logger.warning("Keeping session %s cached until it can be saved", session_id)
+                    self._store(session_id, messages, last=False)
+                elif pending is None or pending[1] <= 0:
+                    if self.on_drop:
+                        self.on_drop(session_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._total_bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,121 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from app.services.chat_store import ChatStore, FileChatStore
+
+logger = logging.getLogger("A.X.I.O.M")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    ts REAL,
+    UNIQUE (session_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at);
+CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages(ts);
+"""
+
+
+class SqliteChatStore(ChatStore):
+    """
+    Chat sessions in one SQLite database (WAL mode), one connection per thread.
+    sessions.updated_at is bumped on every write, so "which sessions changed since
+    the last index build" is a single indexed query.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> Optional[List[dict]]:
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone() is None:
+            return None
+        rows = conn.execute(
+            "SELECT role, content, ts FROM messages WHERE session_id = ? ORDER BY seq",
+            (session_id,),
+        ).fetchall()
+        messages = []
+        for role, content, ts in rows:
+            msg = {"role": role, "content": content}
+            if ts is not None:
+                msg["ts"] = ts
+            messages.append(msg)
+        return messages
+
+    def _touch_session(self, conn: sqlite3.Connection, session_id: str, now: float):
+        conn.execute(
+            "INSERT INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at",
+            (session_id, now, now),
+        )
+
+    def _insert_messages(self, conn: sqlite3.Connection, session_id: str, messages: List[dict], first_seq: int):
+        conn.executemany(
+            "INSERT INTO messages (session_id, seq, role, content, ts) VALUES (?, ?, ?, ?, ?)",
+            [
+                (session_id, first_seq + i, msg.get("role"), msg.get("content", ""), msg.get("ts"))
+                for i, msg in enumerate(messages)
+            ],
+        )
+
+    def append(self, session_id: str, messages: List[dict], start: int, all_messages: Callable[[], List[dict]]):
+        if not messages:
+            return
+        conn = self._connect()
+        with conn:
+            self._touch_session(conn, session_id, time.time())
+            self._insert_messages(conn, session_id, messages, start)
+
+    def compact(self, session_id: str, messages: List[dict]):
+        conn = self._connect()
+        with conn:
+            self._touch_session(conn, session_id, time.time())
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._insert_messages(conn, session_id, messages, 0)
+
+    def session_ids(self) -> List[str]:
+        rows = self._connect().execute("SELECT session_id FROM sessions ORDER BY session_id").fetchall()
+        return [row[0] for row in rows]
+
+    def changed_since(self, timestamp: float) -> List[str]:
+        rows = self._connect().execute(
+            "SELECT session_id FROM sessions WHERE updated_at > ?", (timestamp,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+
+def migrate_files_to_sqlite(source: FileChatStore, target: SqliteChatStore) -> int:
+    """Copy every chat_*.jsonl / chat_*.json session into the SQLite store. Returns the number imported."""
+    imported = 0
+    for session_id in source.session_ids():
+        messages = source.load(session_id) or []
+        target.compact(session_id, messages)
+        imported += 1
+        logger.info("Imported session %s (%s messages)", session_id, len(messages))
+    return imported
@@ -1,48 +1,109 @@
-import json
+import asyncio
+import hashlib
 import logging
-from pathlib import Path
-from typing import List, Optional
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_core.documents import Document
 
 from config import (
 LEARNING_DATA_DIR,
-CHATS_DATA_DIR,
 VECTOR_STORE_DIR,
-EMBEDDING_MODEL,
 CHUNK_SIZE,
 CHUNK_OVERLAP,
+EMBEDDING_CACHE_FILE,
+EMBEDDING_CACHE_MAX_ENTRIES,
+EMBEDDING_BATCH_SIZE,
+EMBEDDING_THREADS,
+QUERY_CACHE_MAX_ENTRIES,
+QUERY_CACHE_TTL_SECONDS,
+)
+from app.services.embedding_cache import CachedEmbeddings, EmbeddingCache
+from app.services.embedding_pipeline import BatchedEmbeddings
+from app.services.embedding_backend import create_embedding_backend
+from app.services.chat_store import ChatStore, create_chat_store, session_source
+from app.services.chunking import TurnChunker
+from app.utils.metrics import span
+from app.services.index_store import (
+    IndexFormatError, add_chunks, append_updates, chunk_label, load_index, remove_chunks, save_index, update_manifest,
+)
+from app.utils.rwlock import ReadWriteLock
+from app.utils.ttl_cache import TTLCache
+from app.services.ann_index import (
+    apply_search_params, build_index, choose_index_type, exact_vectors, needs_type_change, supports_removal,
 )
 
 logger = logging.getLogger("A.X.I.O.M")
 
+# Source name used for the "no data" placeholder so incremental updates can drop it.
+PLACEHOLDER_SOURCE = "__placeholder__"
+
+
+def _chunk_id(source: str, content: str, occurrence: int) -> str:
+    # Stable ID: the same chunk text from the same source always maps to the same ID,
+    # so unchanged chunks are recognised and never re-embedded.
+    digest = hashlib.sha1(f"{source}\x00{occurrence}\x00{content}".encode("utf-8")).hexdigest()
+    return f"{source}:{digest}"
+
+
 class VectorStoreService:
-    def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=EMBEDDING_MODEL,
-            model_kwargs={"device": "cpu"},
-        )
+    def __init__(self, chat_store: Optional[ChatStore] = None):
+        # model_id names model + backend (e.g. "...MiniLM-L6-v2+onnx-int8") for the cache key and manifest.
+        base_embeddings, self.model_id = create_embedding_backend(EMBEDDING_BATCH_SIZE, EMBEDDING_THREADS)
+        self.embedding_cache = EmbeddingCache(EMBEDDING_CACHE_FILE, self.model_id, EMBEDDING_CACHE_MAX_ENTRIES)
+        # Cache -> batched pipeline -> model: only unseen chunks reach the model, in length-sorted batches.
+        self.embedding_pipeline = BatchedEmbeddings(base_embeddings)
+        self.embeddings = CachedEmbeddings(self.embedding_pipeline, self.embedding_cache)
         self.text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
         )
+        self.turn_chunker = TurnChunker(self.text_splitter, max_chars=CHUNK_SIZE)
+        self.chat_store = chat_store or create_chat_store()
+        # Start time of the last build/sync that covered every session (None = unknown).
+        self._last_build_time: Optional[float] = None
         self.vector_store: Optional[FAISS] = None
+        # source -> IDs of the chunks currently indexed for it
+        self._source_ids: Dict[str, Set[str]] = {}
+        # Serializes writers (embedding, persistence); readers never take it.
+        self._update_lock = threading.Lock()
+        # Held shared by searches and exclusively while the live index is changed in place.
+        self._index_lock = ReadWriteLock()
+        # Chunk updates in the on-disk update log since the last snapshot.
+        self._logged_updates = 0
+        # Bumped after every publish/search-param change; retrieval results are cached per version.
+        self.index_version = 0
+        self._query_embeddings = TTLCache(QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECONDS)
+        self._search_results = TTLCache(QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECONDS)
 
-        if VECTOR_STORE_DIR.exists():
-            try:
-                self.vector_store = FAISS.load_local(
-                    str(VECTOR_STORE_DIR),
-                    self.embeddings,
-                    allow_dangerous_deserialization=True
-                )
-                logger.info("Loaded existing vector store")
-            except Exception:
-                logger.warning("Failed to load existing vector store, rebuilding...")
-                self.create_vector_store()
-        else:
+        try:
+            loaded = load_index(VECTOR_STORE_DIR, self.embeddings, self.model_id)
+        except IndexFormatError as e:
+            logger.warning("Existing vector store cannot be used (%s), rebuilding...", e)
+            loaded = None
+        except Exception as e:
+            logger.warning("Failed to load existing vector store (%s), rebuilding...", e)
+            loaded = None
+
+        if loaded is None:
             self.create_vector_store()
+        else:
+            self.vector_store, manifest, self._logged_updates = loaded
+            apply_search_params(self.vector_store.index)
+            self._source_ids = self._build_source_map(self.vector_store)
+            if (manifest.get("chunk_size"), manifest.get("chunk_overlap")) == (CHUNK_SIZE, CHUNK_OVERLAP):
+                self._last_build_time = manifest.get("built_at")
+            else:
+                # Vectors are still valid, but every source must be re-chunked on the next sync.
+                logger.info("Chunk settings changed since the index was built; all sources will be re-chunked")
+            logger.info(
+                "Loaded existing vector store (%s chunks, %s logged update(s))",
+                self.vector_store.index.ntotal, self._logged_updates,
+            )
 
     def load_learning_data(self) -> List[Document]:
         documents = []
@@ -55,46 +116,333 @@ class VectorStoreService:
             except Exception as e:
                 logger.warning("Could not load learning data file %s: %s", file_path, e)
         return documents
-    
+
+    def load_chat_session(self, session_id: str) -> List[Document]:
+        """One chunk per user/assistant turn, already carrying stable IDs."""
+        try:
+            messages = self.chat_store.load(session_id) or []
+            return self.turn_chunker.chunk_session(session_id, session_source(session_id), messages)
+        except Exception as e:
+            logger.warning("Could not load chat session %s: %s", session_id, e)
+        return []
+
     def load_chat_history(self) -> List[Document]:
         documents = []
-        for file_path in list(CHATS_DATA_DIR.glob("*.json")):
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    chat_data = json.load(f)
-                messages = chat_data.get("messages", [])
-                chat_content = "\n".join([
-                    f"User: {msg.get('content', '')}" if msg.get('role') == 'user'
-                    else f"Assistant: {msg.get('content', '')}"
-                    for msg in messages
-                ])
-                if chat_content.strip():
-                    documents.append(Document(page_content=chat_content, metadata ={"source": f"chat_{file_path.stem}"}))
-            except Exception as e:
-                logger.warning("Could not load chat history file %s: %s", file_path, e)
+        for session_id in self.chat_store.session_ids():
+            documents.extend(self.load_chat_session(session_id))
         return documents
-    
+
+    def _split_with_ids(self, documents: List[Document]) -> Tuple[List[Document], List[str]]:
+        # Chat turns arrive pre-chunked with their own IDs; everything else goes through the splitter.
+        chunks = [doc for doc in documents if doc.id]
+        ids = [doc.id for doc in chunks]
+        split_chunks = self.text_splitter.split_documents([doc for doc in documents if not doc.id])
+        chunks.extend(split_chunks)
+        seen: Dict[tuple, int] = {}
+        for chunk in split_chunks:
+            source = chunk.metadata.get("source", PLACEHOLDER_SOURCE)
+            key = (source, chunk.page_content)
+            occurrence = seen.get(key, 0)
+            seen[key] = occurrence + 1
+            ids.append(_chunk_id(source, chunk.page_content, occurrence))
+        return chunks, ids
+
+    def _build_source_map(self, store: Optional[FAISS]) -> Dict[str, Set[str]]:
+        source_ids: Dict[str, Set[str]] = {}
+        if not store:
+            return source_ids
+        for doc_id in store.index_to_docstore_id.values():
+            doc = store.docstore.search(doc_id)
+            source = doc.metadata.get("source", PLACEHOLDER_SOURCE) if isinstance(doc, Document) else PLACEHOLDER_SOURCE
+            source_ids.setdefault(source, set()).add(doc_id)
+        return source_ids
+
+    def _build_store(self, chunks: List[Document], ids: List[str], vectors: Optional[np.ndarray] = None) -> FAISS:
+        """Index chunks (embedded through the cache unless vectors are given) with the index type chosen for this corpus size."""
+        if vectors is None:
+            vectors = np.asarray(self.embeddings.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+        store = FAISS(
+            embedding_function=self.embeddings,
+            index=build_index(vectors, choose_index_type(len(chunks))),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+        )
+        add_chunks(store, self._with_ids(chunks, ids), vectors)
+        return store
+
+    @staticmethod
+    def _with_ids(chunks: List[Document], ids: List[str]) -> List[Document]:
+        return [Document(id=chunk_id, page_content=chunk.page_content, metadata=chunk.metadata) for chunk, chunk_id in zip(chunks, ids)]
+
+    def _indexed_chunks(self, store: FAISS, exclude: Set[str]) -> Tuple[List[Document], List[str], Optional[np.ndarray]]:
+        """Chunks still indexed, with their vectors read back from the index when it stores them exactly."""
+        items = [(label, doc_id) for label, doc_id in store.index_to_docstore_id.items() if doc_id not in exclude]
+        ids = [doc_id for _, doc_id in items]
+        vectors = None
+        if exact_vectors(store.index):
+            labels = np.array([label for label, _ in items], dtype=np.int64)
+            vectors = store.index.reconstruct_batch(labels) if items else np.zeros((0, store.index.d), dtype=np.float32)
+        return [store.docstore.search(doc_id) for doc_id in ids], ids, vectors
+
+    def chunk_vectors(self, docs: List[Document]) -> np.ndarray:
+        """
+        Vectors of retrieved chunks, read back from the index when it stores them exactly;
+        the rest come from the embedding cache (the model only sees cache misses).
+        """
+        vectors: List[Optional[np.ndarray]] = [None] * len(docs)
+        with self._index_lock.read():
+            store = self.vector_store
+            if store is not None and exact_vectors(store.index):
+                indexed = [i for i, doc in enumerate(docs) if doc.id and doc.id in store.docstore._dict]
+                if indexed:
+                    labels = np.array([chunk_label(docs[i].id) for i in indexed], dtype=np.int64)
+                    for i, vector in zip(indexed, store.index.reconstruct_batch(labels)):
+                        vectors[i] = vector
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embeddings.embed_documents([docs[i].page_content for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = np.asarray(vector, dtype=np.float32)
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Tune ANN search (IVF nprobe / HNSW efSearch) on the live index."""
+        if self.vector_store:
+            with self._index_lock.write():
+                apply_search_params(self.vector_store.index, nprobe=nprobe, ef_search=ef_search)
+                self.index_version += 1
+
+    def _publish(self, store: FAISS):
+        """Swap in a newly built store (full or type-changing rebuilds)."""
+        source_ids = self._build_source_map(store)
+        with self._index_lock.write():
+            self.vector_store = store
+            self._source_ids = source_ids
+            # search() reads the version under the read lock, so it can never cache
+            # old-store results under the new version.
+            self.index_version += 1
+
     def create_vector_store(self) -> FAISS:
-        learning_docs = self.load_learning_data()
-        chat_docs = self.load_chat_history()
-        all_documents = learning_docs + chat_docs
+        """Full rebuild: re-chunk and re-embed every learning data and chat file."""
+        with self._update_lock, span("index_rebuild", mode="full"):
+            started = time.time()
+            learning_docs = self.load_learning_data()
+            chat_docs = self.load_chat_history()
+            all_documents = learning_docs + chat_docs
+
+            if not all_documents:
+                chunks = [Document(page_content="No data avaliable yet.", metadata={"source": PLACEHOLDER_SOURCE})]
+                ids = [f"{PLACEHOLDER_SOURCE}:0"]
+            else:
+                chunks, ids = self._split_with_ids(all_documents)
+            self._publish(self._build_store(chunks, ids))
+            self._last_build_time = started
+            self.save_vector_store(compact_cache=True)
+            return self.vector_store
 
-        if not all_documents:
-            self.vector_store = FAISS.from_texts(["No data avaliable yet."], self.embeddings)
+    def update_sources(self, documents_by_source: Dict[str, List[Document]]) -> FAISS:
+        """
+        Incremental update: for each source, embed only chunks that are not indexed yet
+        and delete the chunks that no longer exist. A source mapped to an empty list is
+        removed from the index entirely.
+        """
+        with self._update_lock, span("index_rebuild", mode="incremental"):
+            return self._update_sources_locked(documents_by_source)
+
+    def _update_sources_locked(self, documents_by_source: Dict[str, List[Document]]) -> FAISS:
+        to_add_chunks: List[Document] = []
+        to_add_ids: List[str] = []
+        to_delete: List[str] = []
+        wanted_by_source: Dict[str, Set[str]] = {}
+
+        for source, documents in documents_by_source.items():
+            chunks, ids = self._split_with_ids(documents) if documents else ([], [])
+            current = self._source_ids.get(source, set())
+            wanted = wanted_by_source[source] = set(ids)
+            to_delete.extend(current - wanted)
+            for chunk, chunk_id in zip(chunks, ids):
+                if chunk_id not in current:
+                    to_add_chunks.append(chunk)
+                    to_add_ids.append(chunk_id)
+
+        if to_add_chunks:
+            # Real data is arriving, so the "no data" placeholder can go.
+            to_delete.extend(self._source_ids.get(PLACEHOLDER_SOURCE, set()))
+
+        if not to_add_chunks and not to_delete:
+            return self.vector_store
+
+        current = self.vector_store
+        if current is None and not to_add_chunks:
+            return None
+        new_docs = self._with_ids(to_add_chunks, to_add_ids)
+        if new_docs:
+            new_vectors = np.asarray(self.embeddings.embed_documents([doc.page_content for doc in new_docs]), dtype=np.float32)
+        else:
+            new_vectors = np.zeros((0, current.index.d), dtype=np.float32)
+
+        if current is None or (to_delete and not supports_removal(current.index)) or needs_type_change(
+            current.index, current.index.ntotal - len(to_delete) + len(new_docs),
+        ):
+            # No index yet, an HNSW removal (HNSW graphs can't drop vectors) or the corpus crossed the
+            # auto threshold: build a new index from the kept chunks, whose vectors are read back from
+            # the current index rather than re-embedded.
+            kept_chunks, kept_ids, kept_vectors = self._indexed_chunks(current, set(to_delete)) if current else ([], [], None)
+            if kept_chunks and kept_vectors is None:
+                # PQ codes only approximate the vectors: re-embed, mostly from the embedding cache.
+                kept_vectors = np.asarray(self.embeddings.embed_documents([c.page_content for c in kept_chunks]), dtype=np.float32)
+            vectors = np.concatenate([kept_vectors, new_vectors]) if kept_chunks else new_vectors
+            self._publish(self._build_store(kept_chunks + to_add_chunks, kept_ids + to_add_ids, vectors))
+            self.save_vector_store()
         else:
-            chunks = self.text_splitter.split_documents(all_documents)
-            self.vector_store = FAISS.from_documents(chunks, self.embeddings)
-        self.save_vector_store()
+            # In place: the index is keyed by chunk label, so only the changed chunks are touched.
+            with self._index_lock.write():
+                remove_chunks(current, to_delete)
+                add_chunks(current, new_docs, new_vectors)
+                self._update_source_map(wanted_by_source, bool(new_docs))
+                self.index_version += 1
+            self._persist_update(new_docs, new_vectors, to_delete)
+
+        logger.info(
+            "Vector store updated incrementally: %s chunk(s) embedded, %s removed",
+            len(to_add_chunks), len(to_delete),
+        )
         return self.vector_store
-    
-    def save_vector_store(self):
+
+    def _update_source_map(self, wanted_by_source: Dict[str, Set[str]], placeholder_removed: bool):
+        for source, wanted in wanted_by_source.items():
+            if wanted:
+                self._source_ids[source] = wanted
+            else:
+                self._source_ids.pop(source, None)
+        if placeholder_removed:
+            self._source_ids.pop(PLACEHOLDER_SOURCE, None)
+
+    def update_chat_sessions(self, session_ids: Iterable[str]) -> FAISS:
+        """Re-index the given chat sessions (e.g. after new turns were appended)."""
+        documents_by_source: Dict[str, List[Document]] = {}
+        for session_id in session_ids:
+            documents_by_source[session_source(session_id)] = self.load_chat_session(session_id)
+        return self.update_sources(documents_by_source)
+
+    def sync_vector_store(self) -> FAISS:
+        """
+        Bring the index in line with learning_data and the chat store without a full
+        rebuild: only sessions the store reports as changed since the last build are
+        re-chunked, only new chunks are embedded, and sources that are gone are dropped.
+        """
+        if self.vector_store is None:
+            return self.create_vector_store()
+        with self._update_lock, span("index_rebuild", mode="sync"):
+            return self._sync_locked()
+
+    def _sync_locked(self) -> FAISS:
+        started = time.time()
+        documents_by_source: Dict[str, List[Document]] = {}
+        for doc in self.load_learning_data():
+            documents_by_source.setdefault(doc.metadata["source"], []).append(doc)
+
+        if self._last_build_time is None:
+            changed = self.chat_store.session_ids()
+        else:
+            changed = self.chat_store.changed_since(self._last_build_time)
+        for session_id in changed:
+            documents_by_source[session_source(session_id)] = self.load_chat_session(session_id)
+
+        live_chat_sources = {session_source(session_id) for session_id in self.chat_store.session_ids()}
+        for source in self._source_ids:
+            if source == PLACEHOLDER_SOURCE or source in documents_by_source:
+                continue
+            # Learning files still present were loaded above, so anything else is gone.
+            if not source.startswith("chat_") or source not in live_chat_sources:
+                documents_by_source[source] = []
+
+        logger.info("Syncing vector store: %s changed chat session(s)", len(changed))
+        previous_build_time = self._last_build_time
+        self._last_build_time = started
+        try:
+            store = self._update_sources_locked(documents_by_source)
+        except Exception:
+            self._last_build_time = previous_build_time
+            raise
+        try:
+            update_manifest(VECTOR_STORE_DIR, built_at=started)
+        except Exception as e:
+            logger.warning("Could not record sync time in the index manifest: %s", e)
+        return store
+
+    def _persist_update(self, added: List[Document], vectors: np.ndarray, removed: List[str]):
+        """Append an in-place update to the update log; fold the log into a snapshot once it has grown."""
+        try:
+            append_updates(VECTOR_STORE_DIR, added, vectors, removed)
+            self._logged_updates += len(added) + len(removed)
+        except Exception as e:
+            logger.error("Failed to append to the index update log, writing a snapshot instead: %s", e)
+            self.save_vector_store()
+            return
+        if self._logged_updates > max(1024, self.vector_store.index.ntotal // 4):
+            self.save_vector_store()
+        else:
+            self.embedding_cache.save()
+
+    def save_vector_store(self, compact_cache: bool = False):
+        """Write a full snapshot of the index (which also empties the update log)."""
         if self.vector_store:
             try:
-                self.vector_store.save_local(str(VECTOR_STORE_DIR))
+                save_index(VECTOR_STORE_DIR, self.vector_store, {
+                    "embedding_model": self.model_id,
+                    "chunk_size": CHUNK_SIZE,
+                    "chunk_overlap": CHUNK_OVERLAP,
+                    "built_at": self._last_build_time,
+                })
+                self._logged_updates = 0
             except Exception as e:
                 logger.error("failed to save vector store to disk: %s", e)
+        self.embedding_cache.save(compact=compact_cache)
+
+    def flush(self):
+        """Fold logged updates into a snapshot and compact the embedding cache (at shutdown)."""
+        with self._update_lock:
+            if self._logged_updates:
+                self.save_vector_store(compact_cache=True)
+            else:
+                self.embedding_cache.save(compact=True)
+
+    def embed_query(self, query: str) -> List[float]:
+        key = " ".join(query.split())
+        vector = self._query_embeddings.get(key)
+        if vector is None:
+            with span("query_embedding"):
+                vector = self.embeddings.embed_query(key)
+            self._query_embeddings.put(key, vector)
+        return vector
+
+    def search(self, query: str, k: int = 10) -> List[Document]:
+        """Top-k chunks for query, served from cache while the index is unchanged."""
+        if not self.vector_store:
+            raise RuntimeError("Vector store not initialized. This should not happen.")
+        key = " ".join(query.split())
+        docs = self._search_results.get((key, k, self.index_version))
+        if docs is None:
+            query_vector = self.embed_query(query)
+            with self._index_lock.read(), span("vector_search"):
+                version = self.index_version
+                docs = self.vector_store.similarity_search_by_vector(query_vector, k=k)
+            self._search_results.put((key, k, version), docs)
+        return list(docs)
+
+    async def asearch(self, query: str, k: int = 10) -> List[Document]:
+        return await asyncio.to_thread(self.search, query, k)
+
+    def query_cache_stats(self) -> dict:
+        return {
+            "index_version": self.index_version,
+            "embeddings": self._query_embeddings.stats(),
+            "results": self._search_results.stats(),
+        }
 
     def get_retriever(self, k: int = 10):
+        # Not guarded against in-place index updates; request handlers use search().
         if not self.vector_store:
             raise RuntimeError("Vector store not initialized. This should not happen.")
-        return self.vector_store.as_retriever(search_kwargs={"k": k})
\ No newline at end of file
+        return self.vector_store.as_retriever(search_kwargs={"k": k})
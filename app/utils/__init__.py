@@ -5,6 +5,13 @@ UTILITIES PACKAGE
 Helpers used by the services (no HTTP, no business logic):
 
     time_info - get_time_information(): returns a string with current date/time for the LLM prompt.
-    retry - with_retry(fn): calls fn(); on failure retries with exponential backoff (Groq/Tavily). 
+    retry - with_retry(fn): calls fn(); on failure retries with exponential backoff (Groq/Tavily).
+            with_retry_async(fn) is the same for coroutines (uses asyncio.sleep).
+    ttl_cache - TTLCache: thread-safe LRU cache with per-entry expiry, hit-rate stats and snapshot().
+    tokens - count_tokens(text) / truncate_to_tokens(text, n) via tiktoken (falls back to chars/4).
+    metrics - Counters/gauges/histograms in Prometheus text format; span(stage) request-scoped
+              stage timings; MetricsMiddleware (per-route latency, slow-request log).
+    rwlock - ReadWriteLock: shared reads / exclusive writes (searches vs in-place index updates).
+    startup - StartupTracker: startup phase, per-phase and per-import timings, readiness (/health/ready).
     """
 
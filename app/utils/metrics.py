@@ -0,0 +1,189 @@
+"""
+In-process metrics: counters, gauges and histograms rendered in the Prometheus text format,
+plus request-scoped stage timings (span) that feed the histograms and the slow-request log.
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import SLOW_REQUEST_SECONDS, SLOW_REQUEST_LOG_FILE
+
+logger = logging.getLogger("A.X.I.O.M")
+
+# Seconds; covers cache hits (sub-millisecond) up to slow LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_kinds: Dict[str, str] = {}
+_values: Dict[str, Dict[LabelKey, float]] = {}
+_histograms: Dict[str, Dict[LabelKey, "_Histogram"]] = {}
+
+# Stage timings of the current request; set by MetricsMiddleware, shared with threads via to_thread.
+_request_stages: ContextVar[Optional[List[dict]]] = ContextVar("axiom_request_stages", default=None)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    """Add to a counter (names end in _total)."""
+    key = _labels(labels)
+    with _lock:
+        _kinds.setdefault(name, "counter")
+        series = _values.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+
+def set_value(name: str, value: float, kind: str = "gauge", **labels):
+    """Set a gauge, or a counter whose running total is kept elsewhere (e.g. a cache's hit count)."""
+    with _lock:
+        _kinds.setdefault(name, kind)
+        _values.setdefault(name, {})[_labels(labels)] = float(value)
+
+
+def observe(name: str, value: float, **labels):
+    key = _labels(labels)
+    with _lock:
+        _kinds.setdefault(name, "histogram")
+        series = _histograms.setdefault(name, {})
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = _Histogram(DEFAULT_BUCKETS)
+        histogram.observe(value)
+
+
+@contextmanager
+def span(stage: str, **labels) -> Iterator[None]:
+    """Time a pipeline stage into axiom_stage_seconds and the current request's breakdown."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        observe("axiom_stage_seconds", elapsed, stage=stage, **labels)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append({"stage": stage, **labels, "ms": round(elapsed * 1000, 2)})
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, le: Optional[str] = None) -> str:
+    pairs = list(key) + ([("le", le)] if le is not None else [])
+    return "{%s}" % ",".join('%s="%s"' % (k, _escape(v)) for k, v in pairs) if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render() -> str:
+    lines = []
+    with _lock:
+        for name in sorted(_values):
+            lines.append(f"# TYPE {name} {_kinds[name]}")
+            for key, value in sorted(_values[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name in sorted(_histograms):
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(_histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, le='%g' % bound)} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, le='+Inf')} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request latency/count per route and status, with the stage breakdown of
+    requests slower than slow_request_seconds written to the slow-request log (0 disables it).
+    Timing ends when the last body chunk is sent, so streamed responses are measured in full.
+    """
+
+    def __init__(self, app, slow_request_seconds: float = SLOW_REQUEST_SECONDS, slow_log_path=SLOW_REQUEST_LOG_FILE):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+        self.slow_log_path = slow_log_path
+        self._log_lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages: List[dict] = []
+        token = _request_stages.set(stages)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stages.reset(token)
+            # Route template, not the raw path, so /chat/history/{session_id} stays one series.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            observe("axiom_request_seconds", elapsed, method=scope["method"], route=route)
+            inc("axiom_requests_total", method=scope["method"], route=route, status=status)
+            if self.slow_request_seconds and elapsed >= self.slow_request_seconds:
+                self._log_slow(scope["method"], route, status, elapsed, stages)
+
+    def _log_slow(self, method: str, route: str, status: int, elapsed: float, stages: List[dict]):
+        breakdown = ", ".join(
+            "%s%s=%.0fms" % (s["stage"], "".join("[%s=%s]" % kv for kv in s.items() if kv[0] not in ("stage", "ms")), s["ms"])
+            for s in stages
+        )
+        logger.warning(f"Slow request {method} {route} ({status}) took {elapsed:.2f}s: {breakdown or 'no stages'}")
+        if not self.slow_log_path:
+            return
+        record = {
+            "ts": time.time(),
+            "method": method,
+            "route": route,
+            "status": status,
+            "ms": round(elapsed * 1000, 2),
+            "stages": stages,
+        }
+        try:
+            with self._log_lock, open(self.slow_log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write slow-request log: {e}")
@@ -1,6 +1,7 @@
+import asyncio
 import time
 import logging 
-from typing import TypeVar, Callable
+from typing import Awaitable, TypeVar, Callable
 
 logger = logging.getLogger("A.X.I.O.M")
 
@@ -33,4 +34,33 @@ def with_retry(
             time.sleep(delay)
             delay *= 2 # exponential backoff: 1s, 2s, 4s, ...
 
-    raise last_exception
\ No newline at end of file
+    raise last_exception
+
+async def with_retry_async(
+    fn: Callable[[], Awaitable[T]],
+    max_retries: int = 3,
+    initial_delay: float = 1.0,
+) -> T:
+    # Same policy as with_retry, but backs off with asyncio.sleep so the event loop keeps serving.
+    last_exception = None
+    delay = initial_delay
+
+    for attempt in range(max_retries):
+        try:
+            return await fn()
+        except Exception as e:
+            last_exception = e
+            if attempt == max_retries - 1:
+                raise
+            logger.warning(
+                "Attempt %s/%s failed (%s). Retrying in %.1fs: %s",
+                attempt + 1,
+                max_retries,
+                getattr(fn, "__name__", "call"),
+                delay,
+                e,
+            )
+            await asyncio.sleep(delay)
+            delay *= 2
+
+    raise last_exception
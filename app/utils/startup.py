@@ -0,0 +1,80 @@
+"""
+Startup progress: current phase, per-phase and per-import timings, readiness and failure,
+reported by /health/ready (and as axiom_startup_* metrics).
+"""
+
+import importlib
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional
+
+from app.utils import metrics
+
+logger = logging.getLogger("A.X.I.O.M")
+
+
+class StartupTracker:
+    def __init__(self):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.phase = "starting"
+        self.ready = False
+        self.error: Optional[str] = None
+        self.ready_after: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.imports: Dict[str, Optional[float]] = {}
+        metrics.set_value("axiom_ready", 0)
+
+    def uptime(self) -> float:
+        return time.perf_counter() - self._started
+
+    @contextmanager
+    def phase_timer(self, name: str) -> Iterator[None]:
+        self.phase = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[name] = round(elapsed, 3)
+            metrics.set_value("axiom_startup_phase_seconds", elapsed, phase=name)
+            logger.info(f"Startup phase '{name}' took {elapsed:.2f}s")
+
+    def import_modules(self, names: Iterable[str]) -> None:
+        """
+        Import modules one at a time and record what each cost. Shared dependencies are charged
+        to the first module that pulls them in, so list the heavy third-party packages first.
+        """
+        for name in names:
+            started = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                # Optional dependency; the service that needs it reports the problem itself.
+                logger.debug("Startup import of %s failed: %s", name, e)
+                self.imports[name] = None
+                continue
+            self.imports[name] = round(time.perf_counter() - started, 3)
+
+    def mark_ready(self):
+        self.ready_after = round(self.uptime(), 3)
+        self.phase = "ready"
+        self.ready = True
+        metrics.set_value("axiom_ready", 1)
+        metrics.set_value("axiom_startup_seconds", self.ready_after)
+
+    def mark_failed(self, exc: BaseException):
+        self.phase = "failed"
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def snapshot(self) -> dict:
+        return {
+            "phase": self.phase,
+            "ready": self.ready,
+            "error": self.error,
+            "uptime_seconds": round(self.uptime(), 3),
+            "ready_after_seconds": self.ready_after,
+            "phases": dict(self.phases),
+            "import_seconds": dict(self.imports),
+        }
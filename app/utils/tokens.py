@@ -0,0 +1,43 @@
+import logging
+from typing import Optional
+
+from config import TOKENIZER_ENCODING
+
+logger = logging.getLogger("A.X.I.O.M")
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    # tiktoken is loaded (and its BPE file fetched) on first use; if that fails we fall
+    # back to the ~4 characters/token estimate for the rest of the process.
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception as e:
+            _encoding_failed = True
+            logger.warning("tiktoken unavailable (%s), estimating tokens as characters/4", e)
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> Optional[str]:
+    """text cut to at most max_tokens tokens (None if max_tokens <= 0)."""
+    if max_tokens <= 0:
+        return None
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
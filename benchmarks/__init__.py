@@ -0,0 +1,18 @@
+"""
+BENCHMARKS PACKAGE
+==================
+
+Latency/throughput benchmarks for the chat pipeline, run in-process against the FastAPI app
+(httpx ASGITransport) with deterministic local stand-ins for ChatGroq and Tavily, so only our
+own code is measured and no keys or network are needed (the embedding model must be available).
+
+MODULES:
+    fakes - FakeChatGroq / FakeTavilyClient with configurable latency and completion length.
+    corpus - Deterministic synthetic learning_data corpus of a given size.
+    run - Runs the scenarios (endpoint x concurrency x session length x corpus size), writes JSON.
+    compare - Compares two result files and flags p95 / throughput regressions.
+
+USAGE:
+    python -m benchmarks.run --corpus-sizes 10 200 --concurrency 1 8 --session-lengths 0 20
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
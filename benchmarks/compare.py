@@ -0,0 +1,53 @@
+"""Compare two benchmark result files: p50/p95 latency and throughput per scenario."""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _scenarios(path: Path) -> dict:
+    report = json.loads(path.read_text(encoding="utf-8"))
+    return {
+        (r["endpoint"], r["corpus_docs"], r["concurrency"], r["session_length"]): r
+        for r in report["results"]
+    }
+
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args(argv)
+
+    baseline, candidate = _scenarios(args.baseline), _scenarios(args.candidate)
+    regressions = 0
+    print(f"{'scenario':<40} {'p50 ms':>20} {'p95 ms':>20} {'req/s':>18}")
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        p50 = _change(old["latency_ms"]["p50"], new["latency_ms"]["p50"])
+        p95 = _change(old["latency_ms"]["p95"], new["latency_ms"]["p95"])
+        rps = _change(old["throughput_rps"], new["throughput_rps"])
+        regressed = p95 > args.threshold or rps < -args.threshold
+        regressions += regressed
+        endpoint, docs, concurrency, turns = key
+        print(
+            f"{endpoint:<8} docs={docs:<6} conc={concurrency:<3} turns={turns:<5}"
+            f" {new['latency_ms']['p50']:>10.1f} ({p50:+5.1f}%)"
+            f" {new['latency_ms']['p95']:>10.1f} ({p95:+5.1f}%)"
+            f" {new['throughput_rps']:>8.2f} ({rps:+5.1f}%)"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    skipped = len(baseline.keys() ^ candidate.keys())
+    if skipped:
+        print(f"{skipped} scenario(s) only present in one file were skipped")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
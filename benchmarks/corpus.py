@@ -0,0 +1,37 @@
+import random
+from pathlib import Path
+
+_TOPICS = [
+    "astronomy", "cooking", "finance", "gardening", "history", "machine learning",
+    "music", "networking", "photography", "physics", "running", "travel",
+]
+_VOCABULARY = (
+    "system data model notes project plan idea result method question answer design memory "
+    "process value signal network energy time place person team tool budget schedule review "
+    "measure improve compare describe explain organize record observe build test learn"
+).split()
+
+
+def write_corpus(learning_data_dir: Path, num_docs: int, words_per_doc: int = 400, seed: int = 0) -> None:
+    """Write num_docs deterministic .txt files (same seed, same corpus) for the vector store to index."""
+    rng = random.Random(seed)
+    learning_data_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(num_docs):
+        topic = _TOPICS[i % len(_TOPICS)]
+        sentences = []
+        words = 0
+        while words < words_per_doc:
+            length = rng.randint(8, 20)
+            body = " ".join(rng.choice(_VOCABULARY) for _ in range(length))
+            sentences.append(f"In {topic}, {body}.")
+            words += length + 2
+        (learning_data_dir / f"bench_{i:05d}.txt").write_text(" ".join(sentences), encoding="utf-8")
+
+
+def question(i: int) -> str:
+    """
+    The i-th benchmark question: distinct per request so the search and query caches don't absorb
+    the load, and phrased so the query router sends it down the full path (search + retrieval).
+    """
+    topic = _TOPICS[i % len(_TOPICS)]
+    return f"What is the role of {_VOCABULARY[i % len(_VOCABULARY)]} in {topic}? (#{i})"
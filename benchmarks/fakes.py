@@ -0,0 +1,136 @@
+import asyncio
+import time
+from typing import Any, Iterator, AsyncIterator, List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_WORDS = (
+    "the index answers questions about local notes while the model streams a short reply "
+    "with enough variety to look like text and enough repetition to stay deterministic"
+).split()
+
+
+class LatencyProfile:
+    """Simulated backend timings: LLM time to first token + tokens at a fixed rate, Tavily round trip."""
+
+    def __init__(
+        self,
+        llm_latency: float = 0.3,
+        llm_tokens: int = 150,
+        llm_tokens_per_second: float = 500.0,
+        search_latency: float = 0.4,
+        search_results: int = 5,
+    ):
+        self.llm_latency = llm_latency
+        self.llm_tokens = llm_tokens
+        self.llm_tokens_per_second = llm_tokens_per_second
+        self.search_latency = search_latency
+        self.search_results = search_results
+
+    def token_delay(self) -> float:
+        return 1.0 / self.llm_tokens_per_second if self.llm_tokens_per_second > 0 else 0.0
+
+
+PROFILE = LatencyProfile()
+
+
+def _completion(messages: List[BaseMessage]) -> tuple:
+    """Deterministic reply (same prompt, same text) plus a usage dict in LangChain's format."""
+    prompt = "".join(str(m.content) for m in messages)
+    start = len(prompt) % len(_WORDS)
+    words = [_WORDS[(start + i) % len(_WORDS)] for i in range(PROFILE.llm_tokens)]
+    input_tokens = len(prompt) // 4
+    usage = {
+        "input_tokens": input_tokens,
+        "output_tokens": len(words),
+        "total_tokens": input_tokens + len(words),
+    }
+    return words, usage
+
+
+class FakeChatGroq(BaseChatModel):
+    """Drop-in for langchain_groq.ChatGroq; accepts (and ignores) the same constructor arguments."""
+
+    groq_api_key: Any = None
+    model_name: str = "fake-groq"
+    temperature: float = 0.8
+    max_retries: int = 0
+    http_client: Any = None
+    http_async_client: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-groq"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        words, usage = _completion(messages)
+        time.sleep(PROFILE.llm_latency + len(words) * PROFILE.token_delay())
+        message = AIMessage(content=" ".join(words), usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        words, usage = _completion(messages)
+        await asyncio.sleep(PROFILE.llm_latency + len(words) * PROFILE.token_delay())
+        message = AIMessage(content=" ".join(words), usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        words, _ = _completion(messages)
+        time.sleep(PROFILE.llm_latency)
+        for word in words:
+            time.sleep(PROFILE.token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        words, _ = _completion(messages)
+        await asyncio.sleep(PROFILE.llm_latency)
+        for word in words:
+            await asyncio.sleep(PROFILE.token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+
+def _search_response(query: str, max_results: int = 5, **kwargs) -> dict:
+    count = min(max_results, PROFILE.search_results)
+    return {
+        "query": query,
+        "results": [
+            {
+                "title": f"Result {i + 1} for {query}",
+                "content": " ".join(_WORDS[(i + j) % len(_WORDS)] for j in range(60)),
+                "url": f"https://example.com/{i + 1}",
+            }
+            for i in range(count)
+        ],
+    }
+
+
+class FakeTavilyClient:
+    def __init__(self, api_key: str = "", **kwargs):
+        self.api_key = api_key
+
+    def search(self, query: str, **kwargs) -> dict:
+        time.sleep(PROFILE.search_latency)
+        return _search_response(query, **kwargs)
+
+
+class FakeAsyncTavilyClient:
+    def __init__(self, api_key: str = "", **kwargs):
+        self.api_key = api_key
+
+    async def search(self, query: str, **kwargs) -> dict:
+        await asyncio.sleep(PROFILE.search_latency)
+        return _search_response(query, **kwargs)
+
+
+def install(profile: LatencyProfile) -> None:
+    """Swap the stand-ins into the service modules; call before the app's lifespan builds the services."""
+    global PROFILE
+    PROFILE = profile
+    import app.services.groq_service as groq_service
+    import app.services.realtime_service as realtime_service
+
+    groq_service.ChatGroq = FakeChatGroq
+    realtime_service.TavilyClient = FakeTavilyClient
+    realtime_service.AsyncTavilyClient = FakeAsyncTavilyClient
@@ -0,0 +1,226 @@
+"""
+Run the chat benchmarks and write a JSON result file.
+
+Each corpus size runs in its own subprocess (config is read at import time, and every size needs
+its own data directory and index build). Inside it, the app runs in-process with the fake Groq and
+Tavily clients and every (endpoint, session length, concurrency) combination is measured.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BASE_DIR / "benchmarks" / "results"
+
+ENDPOINTS = {"chat": "/chat", "realtime": "/chat/realtime"}
+
+# Used by the scenario subprocess instead of anything in .env: the fakes accept any key, and
+# client-side rate limiting would only measure the configured limits.
+BENCH_ENV = {
+    "GROQ_API_KEY": "gsk_benchmark_key_000000",
+    "TAVILY_API_KEY": "tvly-benchmark",
+    "GROQ_RATE_LIMIT_ENABLED": "false",
+    "STARTUP_MODE": "blocking",
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies: List[float], statuses: Dict[int, int], wall_seconds: float) -> dict:
+    ok = sorted(latencies)
+    return {
+        "requests": sum(statuses.values()),
+        "ok": len(ok),
+        "status_counts": {str(code): count for code, count in sorted(statuses.items())},
+        "latency_ms": {
+            "p50": round(percentile(ok, 50) * 1000, 2),
+            "p95": round(percentile(ok, 95) * 1000, 2),
+            "p99": round(percentile(ok, 99) * 1000, 2),
+            "mean": round(sum(ok) / len(ok) * 1000, 2) if ok else 0.0,
+            "max": round(ok[-1] * 1000, 2) if ok else 0.0,
+        },
+        "throughput_rps": round(len(ok) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "wall_seconds": round(wall_seconds, 3),
+    }
+
+
+def _seed_session(chat_service, turns: int) -> str:
+    """A session that already holds `turns` user/assistant exchanges."""
+    from benchmarks.corpus import question
+
+    session_id = chat_service.get_or_create_session(None)
+    for i in range(turns):
+        chat_service.add_message(session_id, "user", question(10_000 + i))
+        chat_service.add_message(session_id, "assistant", f"Earlier answer number {i} " * 20)
+    return session_id
+
+
+async def _measure(client, chat_service, endpoint: str, concurrency: int, session_length: int, requests: int, offset: int) -> dict:
+    from benchmarks.corpus import question
+
+    sessions = [_seed_session(chat_service, session_length) for _ in range(concurrency)]
+    pending = iter(range(requests))
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+
+    async def worker(session_id: str):
+        for i in pending:
+            started = time.perf_counter()
+            response = await client.post(ENDPOINTS[endpoint], json={"message": question(offset + i), "session_id": session_id})
+            elapsed = time.perf_counter() - started
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(session_id) for session_id in sessions))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+async def run_scenarios(args) -> dict:
+    """Everything for one corpus size; expects AXIOM_DATABASE_DIR to already point at its data directory."""
+    import httpx
+    from benchmarks.fakes import LatencyProfile, install
+    import app.main as main
+
+    if not args.verbose:
+        logging.getLogger("A.X.I.O.M").setLevel(logging.WARNING)
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+    install(LatencyProfile(args.llm_latency, args.llm_tokens, args.llm_tps, args.search_latency))
+
+    started = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        startup_seconds = time.perf_counter() - started
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            # Warm-up (model, tokenizer and lazy imports), not measured.
+            for endpoint in args.endpoints:
+                await client.post(ENDPOINTS[endpoint], json={"message": "What is the role of data in music?"})
+
+            results = []
+            offset = 0
+            for endpoint in args.endpoints:
+                for session_length in args.session_lengths:
+                    for concurrency in args.concurrency:
+                        result = await _measure(
+                            client, main.chat_service, endpoint, concurrency, session_length, args.requests, offset,
+                        )
+                        offset += args.requests
+                        result.update(
+                            endpoint=endpoint,
+                            corpus_docs=args.scenario_corpus,
+                            concurrency=concurrency,
+                            session_length=session_length,
+                        )
+                        results.append(result)
+                        print(
+                            f"  {endpoint:<8} docs={args.scenario_corpus:<6} conc={concurrency:<3} turns={session_length:<4} "
+                            f"p50={result['latency_ms']['p50']:>8.1f}ms p95={result['latency_ms']['p95']:>8.1f}ms "
+                            f"p99={result['latency_ms']['p99']:>8.1f}ms {result['throughput_rps']:>7.2f} req/s "
+                            f"ok={result['ok']}/{result['requests']}",
+                            flush=True,
+                        )
+    return {"corpus_docs": args.scenario_corpus, "startup_seconds": round(startup_seconds, 3), "results": results}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _scenario_args(args, corpus_docs: int, out_path: Path) -> List[str]:
+    argv = [
+        sys.executable, "-m", "benchmarks.run",
+        "--scenario-corpus", str(corpus_docs),
+        "--scenario-out", str(out_path),
+        "--requests", str(args.requests),
+        "--llm-latency", str(args.llm_latency),
+        "--llm-tokens", str(args.llm_tokens),
+        "--llm-tps", str(args.llm_tps),
+        "--search-latency", str(args.search_latency),
+        "--endpoints", *args.endpoints,
+        "--concurrency", *map(str, args.concurrency),
+        "--session-lengths", *map(str, args.session_lengths),
+    ]
+    if args.verbose:
+        argv.append("--verbose")
+    return argv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="A.X.I.O.M chat pipeline benchmarks")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=["chat", "realtime"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--session-lengths", nargs="+", type=int, default=[0, 20])
+    parser.add_argument("--corpus-sizes", nargs="+", type=int, default=[10, 200])
+    parser.add_argument("--requests", type=int, default=48, help="requests per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake Groq time to first token (s)")
+    parser.add_argument("--llm-tokens", type=int, default=150, help="fake Groq completion length (tokens)")
+    parser.add_argument("--llm-tps", type=float, default=500.0, help="fake Groq tokens per second")
+    parser.add_argument("--search-latency", type=float, default=0.4, help="fake Tavily round trip (s)")
+    parser.add_argument("--output", type=Path, help="result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's INFO logging")
+    parser.add_argument("--scenario-corpus", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--scenario-out", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.scenario_corpus is not None:
+        report = asyncio.run(run_scenarios(args))
+        args.scenario_out.write_text(json.dumps(report), encoding="utf-8")
+        return
+
+    from benchmarks.corpus import write_corpus
+
+    commit = _git_commit()
+    runs = []
+    for corpus_docs in args.corpus_sizes:
+        with tempfile.TemporaryDirectory(prefix="axiom-bench-") as tmp:
+            data_dir = Path(tmp) / "database"
+            write_corpus(data_dir / "learning_data", corpus_docs)
+            out_path = Path(tmp) / "result.json"
+            env = {**os.environ, **BENCH_ENV, "AXIOM_DATABASE_DIR": str(data_dir)}
+            print(f"Corpus of {corpus_docs} document(s):", flush=True)
+            subprocess.run(_scenario_args(args, corpus_docs, out_path), cwd=BASE_DIR, env=env, check=True)
+            runs.append(json.loads(out_path.read_text(encoding="utf-8")))
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": {
+            "requests": args.requests,
+            "llm_latency": args.llm_latency,
+            "llm_tokens": args.llm_tokens,
+            "llm_tps": args.llm_tps,
+            "search_latency": args.search_latency,
+        },
+        "startup_seconds": {str(run["corpus_docs"]): run["startup_seconds"] for run in runs},
+        "results": [result for run in runs for result in run["results"]],
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
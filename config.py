@@ -8,12 +8,17 @@ load_dotenv()
 
 BASE_DIR = Path(__file__).parent
 
-DATABASE_DIR = BASE_DIR / "database"
+# AXIOM_DATABASE_DIR points the app at another data directory (e.g. the benchmarks' generated corpora).
+DATABASE_DIR = Path(os.getenv("AXIOM_DATABASE_DIR", "") or BASE_DIR / "database")
 
 LEARNING_DATA_DIR = DATABASE_DIR / "learning_data"
 CHATS_DATA_DIR = DATABASE_DIR / "chats_data"
 VECTOR_STORE_DIR = DATABASE_DIR / "vector_store"
 
+# Chat session storage: "file" (one JSON Lines log per session in chats_data) or "sqlite".
+CHAT_STORE_BACKEND = os.getenv("CHAT_STORE_BACKEND", "file").strip().lower()
+CHAT_STORE_SQLITE_PATH = DATABASE_DIR / "chats.db"
+
 DATABASE_DIR.mkdir(parents=True, exist_ok=True)
 LEARNING_DATA_DIR.mkdir(parents=True, exist_ok=True)
 CHATS_DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -42,14 +47,132 @@ GROQ_API_KEYS = _load_groq_api_keys()
 GROQ_API_KEY = GROQ_API_KEYS[0] if GROQ_API_KEYS else ""
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 
+# Key pool: requests go to the key with the most quota headroom. A key is limited to
+# GROQ_KEY_MAX_IN_FLIGHT concurrent requests (0 = unlimited; callers wait up to GROQ_KEY_ACQUIRE_TIMEOUT
+# for a slot). A rate-limited key sits out its reset/Retry-After time, or an exponential backoff from
+# GROQ_KEY_COOLDOWN_SECONDS (capped at GROQ_KEY_MAX_COOLDOWN_SECONDS) if Groq sent no headers.
+GROQ_KEY_MAX_IN_FLIGHT = int(os.getenv("GROQ_KEY_MAX_IN_FLIGHT", "4"))
+GROQ_KEY_COOLDOWN_SECONDS = float(os.getenv("GROQ_KEY_COOLDOWN_SECONDS", "20"))
+GROQ_KEY_MAX_COOLDOWN_SECONDS = float(os.getenv("GROQ_KEY_MAX_COOLDOWN_SECONDS", "300"))
+GROQ_KEY_ACQUIRE_TIMEOUT = float(os.getenv("GROQ_KEY_ACQUIRE_TIMEOUT", "10"))
+
+# Optional client-side quota per key (token buckets; 0 disables a limit). The starting sizes are Groq's
+# free tier for llama-3.3-70b-versatile; the requests/day and tokens/minute buckets are resized to the
+# limits Groq reports in its x-ratelimit-limit-* headers. Prompt tokens are counted before sending, plus
+# GROQ_COMPLETION_TOKEN_ESTIMATE for the reply, and corrected with the real usage afterwards.
+GROQ_RATE_LIMIT_ENABLED = os.getenv("GROQ_RATE_LIMIT_ENABLED", "false").strip().lower() in ("1", "true", "yes")
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+GROQ_RPD = int(os.getenv("GROQ_RPD", "1000"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "12000"))
+GROQ_TPD = int(os.getenv("GROQ_TPD", "100000"))
+GROQ_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("GROQ_COMPLETION_TOKEN_ESTIMATE", "400"))
+
+# Admission queue in front of the chat endpoints: ADMISSION_MAX_CONCURRENT requests run at once, up to
+# ADMISSION_MAX_QUEUE more wait (at most ADMISSION_TIMEOUT_SECONDS); the rest get 429 + Retry-After.
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_TIMEOUT_SECONDS", "15"))
+
+# Requests slower than SLOW_REQUEST_SECONDS (0 = off) are logged with their per-stage timings,
+# and appended as JSON lines to SLOW_REQUEST_LOG_FILE. Aggregated metrics are served at /metrics.
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0"))
+SLOW_REQUEST_LOG_FILE = DATABASE_DIR / "slow_requests.jsonl"
+
+# STARTUP_MODE=background accepts connections right away and loads the embedding model, index and
+# services in a background thread (/health/ready reports when they are up); "blocking" loads them
+# before serving. STARTUP_WARMUP runs one query embedding + search before reporting ready.
+STARTUP_MODE = os.getenv("STARTUP_MODE", "blocking").strip().lower()
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").strip().lower() in ("1", "true", "yes")
+
 
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "")
 
+# Tavily results are cached per normalized query; news-like queries ("latest", "today", "price", ...)
+# expire sooner. With SEARCH_CACHE_PERSIST the cache is saved to SEARCH_CACHE_FILE on shutdown.
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "1800"))
+SEARCH_CACHE_NEWS_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_NEWS_TTL_SECONDS", "120"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "512"))
+SEARCH_CACHE_PERSIST = os.getenv("SEARCH_CACHE_PERSIST", "").strip().lower() in ("1", "true", "yes")
+SEARCH_CACHE_FILE = DATABASE_DIR / "search_cache.json"
+
+# Realtime requests run web search and local retrieval concurrently. Each branch has its own timeout and
+# the prompt is built once REALTIME_CONTEXT_DEADLINE_SECONDS has passed, with whatever branches finished.
+REALTIME_SEARCH_TIMEOUT_SECONDS = float(os.getenv("REALTIME_SEARCH_TIMEOUT_SECONDS", "6"))
+REALTIME_RETRIEVAL_TIMEOUT_SECONDS = float(os.getenv("REALTIME_RETRIEVAL_TIMEOUT_SECONDS", "3"))
+REALTIME_CONTEXT_DEADLINE_SECONDS = float(os.getenv("REALTIME_CONTEXT_DEADLINE_SECONDS", "6"))
+
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 CHUNK_SIZE = 1000  # Characters per chunk
 CHUNK_OVERLAP = 200  # Overlap between chunks
 
+# Chunk embeddings are cached on disk (keyed by content hash + model) so rebuilds only embed new text.
+EMBEDDING_CACHE_FILE = VECTOR_STORE_DIR / "embedding_cache.npz"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+# Embedding backend: "torch" (sentence-transformers) or "onnx" (ONNX Runtime, int8-quantized unless
+# EMBEDDING_ONNX_QUANTIZE=false). The ONNX model is exported into EMBEDDING_ONNX_DIR by export_onnx.py (the
+# server never exports) and only used if its embeddings agree with torch to at least EMBEDDING_ONNX_MIN_COSINE.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").strip().lower()
+EMBEDDING_ONNX_DIR = VECTOR_STORE_DIR / "onnx"
+EMBEDDING_ONNX_QUANTIZE = os.getenv("EMBEDDING_ONNX_QUANTIZE", "true").strip().lower() in ("1", "true", "yes")
+EMBEDDING_ONNX_MIN_COSINE = float(os.getenv("EMBEDDING_ONNX_MIN_COSINE", "0.98"))
+
+# Index-build embedding pipeline: texts are length-sorted and embedded in batches.
+# EMBEDDING_THREADS sets torch intra-op threads (0 = torch default); with EMBEDDING_PROCESSES > 1,
+# jobs of at least EMBEDDING_PROCESS_MIN_CHUNKS chunks are spread over a process pool.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+EMBEDDING_PROCESSES = int(os.getenv("EMBEDDING_PROCESSES", "1"))
+EMBEDDING_PROCESS_MIN_CHUNKS = int(os.getenv("EMBEDDING_PROCESS_MIN_CHUNKS", "2000"))
+
+# Vector index type: "flat" (exact), "hnsw", "ivf", "ivfpq", or "auto" (flat until
+# VECTOR_INDEX_AUTO_THRESHOLD chunks, then HNSW, or IVF-PQ if VECTOR_INDEX_USE_PQ is set).
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "auto").strip().lower()
+VECTOR_INDEX_AUTO_THRESHOLD = int(os.getenv("VECTOR_INDEX_AUTO_THRESHOLD", "50000"))
+VECTOR_INDEX_USE_PQ = os.getenv("VECTOR_INDEX_USE_PQ", "").strip().lower() in ("1", "true", "yes")
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = about 4 * sqrt(number of chunks)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+PQ_M = int(os.getenv("PQ_M", "16"))  # sub-quantizers; must divide the embedding dimension (384)
+
+# Chat-session index updates arriving within this window are merged into one update.
+INDEXER_DEBOUNCE_SECONDS = float(os.getenv("INDEXER_DEBOUNCE_SECONDS", "2.0"))
+
+# Retrieved chunks are merged (splitter overlap), de-duplicated (word-shingle Jaccard >= threshold),
+# optionally MMR-reordered for diversity, and packed into at most CONTEXT_TOKEN_BUDGET tokens.
+# Tokens are counted with tiktoken's TOKENIZER_ENCODING (a close proxy for the Groq model's tokenizer).
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_DEDUPE_THRESHOLD = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.8"))
+CONTEXT_USE_MMR = os.getenv("CONTEXT_USE_MMR", "").strip().lower() in ("1", "true", "yes")
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+
+# Per-query routing in front of retrieval and web search: small talk skips both, questions about the
+# user's own data skip the web. QUERY_ROUTER_CLASSIFIER also matches other queries against example
+# prototypes by embedding similarity (at least QUERY_ROUTER_MIN_SIMILARITY to count as a match).
+QUERY_ROUTER_ENABLED = os.getenv("QUERY_ROUTER_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+QUERY_ROUTER_CLASSIFIER = os.getenv("QUERY_ROUTER_CLASSIFIER", "").strip().lower() in ("1", "true", "yes")
+QUERY_ROUTER_MIN_SIMILARITY = float(os.getenv("QUERY_ROUTER_MIN_SIMILARITY", "0.6"))
+
+# Query-side caches: question text -> embedding, and (question, k, index version) -> retrieved chunks.
+# Result entries are keyed by index version, so any index update invalidates them.
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+
 MAX_CHAT_HISTORY_TURNS = 20
+# Chat history sent to the LLM: newest turns that fit in HISTORY_TOKEN_BUDGET (and at most MAX_CHAT_HISTORY_TURNS).
+# With HISTORY_SUMMARY_ENABLED, older turns are folded into a rolling summary (one extra Groq call per
+# HISTORY_SUMMARY_MIN_PAIRS dropped turns, made in the background).
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+HISTORY_SUMMARY_ENABLED = os.getenv("HISTORY_SUMMARY_ENABLED", "").strip().lower() in ("1", "true", "yes")
+HISTORY_SUMMARY_MIN_PAIRS = int(os.getenv("HISTORY_SUMMARY_MIN_PAIRS", "4"))
+HISTORY_SUMMARY_INPUT_TOKENS = int(os.getenv("HISTORY_SUMMARY_INPUT_TOKENS", "4000"))
+
+# In-memory session cache limits; least recently used sessions are flushed and evicted beyond these.
+SESSION_CACHE_MAX_SESSIONS = int(os.getenv("SESSION_CACHE_MAX_SESSIONS", "1000"))
+SESSION_CACHE_MAX_BYTES = int(os.getenv("SESSION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
 
 MAX_MESSAGE_LENGTH = 32_000
 
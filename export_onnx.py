@@ -0,0 +1,27 @@
+"""
+AXIOM ONNX EXPORT
+=================
+
+Exports EMBEDDING_MODEL to ONNX (int8-quantized unless EMBEDDING_ONNX_QUANTIZE=false)
+into database/vector_store/onnx and checks its embeddings against the torch model.
+Needs torch + transformers; the server itself only loads the exported files.
+
+USAGE:
+    python export_onnx.py
+
+Then set EMBEDDING_BACKEND=onnx in .env and restart the server. Run it again after
+changing EMBEDDING_MODEL or EMBEDDING_ONNX_QUANTIZE.
+"""
+
+import logging
+
+from config import EMBEDDING_ONNX_DIR, EMBEDDING_ONNX_MIN_COSINE, EMBEDDING_ONNX_QUANTIZE
+from app.services.embedding_backend import export_onnx_model
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-8s | %(message)s")
+    meta = export_onnx_model(EMBEDDING_ONNX_DIR, EMBEDDING_ONNX_QUANTIZE)
+    print(f"Exported {meta['model']} to {EMBEDDING_ONNX_DIR} (min cosine vs torch {meta['min_cosine']})")
+    if meta["min_cosine"] < EMBEDDING_ONNX_MIN_COSINE:
+        print(f"Below EMBEDDING_ONNX_MIN_COSINE={EMBEDDING_ONNX_MIN_COSINE}: the server will keep using torch")
@@ -0,0 +1,25 @@
+"""
+AXIOM CHAT MIGRATION
+====================
+
+Imports the existing chat_*.jsonl / chat_*.json session files from
+database/chats_data into the SQLite chat store (database/chats.db).
+
+USAGE:
+    python migrate_chats.py
+
+Then set CHAT_STORE_BACKEND=sqlite in .env and restart the server.
+The original files are left untouched.
+"""
+
+import logging
+
+from config import CHATS_DATA_DIR, CHAT_STORE_SQLITE_PATH
+from app.services.chat_store import FileChatStore
+from app.services.sqlite_chat_store import SqliteChatStore, migrate_files_to_sqlite
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-8s | %(message)s")
+    count = migrate_files_to_sqlite(FileChatStore(CHATS_DATA_DIR), SqliteChatStore(CHAT_STORE_SQLITE_PATH))
+    print(f"Imported {count} session(s) into {CHAT_STORE_SQLITE_PATH}")
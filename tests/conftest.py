@@ -0,0 +1,48 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+# config creates and reads its data directories at import time, so point it at a scratch one first.
+os.environ.setdefault("AXIOM_DATABASE_DIR", tempfile.mkdtemp(prefix="axiom-tests-"))
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic stand-in for the embedding model: the same text always gets the same unit vector."""
+
+    dim = 32
+
+    def _vector(self, text: str) -> list:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+@pytest.fixture
+def data_dirs():
+    """Empty learning_data / chats_data / vector_store directories for one test."""
+    import config
+
+    for directory in (config.LEARNING_DATA_DIR, config.CHATS_DATA_DIR, config.VECTOR_STORE_DIR):
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True, exist_ok=True)
+    return config
+
+
+@pytest.fixture
+def hash_embeddings(monkeypatch):
+    import app.services.vector_store as vector_store
+
+    embeddings = HashEmbeddings()
+    monkeypatch.setattr(vector_store, "create_embedding_backend", lambda *args: (embeddings, "test-hash"))
+    return embeddings
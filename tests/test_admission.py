@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionQueue, AdmissionRejected
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    async def run():
+        queue = AdmissionQueue(max_concurrent=1, max_queue=10, timeout=5)
+        await queue.acquire()
+        order = []
+
+        async def wait(name, priority):
+            await queue.acquire(priority)
+            order.append(name)
+            queue.release(0.1)
+
+        tasks = [
+            asyncio.ensure_future(wait("chat-1", 1)),
+            asyncio.ensure_future(wait("realtime", 0)),
+            asyncio.ensure_future(wait("chat-2", 1)),
+        ]
+        await asyncio.sleep(0)
+        queue.release(0.1)
+        await asyncio.gather(*tasks)
+        return order, queue.stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ["realtime", "chat-1", "chat-2"]
+    assert stats["active"] == 0 and stats["waiting"] == 0 and stats["admitted"] == 4
+
+
+def test_full_queue_rejects_at_once_with_retry_after():
+    async def run():
+        queue = AdmissionQueue(max_concurrent=1, max_queue=0, timeout=5)
+        await queue.acquire()
+        with pytest.raises(AdmissionRejected) as info:
+            await queue.acquire()
+        return info.value, queue
+
+    error, queue = asyncio.run(run())
+    assert "queue full" in str(error) and error.retry_after >= 1
+    assert queue.rejected == 1
+
+
+def test_waiting_too_long_times_out_and_frees_the_queue_slot():
+    async def run():
+        queue = AdmissionQueue(max_concurrent=1, max_queue=5, timeout=0.05)
+        await queue.acquire()
+        with pytest.raises(AdmissionRejected, match="timed out"):
+            await queue.acquire()
+        queue.release()
+        await queue.acquire()  # the timed-out waiter must not have taken the slot
+        return queue.stats()
+
+    stats = asyncio.run(run())
+    assert stats["timed_out"] == 1 and stats["waiting"] == 0 and stats["active"] == 1
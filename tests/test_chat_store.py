@@ -0,0 +1,101 @@
+import json
+import time
+
+from app.services.chat_store import FileChatStore, read_session_file
+from app.services.sqlite_chat_store import SqliteChatStore, migrate_files_to_sqlite
+
+
+def _messages(n: int, start: int = 0) -> list:
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}", "ts": 1000.0 + i}
+        for i in range(start, start + n)
+    ]
+
+
+def _append(store, session_id: str, stored: list, new: list):
+    full = stored + new
+    store.append(session_id, new, len(stored), lambda: full)
+    return full
+
+
+def test_file_store_appends_only_new_records(tmp_path):
+    store = FileChatStore(tmp_path)
+    stored = _append(store, "s1", [], _messages(2))
+    log_path = store.log_path("s1")
+    first = log_path.read_bytes()
+
+    stored = _append(store, "s1", stored, _messages(2, start=2))
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    assert log_path.read_bytes().startswith(first)
+    assert json.loads(lines[0])["type"] == "header" and len(lines) == 5
+    assert store.load("s1") == stored
+    assert store.session_ids() == ["s1"]
+
+
+def test_file_store_never_builds_the_full_session_for_an_append(tmp_path):
+    store = FileChatStore(tmp_path)
+    store.compact("s1", _messages(2))
+    store.append("s1", _messages(1, start=2), 2, lambda: (_ for _ in ()).throw(AssertionError("rebuilt")))
+    assert len(store.load("s1")) == 3
+
+
+def test_file_store_compact_rewrites_the_log(tmp_path):
+    store = FileChatStore(tmp_path)
+    _append(store, "s1", [], _messages(4))
+    store.compact("s1", _messages(1))
+    assert store.load("s1") == _messages(1)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_file_store_recovers_from_a_torn_append(tmp_path):
+    store = FileChatStore(tmp_path)
+    stored = _append(store, "s1", [], _messages(2))
+    with open(store.log_path("s1"), "a", encoding="utf-8") as f:
+        f.write('{"type": "message", "role": "us')
+    assert store.load("s1") == stored
+
+    stored = _append(store, "s1", stored, _messages(1, start=2))
+    assert store.load("s1") == stored
+
+
+def test_legacy_json_sessions_are_read_and_migrated_on_first_write(tmp_path):
+    legacy = _messages(2)
+    (tmp_path / "chat_abc.json").write_text(json.dumps({"session_id": "abc", "messages": legacy}), encoding="utf-8")
+    store = FileChatStore(tmp_path)
+    assert store.load("abc") == legacy
+    assert store.session_ids() == ["abc"]
+
+    stored = _append(store, "abc", legacy, _messages(1, start=2))
+    assert not store.legacy_path("abc").exists()
+    assert read_session_file(store.log_path("abc")) == ("abc", stored)
+
+
+def test_sqlite_store_append_compact_and_changes(tmp_path):
+    store = SqliteChatStore(tmp_path / "chats.db")
+    assert store.load("s1") is None
+    before = time.time()
+    stored = _append(store, "s1", [], _messages(2))
+    stored = _append(store, "s1", stored, _messages(2, start=2))
+    assert store.load("s1") == stored
+    assert store.changed_since(before - 1) == ["s1"]
+    assert store.changed_since(time.time() + 1) == []
+
+    store.compact("s1", _messages(1))
+    assert store.load("s1") == _messages(1)
+    store.compact("empty", [])
+    assert store.load("empty") == []
+    assert store.session_ids() == ["empty", "s1"]
+
+
+def test_migrate_files_to_sqlite(tmp_path):
+    files = FileChatStore(tmp_path)
+    files.compact("one", _messages(3))
+    (tmp_path / "chat_two.json").write_text(
+        json.dumps({"session_id": "two", "messages": _messages(2)}), encoding="utf-8",
+    )
+    target = SqliteChatStore(tmp_path / "chats.db")
+
+    assert migrate_files_to_sqlite(files, target) == 2
+    assert target.load("one") == _messages(3)
+    assert target.load("two") == _messages(2)
+    assert (tmp_path / "chat_two.json").exists()  # the originals are left alone
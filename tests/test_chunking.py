@@ -0,0 +1,46 @@
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.services.chunking import TurnChunker, group_turns
+
+
+def _chunker(max_chars: int = 200) -> TurnChunker:
+    return TurnChunker(RecursiveCharacterTextSplitter(chunk_size=max_chars, chunk_overlap=0), max_chars=max_chars)
+
+
+def _turn(question: str, answer: str) -> list:
+    return [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+
+
+def test_turns_start_at_each_user_message():
+    messages = _turn("a", "b") + [{"role": "assistant", "content": "c"}] + _turn("d", "e")
+    assert [len(turn) for _, turn in group_turns(messages)] == [3, 2]
+
+
+def test_appending_a_turn_keeps_earlier_chunk_ids():
+    chunker = _chunker()
+    messages = _turn("What is FAISS?", "A similarity search library.") + _turn("Who wrote it?", "Meta AI.")
+    before = chunker.chunk_session("s1", "chat_s1", messages)
+    after = chunker.chunk_session("s1", "chat_s1", messages + _turn("Is it fast?", "Yes."))
+
+    assert [doc.id for doc in after[:len(before)]] == [doc.id for doc in before]
+    assert len(after) == len(before) + 1
+    assert after[-1].metadata["turn"] == 2
+
+
+def test_chunk_ids_change_only_when_the_turn_text_changes():
+    chunker = _chunker()
+    original = chunker.chunk_session("s1", "chat_s1", _turn("hi", "hello"))
+    edited = chunker.chunk_session("s1", "chat_s1", _turn("hi", "hello there"))
+    assert original[0].id != edited[0].id
+    assert original[0].id.rsplit(":", 1)[0] == edited[0].id.rsplit(":", 1)[0]
+
+
+def test_long_turns_are_split_with_the_question_on_every_part():
+    chunker = _chunker(max_chars=200)
+    answer = " ".join(f"sentence {i} of a long answer." for i in range(40))
+    chunks = chunker.chunk_session("s1", "chat_s1", _turn("Explain it", answer))
+
+    assert len(chunks) > 1
+    assert all(chunk.page_content.startswith("User: Explain it\n") for chunk in chunks)
+    assert [chunk.metadata["part"] for chunk in chunks] == list(range(len(chunks)))
+    assert len({chunk.id for chunk in chunks}) == len(chunks)
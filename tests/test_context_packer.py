@@ -0,0 +1,54 @@
+from langchain_core.documents import Document
+
+from app.services.context_packer import ContextPacker
+from app.utils.tokens import count_tokens
+
+
+def _doc(text: str, source: str = "a.txt") -> Document:
+    return Document(page_content=text, metadata={"source": source})
+
+
+def _words(prefix: str, n: int) -> str:
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_overlapping_chunks_of_one_source_are_merged():
+    text = _words("w", 300)
+    first, second = text[:800], text[650:]
+    packed = ContextPacker(token_budget=10_000, use_mmr=False).pack([_doc(second), _doc(first)])
+    assert packed == text
+
+
+def test_chunks_from_different_sources_are_not_merged():
+    text = _words("w", 300)
+    packed = ContextPacker(token_budget=10_000, use_mmr=False, separator="|").pack(
+        [_doc(text[:800], "a.txt"), _doc(text[650:], "b.txt")]
+    )
+    assert packed.split("|") == [text[:800], text[650:]]
+
+
+def test_near_duplicates_are_dropped():
+    original = _words("fact", 40)
+    near_copy = original.replace("fact39", "fact99")
+    packer = ContextPacker(token_budget=10_000, dedupe_threshold=0.8, use_mmr=False, separator="|")
+    packed = packer.pack([_doc(original, "a.txt"), _doc(near_copy, "b.txt"), _doc(_words("other", 40), "c.txt")])
+    assert packed.split("|") == [original, _words("other", 40)]
+
+
+def test_mmr_moves_a_redundant_chunk_below_a_diverse_one():
+    docs = [_doc(_words("x", 30), "a.txt"), _doc(_words("y", 30), "b.txt"), _doc(_words("z", 30), "c.txt")]
+    query = [1.0, 0.0]
+    vectors = [[0.95, 0.31], [0.94, 0.34], [0.9, -0.44]]
+    packer = ContextPacker(token_budget=10_000, use_mmr=True, mmr_lambda=0.5, separator="|")
+    assert packer.pack(docs, query, vectors).split("|") == [docs[0].page_content, docs[2].page_content, docs[1].page_content]
+    # Without vectors the retrieval order is kept.
+    assert packer.pack(docs).split("|") == [doc.page_content for doc in docs]
+
+
+def test_packing_stops_at_the_token_budget():
+    docs = [_doc(_words(f"s{i}_", 200), f"{i}.txt") for i in range(5)]
+    budget = count_tokens(docs[0].page_content) * 2 + 80
+    packed = ContextPacker(token_budget=budget, use_mmr=False).pack(docs)
+    assert count_tokens(packed) <= budget
+    assert packed.startswith(docs[0].page_content + "\n" + docs[1].page_content)
+    assert docs[3].page_content[:20] not in packed
@@ -0,0 +1,44 @@
+import numpy as np
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+def _vector(i: int) -> list:
+    return [float(i)] * 4
+
+
+def test_incremental_saves_append_to_the_segment(tmp_path):
+    path = tmp_path / "embedding_cache.npz"
+    cache = EmbeddingCache(path, "model", max_entries=10_000)
+    for i in range(5):
+        cache.put(f"chunk {i}", _vector(i))
+    cache.save(compact=True)
+    snapshot = path.stat().st_mtime_ns
+
+    cache.put("chunk 5", _vector(5))
+    cache.save()
+    assert path.stat().st_mtime_ns == snapshot
+    assert cache.segment_path.exists()
+
+    reloaded = EmbeddingCache(path, "model", max_entries=10_000)
+    assert len(reloaded) == 6
+    assert np.allclose(reloaded.get("chunk 5"), _vector(5))
+
+    reloaded.save(compact=True)
+    assert not reloaded.segment_path.exists()
+    assert len(EmbeddingCache(path, "model", max_entries=10_000)) == 6
+
+
+def test_partial_segment_record_is_dropped(tmp_path):
+    path = tmp_path / "embedding_cache.npz"
+    cache = EmbeddingCache(path, "model", max_entries=10_000)
+    cache.put("kept", _vector(1))
+    cache.save()
+    with open(cache.segment_path, "ab") as f:
+        f.write(b"torn")
+
+    reloaded = EmbeddingCache(path, "model", max_entries=10_000)
+    assert len(reloaded) == 1
+    reloaded.put("after", _vector(2))
+    reloaded.save()
+    assert len(EmbeddingCache(path, "model", max_entries=10_000)) == 2
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import app.services.groq_service as groq_service
+from app.services.groq_service import GroqService
+from app.services.key_pool import KeyPool
+
+
+class FakeChain:
+    """astream() yields chunks (or raises / hangs before the first one) and records whether it was closed."""
+
+    def __init__(self, chunks=(), error=None, hang=False):
+        self.chunks = chunks
+        self.error = error
+        self.hang = hang
+        self.closed = False
+
+    async def astream(self, variables):
+        try:
+            if self.hang:
+                await asyncio.Event().wait()
+            if self.error:
+                raise self.error
+            for chunk in self.chunks:
+                yield SimpleNamespace(content=chunk)
+        finally:
+            self.closed = True
+
+
+def _service(monkeypatch, chains) -> GroqService:
+    monkeypatch.setattr(groq_service, "GROQ_API_KEYS", [f"gsk_test_key_{i:08d}" for i in range(len(chains))])
+    service = GroqService.__new__(GroqService)
+    service.key_pool = KeyPool(len(chains), acquire_timeout=0.1, rate_limited=False)
+    service.llms = [None] * len(chains)
+    return service
+
+
+def _compiled(chains):
+    return SimpleNamespace(prompt=SimpleNamespace(format_messages=lambda **variables: []), chains=chains)
+
+
+def _in_flight(service) -> list:
+    return [key["in_flight"] for key in service.key_pool.stats()]
+
+
+def test_failed_first_chunk_and_early_disconnect_close_streams(monkeypatch):
+    chains = [FakeChain(error=RuntimeError("boom")), FakeChain(chunks=["a", "b", "c"])]
+    service = _service(monkeypatch, chains)
+
+    async def run():
+        stream = service._astream_llm(_compiled(chains), {})
+        assert await anext(stream) == "a"
+        await stream.aclose()  # the client went away
+
+    asyncio.run(run())
+    assert all(chain.closed for chain in chains)
+    assert _in_flight(service) == [0, 0]
+
+
+def test_cancel_while_waiting_for_first_chunk_releases_the_key(monkeypatch):
+    chains = [FakeChain(hang=True)]
+    service = _service(monkeypatch, chains)
+
+    async def run():
+        task = asyncio.ensure_future(anext(service._astream_llm(_compiled(chains), {})))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert chains[0].closed
+    assert _in_flight(service) == [0]
@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.utils import metrics
+from app.utils.startup import StartupTracker
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "startup", StartupTracker())
+    for name in ("vector_store_service", "groq_service", "realtime_service", "chat_service"):
+        monkeypatch.setattr(main, name, None)
+    # Not entered as a context manager, so the lifespan (and service startup) never runs.
+    return TestClient(main.app)
+
+
+def test_ready_is_503_until_startup_finishes(client):
+    assert client.get("/health/live").status_code == 200
+    response = client.get("/health/ready")
+    assert response.status_code == 503 and response.json()["status"] == "starting"
+
+    chat = client.post("/chat", json={"message": "hello"})
+    assert chat.status_code == 503 and chat.headers["Retry-After"] == "5"
+
+    with main.startup.phase_timer("services"):
+        pass
+    main.startup.mark_ready()
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready" and "services" in response.json()["phases"]
+
+
+def test_failed_startup_stays_unready(client):
+    main.startup.mark_failed(RuntimeError("index missing"))
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed" and "index missing" in response.json()["error"]
+
+
+def test_metrics_render_in_prometheus_text_format(client):
+    metrics.inc("axiom_test_events_total", kind="a")
+    metrics.inc("axiom_test_events_total", 2, kind="a")
+    metrics.set_value("axiom_test_gauge", 0.5, label='quote"d')
+    metrics.observe("axiom_test_seconds", 0.003, stage="x")
+    metrics.observe("axiom_test_seconds", 7.0, stage="x")
+
+    client.get("/health/live")
+    text = client.get("/metrics").text
+    assert "# TYPE axiom_test_events_total counter" in text
+    assert 'axiom_test_events_total{kind="a"} 3' in text
+    assert 'axiom_test_gauge{label="quote\\"d"} 0.5' in text
+    assert "# TYPE axiom_test_seconds histogram" in text
+    assert 'axiom_test_seconds_bucket{stage="x",le="0.001"} 0' in text
+    assert 'axiom_test_seconds_bucket{stage="x",le="0.005"} 1' in text
+    assert 'axiom_test_seconds_bucket{stage="x",le="10"} 2' in text
+    assert 'axiom_test_seconds_bucket{stage="x",le="+Inf"} 2' in text
+    assert 'axiom_test_seconds_count{stage="x"} 2' in text
+    assert 'axiom_requests_total{method="GET",route="/health/live",status="200"}' in text
@@ -0,0 +1,85 @@
+import threading
+
+from app.models import ChatMessage
+from app.services.history_window import HistoryWindow
+from app.utils.tokens import count_tokens
+
+
+def _conversation(pairs: int) -> list:
+    messages = []
+    for i in range(pairs):
+        messages.append(ChatMessage(role="user", content=f"question number {i}"))
+        messages.append(ChatMessage(role="assistant", content=f"answer number {i}"))
+    return messages
+
+
+def _cost(i: int) -> int:
+    return count_tokens(f"question number {i}") + count_tokens(f"answer number {i}")
+
+
+def test_pairs_not_yet_summarized_stay_in_the_window():
+    release = threading.Event()
+
+    def summarizer(previous, pairs):
+        release.wait(timeout=5)
+        return f"summary of {len(pairs)} turns"
+
+    messages = _conversation(4)
+    window = HistoryWindow(
+        token_budget=_cost(2) + _cost(3), max_turns=10, summarizer=summarizer,
+        summary_min_pairs=1, summary_input_tokens=10_000,
+    )
+    try:
+        pairs, summary = window.select("s", messages)
+        # The summary is still being written: the two older pairs must not vanish.
+        assert summary is None
+        assert [q for q, _ in pairs] == [f"question number {i}" for i in range(4)]
+
+        release.set()
+        window._executor.submit(lambda: None).result(timeout=5)
+        pairs, summary = window.select("s", messages)
+        assert summary == "summary of 2 turns"
+        assert [q for q, _ in pairs] == ["question number 2", "question number 3"]
+        assert not window._index["s"].summarizing
+    finally:
+        window.close()
+
+
+def test_failed_summary_clears_the_flag_so_it_is_retried():
+    attempts = []
+
+    def summarizer(previous, pairs):
+        attempts.append(len(pairs))
+        raise RuntimeError("model unavailable")
+
+    messages = _conversation(4)
+    window = HistoryWindow(token_budget=_cost(3), max_turns=10, summarizer=summarizer, summary_min_pairs=1)
+    try:
+        window.select("s", messages)
+        window._executor.submit(lambda: None).result(timeout=5)
+        assert not window._index["s"].summarizing
+        window.select("s", messages)
+        window._executor.submit(lambda: None).result(timeout=5)
+        assert len(attempts) == 2
+    finally:
+        window.close()
+
+
+def test_newest_pairs_within_the_budget_and_turn_limit():
+    messages = _conversation(5) + [ChatMessage(role="user", content="pending question")]
+    window = HistoryWindow(token_budget=_cost(3) + _cost(4), max_turns=10)
+    pairs, summary = window.select("s", messages, exclude_last=True)
+    assert [q for q, _ in pairs] == ["question number 3", "question number 4"] and summary is None
+
+    window = HistoryWindow(token_budget=10_000, max_turns=1)
+    assert [q for q, _ in window.select("s", messages)[0]] == ["question number 4"]
+
+
+def test_an_oversized_last_exchange_is_cut_to_fit():
+    messages = [
+        ChatMessage(role="user", content="tell me everything"),
+        ChatMessage(role="assistant", content=" ".join(["detail"] * 500)),
+    ]
+    pairs, _ = HistoryWindow(token_budget=50, max_turns=10).select("s", messages)
+    assert len(pairs) == 1 and pairs[0][0] == "tell me everything"
+    assert count_tokens(pairs[0][0]) + count_tokens(pairs[0][1]) <= 50
@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pytest
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from app.services.ann_index import build_index
+from app.services.index_store import (
+    DOCSTORE_FILE, LEGACY_DOCSTORE_FILE, MANIFEST_FILE, UPDATES_FILE, IndexFormatError,
+    add_chunks, append_updates, load_index, save_index,
+)
+
+MODEL = "test-hash"
+
+
+def _docs(n: int, start: int = 0) -> list:
+    return [Document(id=f"doc:{i}", page_content=f"chunk {i}", metadata={"source": "a.txt"}) for i in range(start, start + n)]
+
+
+def _vectors(n: int, dim: int = 8, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def _saved_store(directory, embeddings, n: int = 5) -> FAISS:
+    vectors = _vectors(n)
+    store = FAISS(embeddings, build_index(vectors, "flat"), InMemoryDocstore(), {})
+    add_chunks(store, _docs(n), vectors)
+    save_index(directory, store, {"embedding_model": MODEL})
+    return store
+
+
+def _edit_manifest(directory, **fields):
+    path = directory / MANIFEST_FILE
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    manifest.update(fields)
+    path.write_text(json.dumps(manifest), encoding="utf-8")
+
+
+def test_snapshot_round_trip(tmp_path, hash_embeddings):
+    _saved_store(tmp_path, hash_embeddings)
+    store, manifest, replayed = load_index(tmp_path, hash_embeddings, MODEL)
+    assert replayed == 0 and manifest["count"] == 5
+    assert sorted(store.docstore._dict) == [f"doc:{i}" for i in range(5)]
+    assert store.similarity_search_by_vector(_vectors(5)[3].tolist(), k=1)[0].id == "doc:3"
+
+
+def test_no_index_returns_none(tmp_path, hash_embeddings):
+    assert load_index(tmp_path, hash_embeddings, MODEL) is None
+
+
+def test_legacy_pickle_is_never_loaded(tmp_path, hash_embeddings):
+    (tmp_path / LEGACY_DOCSTORE_FILE).write_bytes(b"\x80\x04not to be unpickled")
+    with pytest.raises(IndexFormatError, match="pickle"):
+        load_index(tmp_path, hash_embeddings, MODEL)
+
+
+@pytest.mark.parametrize("fields, message", [
+    ({"format_version": 1}, "format version"),
+    ({"embedding_model": "another-model"}, "built with"),
+    ({"count": 99}, "vectors"),
+    ({"dimension": 16}, "dimension"),
+])
+def test_manifest_mismatches_are_rejected(tmp_path, hash_embeddings, fields, message):
+    _saved_store(tmp_path, hash_embeddings)
+    _edit_manifest(tmp_path, **fields)
+    with pytest.raises(IndexFormatError, match=message):
+        load_index(tmp_path, hash_embeddings, MODEL)
+
+
+def test_docstore_missing_chunks_is_rejected(tmp_path, hash_embeddings):
+    _saved_store(tmp_path, hash_embeddings)
+    path = tmp_path / DOCSTORE_FILE
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    path.write_text("".join(lines[:-1]), encoding="utf-8")
+    with pytest.raises(IndexFormatError):
+        load_index(tmp_path, hash_embeddings, MODEL)
+
+
+def test_update_log_is_replayed_and_a_torn_batch_dropped(tmp_path, hash_embeddings):
+    _saved_store(tmp_path, hash_embeddings)
+    append_updates(tmp_path, _docs(2, start=5), _vectors(2, seed=1), removed=["doc:0"])
+    with open(tmp_path / UPDATES_FILE, "a", encoding="utf-8") as f:
+        f.write('{"remove": ["doc:1"], "add": [')
+
+    store, _, replayed = load_index(tmp_path, hash_embeddings, MODEL)
+    assert replayed == 3
+    assert sorted(store.docstore._dict) == [f"doc:{i}" for i in range(1, 7)]
+    assert (tmp_path / UPDATES_FILE).read_text(encoding="utf-8").endswith("\n")
+
+    save_index(tmp_path, store, {"embedding_model": MODEL})
+    assert not (tmp_path / UPDATES_FILE).exists()
+    assert load_index(tmp_path, hash_embeddings, MODEL)[0].index.ntotal == 6
@@ -0,0 +1,81 @@
+import pytest
+
+from app.services.key_pool import KeyPool, KeyPoolBusy, KeyPoolExhausted
+
+
+def _pool() -> KeyPool:
+    return KeyPool(1, max_in_flight=1, cooldown_seconds=30, acquire_timeout=0.05, rate_limited=False)
+
+
+def test_busy_keys_raise_key_pool_busy():
+    pool = _pool()
+    pool.acquire()
+    with pytest.raises(KeyPoolBusy) as info:
+        pool.acquire()
+    assert info.value.busy and info.value.retry_after is not None
+    assert "rate limit" not in str(info.value).lower()
+
+
+def test_cooling_keys_raise_exhausted_with_retry_after():
+    pool = _pool()
+    pool.release(pool.acquire(), failed=True, rate_limited=True)
+    with pytest.raises(KeyPoolExhausted) as info:
+        pool.acquire()
+    assert not info.value.busy
+    assert info.value.retry_after == pytest.approx(30, abs=1)
+
+
+def _wrapped(error: Exception) -> Exception:
+    try:
+        try:
+            raise error
+        except Exception as e:
+            raise Exception(f"Error getting response from Groq: {e}") from e
+    except Exception as wrapped:
+        return wrapped
+
+
+def test_busy_maps_to_503_not_the_daily_limit_message():
+    from app.main import BUSY_MESSAGE, _chat_error, _is_busy_error
+
+    wrapped = _wrapped(KeyPoolBusy())
+    assert _is_busy_error(wrapped)
+    response = _chat_error(wrapped, "chat")
+    assert response.status_code == 503
+    assert response.detail == BUSY_MESSAGE
+    assert response.headers["Retry-After"] == "2"
+    assert not _is_busy_error(KeyPoolExhausted(30))
+
+
+def test_rate_limits_map_to_429_and_other_errors_to_500():
+    from app.main import RATE_LIMIT_MESSAGE, _chat_error
+
+    response = _chat_error(_wrapped(KeyPoolExhausted(30)), "chat")
+    assert response.status_code == 429
+    assert response.detail == RATE_LIMIT_MESSAGE
+    assert response.headers["Retry-After"] == "30"
+    assert _chat_error(RuntimeError("boom"), "chat").status_code == 500
+
+
+def test_local_buckets_adopt_the_limits_groq_reports():
+    import httpx
+
+    pool = KeyPool(1, max_in_flight=0, acquire_timeout=0.05, rate_limited=True)
+    pool.observe(0, 200, httpx.Headers({
+        "x-ratelimit-limit-requests": "500000",
+        "x-ratelimit-remaining-requests": "499999",
+        "x-ratelimit-limit-tokens": "300000",
+        "x-ratelimit-remaining-tokens": "299000",
+    }))
+    # Far beyond the free-tier defaults (12k TPM): must not be throttled locally.
+    for _ in range(10):
+        pool.acquire(tokens=20_000)
+    limiter = pool._limiters[0]
+    tokens = {b.period_seconds: b.capacity for b in limiter.token_buckets}
+    assert tokens[60.0] == 300_000
+    assert tokens[86400.0] > 100_000  # the unreported daily token limit scales with the tier
+    assert {b.period_seconds: b.capacity for b in limiter.request_buckets}[86400.0] == 500_000
+
+
+def test_local_rate_limiting_is_off_by_default():
+    assert KeyPool(1)._limiters is None
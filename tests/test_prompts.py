@@ -0,0 +1,35 @@
+from app.services.prompts import (
+    GENERAL_SYSTEM_TEMPLATE, REALTIME_SYSTEM_TEMPLATE, _STATIC_SYSTEM_PREFIX, chat_prompt, section,
+)
+from config import AXIOM_SYSTEM_PROMPT
+
+
+def _system_message(template: str, **variables) -> str:
+    values = {"time_info": "", "history_summary": "", "context": "", "search_results": "", "history": [], "question": "q"}
+    values.update(variables)
+    names = chat_prompt(template).input_variables
+    return chat_prompt(template).format_messages(**{k: v for k, v in values.items() if k in names})[0].content
+
+
+def test_system_prompt_is_a_byte_identical_prefix_of_every_request():
+    first = _system_message(GENERAL_SYSTEM_TEMPLATE, time_info="Monday", context=section("Relevant context", "a"))
+    second = _system_message(
+        GENERAL_SYSTEM_TEMPLATE, time_info="Tuesday", history_summary=section("Summary", "b"),
+        context=section("Relevant context", "code: {x: 1}"),
+    )
+    realtime = _system_message(REALTIME_SYSTEM_TEMPLATE, time_info="Monday", search_results=section("Search", "c"))
+    for message in (first, second, realtime):
+        assert message.startswith(AXIOM_SYSTEM_PROMPT + "\n\nCurrent time and date: ")
+
+
+def test_per_request_values_are_substituted_verbatim():
+    message = _system_message(GENERAL_SYSTEM_TEMPLATE, context=section("Relevant context", "{curly} }{ braces"))
+    assert message.endswith("\n\nRelevant context:\n{curly} }{ braces")
+
+
+def test_only_the_per_request_parts_are_template_variables():
+    assert set(chat_prompt(GENERAL_SYSTEM_TEMPLATE).input_variables) == {
+        "time_info", "history_summary", "context", "history", "question",
+    }
+    assert GENERAL_SYSTEM_TEMPLATE.startswith(_STATIC_SYSTEM_PREFIX)
+    assert section("Heading", "") == ""
@@ -0,0 +1,40 @@
+import pytest
+
+from app.services.query_router import QueryRouter
+
+
+@pytest.fixture
+def router() -> QueryRouter:
+    return QueryRouter(enabled=True, use_classifier=False)
+
+
+@pytest.mark.parametrize("reply", ["yes", "Yes!", "no", "sure", "ok", "yep, go on"])
+def test_short_replies_keep_search_and_retrieval(router, reply):
+    route = router.route(reply, realtime=True)
+    assert route.search and route.retrieve
+
+
+@pytest.mark.parametrize("message", ["hi", "Hello there!", "thanks", "thank you so much", "bye"])
+def test_greetings_and_thanks_skip_both(router, message):
+    assert router.route(message, realtime=True).name == "none"
+    assert router.route(message, realtime=False).name == "none"
+
+
+def test_personal_questions_only_retrieve(router):
+    route = router.route("what did we talk about last time?", realtime=True)
+    assert not route.search and route.retrieve
+
+
+@pytest.mark.parametrize("question", [
+    "how do I reset my router",
+    "what's the weather in my city",
+    "is our flight to Paris delayed today",
+])
+def test_possessives_alone_do_not_skip_search(router, question):
+    route = router.route(question, realtime=True)
+    assert route.search and route.retrieve
+
+
+def test_memory_questions_skip_search_even_with_my(router):
+    route = router.route("do you remember my favourite colour?", realtime=True)
+    assert not route.search and route.retrieve
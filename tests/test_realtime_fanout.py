@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import app.services.realtime_service as realtime_service
+from app.services.query_router import QueryRouter
+from app.services.realtime_service import RealtimeGroqService
+
+
+def _service(monkeypatch, search_seconds: float, retrieval_seconds: float, deadline: float = 1.0):
+    monkeypatch.setattr(realtime_service, "REALTIME_SEARCH_TIMEOUT_SECONDS", 5.0)
+    monkeypatch.setattr(realtime_service, "REALTIME_RETRIEVAL_TIMEOUT_SECONDS", 5.0)
+    monkeypatch.setattr(realtime_service, "REALTIME_CONTEXT_DEADLINE_SECONDS", deadline)
+    service = RealtimeGroqService.__new__(RealtimeGroqService)
+    service.router = QueryRouter(enabled=False)
+    service.realtime_prompt = object()
+    service.finished = []
+
+    async def asearch_tavily(query, num_results=5):
+        await asyncio.sleep(search_seconds)
+        service.finished.append("search")
+        return "search results"
+
+    async def aretrieve_context(question):
+        await asyncio.sleep(retrieval_seconds)
+        service.finished.append("retrieval")
+        return "retrieved context"
+
+    service.asearch_tavily = asearch_tavily
+    service._aretrieve_context = aretrieve_context
+    return service
+
+
+def test_search_and_retrieval_run_concurrently(monkeypatch):
+    service = _service(monkeypatch, search_seconds=0.2, retrieval_seconds=0.2)
+
+    async def run():
+        started = time.monotonic()
+        _, variables = await service._abuild_prompt("latest news about python")
+        return variables, time.monotonic() - started
+
+    variables, elapsed = asyncio.run(run())
+    assert elapsed < 0.35
+    assert "search results" in variables["search_results"]
+    assert "retrieved context" in variables["context"]
+
+
+def test_a_branch_past_the_deadline_is_left_out_but_not_cancelled(monkeypatch):
+    service = _service(monkeypatch, search_seconds=0.3, retrieval_seconds=0.01, deadline=0.1)
+
+    async def run():
+        started = time.monotonic()
+        _, variables = await service._abuild_prompt("latest news about python")
+        elapsed = time.monotonic() - started
+        await asyncio.sleep(0.4)  # the late search keeps running and fills its cache
+        return variables, elapsed
+
+    variables, elapsed = asyncio.run(run())
+    assert elapsed < 0.25
+    assert variables["search_results"] == ""
+    assert "retrieved context" in variables["context"]
+    assert service.finished == ["retrieval", "search"]
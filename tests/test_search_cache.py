@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+from app.services.search_cache import SearchCache
+
+
+class StubClient:
+    """Counts upstream calls; each search takes delay seconds."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self, query: str, **params) -> dict:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {"results": [{"title": query, "content": f"call {self.calls}"}]}
+
+
+class AsyncStubClient(StubClient):
+    async def search(self, query: str, **params) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"results": [{"title": query, "content": f"call {self.calls}"}]}
+
+
+def _cache(client=None, async_client=None, ttl_seconds=60.0, news_ttl_seconds=60.0) -> SearchCache:
+    return SearchCache(
+        client, async_client, ttl_seconds=ttl_seconds, news_ttl_seconds=news_ttl_seconds, persist_path=None,
+    )
+
+
+def test_entries_expire_after_the_ttl():
+    client = StubClient()
+    cache = _cache(client, ttl_seconds=0.05)
+    cache.search("python packaging guide", max_results=5)
+    cache.search("Python  packaging guide", max_results=5)
+    assert client.calls == 1
+    time.sleep(0.1)
+    cache.search("python packaging guide", max_results=5)
+    assert client.calls == 2
+
+
+def test_news_queries_use_the_shorter_ttl():
+    client = StubClient()
+    cache = _cache(client, ttl_seconds=60.0, news_ttl_seconds=0.05)
+    cache.search("latest python release news")
+    cache.search("python packaging guide")
+    time.sleep(0.1)
+    cache.search("latest python release news")
+    cache.search("python packaging guide")
+    assert client.calls == 3
+
+
+def test_concurrent_identical_searches_make_one_request():
+    client = StubClient(delay=0.2)
+    cache = _cache(client)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(cache.search("python packaging guide", max_results=5))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.calls == 1
+    assert cache.requests == 1
+    assert len(results) == 8 and all(result == results[0] for result in results)
+
+
+def test_concurrent_identical_async_searches_make_one_request():
+    client = AsyncStubClient(delay=0.1)
+    cache = _cache(async_client=client)
+
+    async def run():
+        return await asyncio.gather(*(cache.asearch("python packaging guide") for _ in range(8)))
+
+    results = asyncio.run(run())
+    assert client.calls == 1
+    assert cache.requests == 1 and cache.coalesced == 7
+    assert all(result == results[0] for result in results)
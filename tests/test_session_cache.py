@@ -0,0 +1,104 @@
+import threading
+
+from app.models import ChatMessage
+from app.services.session_cache import SessionCache
+
+
+def _message(text: str) -> ChatMessage:
+    return ChatMessage(role="user", content=text)
+
+
+def test_evicted_sessions_are_flushed_outside_the_lock():
+    flushed = []
+    dropped = []
+
+    def on_evict(session_id, messages):
+        # Another thread can use the cache while a flush is running.
+        worker = threading.Thread(target=cache.get, args=("b",))
+        worker.start()
+        worker.join(timeout=1)
+        assert not worker.is_alive()
+        flushed.append((session_id, [m.content for m in messages]))
+        return True
+
+    cache = SessionCache(max_sessions=1, max_bytes=10**9, on_evict=on_evict, on_drop=dropped.append)
+    cache["a"] = [_message("hello")]
+    cache["b"] = []
+    assert flushed == [("a", ["hello"])]
+    assert dropped == ["a"]
+    assert "a" not in cache and cache.evictions == 1
+
+
+def test_failed_flush_keeps_the_session_cached():
+    attempts = []
+
+    def on_evict(session_id, messages):
+        attempts.append(session_id)
+        return len(attempts) > 1
+
+    dropped = []
+    cache = SessionCache(max_sessions=1, max_bytes=10**9, on_evict=on_evict, on_drop=dropped.append)
+    cache["a"] = [_message("unsaved")]
+    cache["b"] = []
+    assert "a" in cache and dropped == []
+    assert [m.content for m in cache.peek("a")] == ["unsaved"]
+
+    cache.append("b", _message("next"))  # the next eviction retries the flush
+    assert attempts == ["a", "a"]
+    assert "a" not in cache and dropped == ["a"]
+
+
+def test_access_during_flush_reuses_the_evicted_list():
+    cache = None
+    seen = []
+
+    def on_evict(session_id, messages):
+        if session_id == "a":
+            seen.append(cache.get("a") is messages)
+        return True
+
+    cache = SessionCache(max_sessions=1, max_bytes=10**9, on_evict=on_evict)
+    cache["a"] = [_message("hello")]
+    cache["b"] = []
+    assert seen == [True]
+    assert "a" in cache
+
+
+def test_least_recently_used_sessions_go_first_by_count_and_bytes():
+    cache = SessionCache(max_sessions=2, max_bytes=10**9)
+    cache["a"] = []
+    cache["b"] = []
+    cache.get("a")
+    cache["c"] = []
+    assert cache.keys() == ["a", "c"]
+
+    small = SessionCache(max_sessions=10, max_bytes=1000)
+    small["a"] = [_message("x" * 300)]
+    small["b"] = [_message("y" * 300)]
+    small.append("b", _message("z" * 100))
+    assert small.keys() == ["b"] and small.stats()["bytes"] < 1000
+
+
+def test_chat_service_flushes_evicted_sessions_and_reloads_them(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    import app.services.chat_service as chat_service_module
+    from app.services.chat_service import ChatService
+    from app.services.chat_store import FileChatStore
+
+    monkeypatch.setattr(chat_service_module, "SESSION_CACHE_MAX_SESSIONS", 1)
+    store = FileChatStore(tmp_path)
+    service = ChatService(SimpleNamespace(), SimpleNamespace(), store=store)
+    first = service.get_or_create_session()
+    service.add_message(first, "user", "remember this")
+    service.add_message(first, "assistant", "noted")
+
+    second = service.get_or_create_session()
+    assert first not in service.sessions
+    assert [m["content"] for m in store.load(first)] == ["remember this", "noted"]
+
+    service.add_message(first, "user", "what did I say?")  # reloads the evicted session
+    service.save_chat_session(first)
+    assert [m.content for m in service.get_chat_history(first)] == ["remember this", "noted", "what did I say?"]
+    assert len(store.load(first)) == 3
+    assert second not in service.sessions
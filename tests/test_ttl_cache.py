@@ -0,0 +1,31 @@
+import time
+
+from app.utils.ttl_cache import TTLCache
+
+
+def test_entries_expire_and_count_as_misses():
+    cache = TTLCache(max_entries=10, ttl_seconds=0.05)
+    cache.put("a", 1)
+    cache.put("b", 2, ttl_seconds=0)  # no expiry
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert cache.get("a") is None and cache.peek("a") is None
+    assert cache.get("b") == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (2, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.peek("b") is None
+    assert [key for key, _, _ in cache.snapshot()] == ["a", "c"]
+
+
+def test_zero_entries_disables_the_cache():
+    cache = TTLCache(max_entries=0, ttl_seconds=60)
+    cache.put("a", 1)
+    assert cache.get("a") is None and len(cache) == 0
@@ -0,0 +1,126 @@
+import random
+
+import numpy as np
+import pytest
+
+import app.services.ann_index as ann_index
+from app.services.ann_index import index_kind
+from app.services.index_store import INDEX_FILE, UPDATES_FILE
+from app.services.vector_store import VectorStoreService
+
+
+def _write_learning_file(learning_dir, name: str, chunks: int, seed: int) -> None:
+    rng = random.Random(seed)
+    words = [f"{name}{rng.randrange(10_000)}" for _ in range(chunks * 150)]
+    (learning_dir / f"{name}.txt").write_text(" ".join(words), encoding="utf-8")
+
+
+def _assert_each_chunk_finds_itself(service: VectorStoreService):
+    store = service.vector_store
+    for doc_id in list(store.index_to_docstore_id.values())[::7]:
+        text = store.docstore.search(doc_id).page_content
+        hits = service.search(text, k=1)
+        assert hits and hits[0].page_content == text
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_removing_a_source_keeps_ids_consistent(data_dirs, hash_embeddings, monkeypatch, index_type):
+    monkeypatch.setattr(ann_index, "VECTOR_INDEX_TYPE", index_type)
+    for i, name in enumerate(("alpha", "beta", "gamma")):
+        _write_learning_file(data_dirs.LEARNING_DATA_DIR, name, chunks=30, seed=i)
+
+    service = VectorStoreService()
+    assert index_kind(service.vector_store.index) == index_type
+
+    (data_dirs.LEARNING_DATA_DIR / "beta.txt").unlink()
+    service.sync_vector_store()
+    sources = {doc.metadata["source"] for doc in service.vector_store.docstore._dict.values()}
+    assert sources == {"alpha.txt", "gamma.txt"}
+    assert service.vector_store.index.ntotal == len(service.vector_store.index_to_docstore_id)
+    _assert_each_chunk_finds_itself(service)
+
+    # Additions after a removal must not reuse labels that are still taken.
+    _write_learning_file(data_dirs.LEARNING_DATA_DIR, "delta", chunks=10, seed=3)
+    service.sync_vector_store()
+    _assert_each_chunk_finds_itself(service)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf"])
+def test_incremental_updates_are_logged_and_replayed(data_dirs, hash_embeddings, monkeypatch, index_type):
+    monkeypatch.setattr(ann_index, "VECTOR_INDEX_TYPE", index_type)
+    for i, name in enumerate(("alpha", "beta")):
+        _write_learning_file(data_dirs.LEARNING_DATA_DIR, name, chunks=30, seed=i)
+    service = VectorStoreService()
+    index_path = data_dirs.VECTOR_STORE_DIR / INDEX_FILE
+    snapshot = index_path.stat().st_mtime_ns
+    live_index = service.vector_store.index
+
+    (data_dirs.LEARNING_DATA_DIR / "beta.txt").unlink()
+    _write_learning_file(data_dirs.LEARNING_DATA_DIR, "gamma", chunks=5, seed=2)
+    service.sync_vector_store()
+
+    # Updated in place and appended to the log; the snapshot is left alone.
+    assert service.vector_store.index is live_index
+    assert index_path.stat().st_mtime_ns == snapshot
+    assert (data_dirs.VECTOR_STORE_DIR / UPDATES_FILE).exists()
+
+    reloaded = VectorStoreService()
+    assert set(reloaded.vector_store.index_to_docstore_id.values()) == set(service.vector_store.index_to_docstore_id.values())
+    assert set(reloaded._source_ids) == {"alpha.txt", "gamma.txt"}
+    _assert_each_chunk_finds_itself(reloaded)
+
+    reloaded.flush()
+    assert not (data_dirs.VECTOR_STORE_DIR / UPDATES_FILE).exists()
+    assert VectorStoreService().vector_store.index.ntotal == reloaded.vector_store.index.ntotal
+
+
+def test_hnsw_removal_reuses_indexed_vectors(data_dirs, hash_embeddings, monkeypatch):
+    monkeypatch.setattr(ann_index, "VECTOR_INDEX_TYPE", "hnsw")
+    for i, name in enumerate(("alpha", "beta")):
+        _write_learning_file(data_dirs.LEARNING_DATA_DIR, name, chunks=20, seed=i)
+    service = VectorStoreService()
+    embedded = []
+    embed_documents = service.embedding_pipeline.embed_documents
+    monkeypatch.setattr(service.embedding_pipeline, "embed_documents", lambda texts: embedded.extend(texts) or embed_documents(texts))
+    service.embedding_cache._entries.clear()  # as if every vector had been evicted
+
+    (data_dirs.LEARNING_DATA_DIR / "beta.txt").unlink()
+    service.sync_vector_store()
+
+    assert embedded == []
+    assert index_kind(service.vector_store.index) == "hnsw"
+    _assert_each_chunk_finds_itself(service)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_chunk_vectors_are_read_back_from_the_index(data_dirs, hash_embeddings, monkeypatch, index_type):
+    monkeypatch.setattr(ann_index, "VECTOR_INDEX_TYPE", index_type)
+    _write_learning_file(data_dirs.LEARNING_DATA_DIR, "alpha", chunks=30, seed=0)
+    service = VectorStoreService()
+    docs = service.search("alpha", k=5)
+    expected = service.embeddings.embed_documents([doc.page_content for doc in docs])
+    service.embedding_cache._entries.clear()
+    monkeypatch.setattr(service.embedding_pipeline, "embed_documents", lambda texts: pytest.fail("re-embedded"))
+
+    vectors = service.chunk_vectors(docs)
+    assert vectors.shape == (len(docs), 32)
+    assert np.allclose(vectors, expected, atol=1e-5)
+
+
+def test_query_embeddings_and_results_are_cached_per_index_version(data_dirs, hash_embeddings, monkeypatch):
+    _write_learning_file(data_dirs.LEARNING_DATA_DIR, "alpha", chunks=10, seed=0)
+    service = VectorStoreService()
+    calls = []
+    embed_query = hash_embeddings.embed_query
+    monkeypatch.setattr(hash_embeddings, "embed_query", lambda text: calls.append(text) or embed_query(text))
+
+    first = service.search("alpha  question", k=3)
+    assert service.search("alpha question", k=3) == first
+    assert calls == ["alpha question"]
+    assert service.query_cache_stats()["results"]["hits"] == 1
+
+    _write_learning_file(data_dirs.LEARNING_DATA_DIR, "beta", chunks=5, seed=1)
+    service.sync_vector_store()
+    service.search("alpha question", k=3)
+    assert len(calls) == 1  # the query vector is still cached
+    assert service.query_cache_stats()["results"]["misses"] == 2  # the new index version missed